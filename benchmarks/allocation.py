@@ -0,0 +1,107 @@
+"""
+Verification code allocation latency as the number of live codes grows.
+
+``Code.save()`` draws a random number and leaves uniqueness to the partial
+index ``unique_active_code_per_user``, with no lookup first. Its cost
+should therefore stay flat however many codes are live. For each
+``--live`` count this seeds that many unexpired codes for other users.
+Then ``--threads`` workers each allocate one code for ``--allocations``
+fresh users. It reports the latency percentiles, the collisions
+counted by ``CODE_ALLOCATIONS`` and the allocations that ran out of
+attempts.
+
+Uniqueness is per user, so other users' codes never collide with a new
+draw. ``--own-codes`` also gives every allocating user that many live
+codes, which is the only way to put retries on the allocator.
+
+    python -m benchmarks.allocation --live 0 10000 100000 --threads 8 --allocations 400
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from benchmarks.common import percentile, prepare_database, setup_django
+
+COLLISIONS = ('code_allocation_attempts', ('collision',))
+
+
+def make_users(prefix, count):
+    from users.models import CustomUser
+
+    return CustomUser.objects.bulk_create(
+        [CustomUser(username=f'{prefix}_{i}', phone_number=f'09{prefix}{i:07d}', password='!') for i in range(count)],
+        batch_size=1000
+    )
+
+
+def seed_codes(owners, count, per_owner):
+    """``count`` unexpired codes, ``per_owner`` for each owner in turn"""
+    from django.utils import timezone
+    from codes.models import CODE_LENGTH, Code
+
+    expires_at = timezone.now() + timedelta(minutes=5)
+    Code.objects.bulk_create(
+        [Code(user=owners[i // per_owner], number=f'{i % per_owner:0{CODE_LENGTH}d}', expires_at=expires_at)
+         for i in range(count)],
+        batch_size=2000
+    )
+
+
+def allocate(users, threads):
+    from django.db import connection
+    from codes.models import Code
+
+    def one(user):
+        started = time.perf_counter()
+        try:
+            Code.objects.create(user=user)
+        except ValueError:
+            # every attempt collided
+            return None
+        finally:
+            connection.close()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(one, users))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--live', type=int, nargs='+', default=[0, 10000, 100000], help="Live codes of other users")
+    parser.add_argument('--threads', type=int, default=8, help="Concurrent allocating workers")
+    parser.add_argument('--allocations', type=int, default=400, help="Codes allocated per live count")
+    parser.add_argument('--own-codes', type=int, default=0, help="Live codes each allocating user already has")
+    parser.add_argument('--per-owner', type=int, default=100, help="Seeded live codes per other user")
+    args = parser.parse_args()
+
+    setup_django()
+    prepare_database(0)
+    from codes.models import Code
+    from core.metrics import collect
+
+    print(f"{'live codes':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'codes/s':>10}{'collisions':>12}{'failed':>10}")
+    for level, live in enumerate(args.live):
+        Code.objects.all().delete()
+        seed_codes(make_users(f'1{level}', -(-live // args.per_owner)), live, args.per_owner)
+        users = make_users(f'2{level}', args.allocations)
+        if args.own_codes:
+            seed_codes(users, args.allocations * args.own_codes, args.own_codes)
+
+        collisions = collect().get(COLLISIONS, 0)
+        started = time.perf_counter()
+        results = allocate(users, args.threads)
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency in results if latency is not None]
+        print(
+            f"{live:>12}"
+            f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 95) * 1000:>10.2f}"
+            f"{percentile(latencies, 99) * 1000:>10.2f}{len(latencies) / elapsed:>10.0f}"
+            f"{collect().get(COLLISIONS, 0) - collisions:>12}{len(results) - len(latencies):>10}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Login throughput under WSGI and ASGI with a slow SMS panel.
+
+Starts the stub panel, then serves the project once through gunicorn
+(core.wsgi, sync views) and once through uvicorn (core.asgi with
+ASYNC_AUTH_VIEWS=1), and fires concurrent login POSTs at each. SMS is sent
+inline (SMS_OUTBOX_ENABLED=0) so every login waits on the panel, which is
+the case the async path is built for.
+
+    python -m benchmarks.asgi_vs_wsgi --latency 0.5 --concurrency 200 --requests 2000
+
+Requires gunicorn, uvicorn and httpx.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import (
+    ASGI_COMMAND,
+    CSRF_INPUT,
+    WSGI_COMMAND,
+    percentile,
+    prepare_database,
+    start_server,
+    stop_server,
+)
+from benchmarks.stub_sms import StubSmsServer
+
+
+async def virtual_user(base_url, accounts, password, latencies, errors):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        page = await client.get('/users/login/')
+        token = CSRF_INPUT.search(page.text).group(1)
+        for username, _ in accounts:
+            started = time.perf_counter()
+            response = await client.post('/users/login/', data={
+                'csrfmiddlewaretoken': token,
+                'username': username,
+                'password': password,
+            })
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+
+async def run_load(base_url, accounts, concurrency, password):
+    latencies, errors = [], []
+    chunks = [accounts[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        virtual_user(base_url, chunk, password, latencies, errors) for chunk in chunks if chunk
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help="Login POSTs per server")
+    parser.add_argument('--concurrency', type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument('--latency', type=float, default=0.5, help="Stub SMS panel latency in seconds")
+    parser.add_argument('--workers', type=int, default=1, help="Server processes for both servers")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--sms-port', type=int, default=8901)
+    parser.add_argument('--wsgi-command', default=WSGI_COMMAND)
+    parser.add_argument('--asgi-command', default=ASGI_COMMAND)
+    args = parser.parse_args()
+
+    password = 'benchpass123'
+    sms = StubSmsServer(port=args.sms_port, latency=args.latency).start()
+    env = {'BENCH_SMS_URL': sms.url, 'SMS_OUTBOX_ENABLED': '0'}
+
+    results = {}
+    for name, command, extra_env in (
+        ('wsgi', args.wsgi_command, {'ASYNC_AUTH_VIEWS': '0'}),
+        ('asgi', args.asgi_command, {'ASYNC_AUTH_VIEWS': '1'}),
+    ):
+        accounts = prepare_database(args.requests, password=password, prefix=name)
+        process = start_server(
+            command, args.port, env={**env, **extra_env},
+            workers=args.workers, threads=args.threads
+        )
+        try:
+            results[name] = asyncio.run(run_load(
+                f"http://127.0.0.1:{args.port}", accounts, args.concurrency, password
+            ))
+        finally:
+            stop_server(process)
+
+    sms.stop()
+
+    print(f"SMS latency {args.latency}s, concurrency {args.concurrency}, {args.workers} worker(s)")
+    print(f"{'server':<8}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<8}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['p50'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Cache backend comparison: LocMemCache, DatabaseCache and core.cache.SQLiteCache.
+
+For each backend this measures single-process get/set/incr throughput. It
+then runs ``--processes`` forked workers that each increment one shared
+counter ``--increments`` times. The final counter shows whether the backend
+is shared between workers and whether ``incr`` is atomic. LocMem only ever
+sees its own process's increments. DatabaseCache implements incr as get + set
+and loses updates under contention.
+
+    python -m benchmarks.cache --ops 5000 --processes 8 --increments 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.common import setup_django
+
+
+def make_backends(directory):
+    from django.core.cache.backends.db import DatabaseCache
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.core.management import call_command
+    from core.cache import SQLiteCache
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command('createcachetable', 'bench_cache', verbosity=0)
+    params = {'OPTIONS': {'MAX_ENTRIES': 100000}}
+    return {
+        'locmem': lambda: LocMemCache('bench', params),
+        'database': lambda: DatabaseCache('bench_cache', params),
+        'sqlite_wal': lambda: SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params),
+    }
+
+
+def throughput(cache, ops):
+    results = {}
+    cache.set('counter', 0)
+    for name, operation in (
+        ('set', lambda i: cache.set(f'key{i % 1000}', i)),
+        ('get', lambda i: cache.get(f'key{i % 1000}')),
+        ('incr', lambda i: cache.incr('counter')),
+    ):
+        started = time.perf_counter()
+        for i in range(ops):
+            operation(i)
+        results[name] = ops / (time.perf_counter() - started)
+    return results
+
+
+def _increment(factory, increments):
+    from django.db import connections
+    # forked children must not reuse the parent's database connection
+    connections.close_all()
+    cache = factory()
+    for _ in range(increments):
+        try:
+            cache.incr('shared')
+        except ValueError:
+            cache.add('shared', 0)
+            cache.incr('shared')
+
+
+def contention(factory, processes, increments):
+    cache = factory()
+    cache.set('shared', 0)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_increment, args=(factory, increments)) for _ in range(processes)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return cache.get('shared'), processes * increments / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--increments', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    with tempfile.TemporaryDirectory() as directory:
+        backends = make_backends(directory)
+        expected = args.processes * args.increments
+        print(f"{'backend':<12}{'set/s':>10}{'get/s':>10}{'incr/s':>10}{'shared incr':>16}{'incr/s (mp)':>14}")
+        for name, factory in backends.items():
+            rates = throughput(factory(), args.ops)
+            counted, rate = contention(factory, args.processes, args.increments)
+            print(
+                f"{name:<12}{rates['set']:>10.0f}{rates['get']:>10.0f}{rates['incr']:>10.0f}"
+                f"{f'{counted}/{expected}':>16}{rate:>14.0f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
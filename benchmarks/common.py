@@ -0,0 +1,92 @@
+"""Helpers shared by the benchmark and load-test scripts"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+WSGI_COMMAND = 'gunicorn core.wsgi:application --bind 127.0.0.1:{port} --workers {workers} --threads {threads}'
+ASGI_COMMAND = 'uvicorn core.asgi:application --host 127.0.0.1 --port {port} --workers {workers} --no-access-log'
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+def prepare_database(users, password='benchpass123', prefix='bench'):
+    """
+    Create the benchmark schema and ``users`` accounts with a shared
+    password. Returns the list of (username, phone_number) pairs.
+    """
+    setup_django()
+    from django.contrib.auth.hashers import make_password
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from users.models import CustomUser
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    # The benchmark database is disposable: start every run from a clean user table
+    CustomUser.objects.all().delete()
+    # and from empty rate-limit and lockout counters
+    cache.clear()
+
+    hashed = make_password(password)
+    accounts = [(f'{prefix}_{i}', f'09{i:09d}') for i in range(users)]
+    CustomUser.objects.bulk_create(
+        [CustomUser(username=username, phone_number=phone, password=hashed) for username, phone in accounts],
+        batch_size=1000
+    )
+    return accounts
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def start_server(command, port, env=None, **params):
+    """Start an application server in a subprocess and wait until it listens"""
+    server_env = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.settings', **(env or {}))
+    process = subprocess.Popen(
+        command.format(port=port, **params).split(),
+        cwd=BASE_DIR,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=sys.stderr,
+    )
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
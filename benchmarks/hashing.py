@@ -0,0 +1,78 @@
+"""
+Password verification throughput: request threads vs users.hashing pool.
+
+Runs ``--logins`` password checks against one PBKDF2 hash (the project's
+production hashers, not the MD5 used by the other benchmarks). They are
+spread over ``--threads`` simulated request threads, first inline (the
+old ``user.check_password`` path) and then through a process pool with
+``--workers`` processes. Reports logins per second, logins per second per
+core and how long other work on the request threads waits. That last
+number comes from a probe thread timing 1 ms sleeps while the hashes run.
+
+    python -m benchmarks.hashing --logins 400 --threads 16 --workers 4
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import percentile, setup_django
+
+
+def probe(stop, delays):
+    """Scheduling delay seen by another thread while hashing runs"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        time.sleep(0.001)
+        delays.append(time.perf_counter() - started - 0.001)
+
+
+def run(check, logins, threads):
+    stop, delays = threading.Event(), []
+    prober = threading.Thread(target=probe, args=(stop, delays))
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda _: check(), range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    assert all(results)
+    return logins / elapsed, percentile(delays, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=16, help="Simulated request threads")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Hashing processes")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import global_settings
+    from django.contrib.auth.hashers import make_password
+    from django.test import override_settings
+    from users.hashing import _check, get_hashing_service
+
+    cores = os.cpu_count()
+    with override_settings(PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS):
+        encoded = make_password('benchpass123')
+        print(f"{encoded.split('$')[0]} x {encoded.split('$')[1]} iterations, {cores} core(s)")
+        print(f"{'mode':<20}{'logins/s':>10}{'per core':>10}{'p99 stall ms':>14}")
+
+        rate, stall = run(lambda: _check('benchpass123', encoded)[0], args.logins, args.threads)
+        print(f"{'inline':<20}{rate:>10.1f}{rate / cores:>10.1f}{stall:>14.1f}")
+
+        hashing = {'WORKERS': args.workers, 'MAX_QUEUE': args.logins, 'TIMEOUT': 600}
+        with override_settings(PASSWORD_HASHING=hashing):
+            service = get_hashing_service()
+            service.run(_check, 'warm-up', encoded)
+            rate, stall = run(lambda: service.run(_check, 'benchpass123', encoded)[0], args.logins, args.threads)
+            print(f"{f'pool ({args.workers} procs)':<20}{rate:>10.1f}{rate / cores:>10.1f}{stall:>14.1f}")
+            service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
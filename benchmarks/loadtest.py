@@ -0,0 +1,209 @@
+"""
+End-to-end load test of the register -> login -> SMS -> verify -> home flow.
+
+Starts the stub SMS panel (benchmarks.stub_sms) with the given latency and
+error rate, serves the project through gunicorn (core.wsgi) and/or uvicorn
+(core.asgi), and runs ``--users`` virtual users, ``--concurrency`` at a time.
+Each one registers, logs in, reads its code back from the stub, verifies it
+and loads the home page.
+
+Reported per step: p50/p95/p99 latency, errors and mean SQL queries per
+request (from the X-Query-Count header added by the benchmark settings).
+Overall: completed flows per second, requests per second and SMS panel
+calls per login.
+
+    python -m benchmarks.loadtest --server both --users 500 --concurrency 50 --latency 0.2
+
+Requires gunicorn, uvicorn and httpx.
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import (
+    ASGI_COMMAND,
+    CSRF_INPUT,
+    WSGI_COMMAND,
+    percentile,
+    prepare_database,
+    start_server,
+    stop_server,
+)
+from benchmarks.stub_sms import StubSmsServer
+
+PASSWORD = 'Load-Test-9876!'
+STEPS = ('register', 'login', 'sms', 'verify', 'home')
+CODE = re.compile(r'(\d+)\s*$')
+
+
+class FlowError(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.requests = 0
+        self.flows = 0
+
+    def record(self, step, started, response=None):
+        self.latencies[step].append(time.perf_counter() - started)
+        if response is not None:
+            self.requests += 1
+            if 'X-Query-Count' in response.headers:
+                self.queries[step].append(int(response.headers['X-Query-Count']))
+
+
+async def read_code(sms_url, mobile, timeout):
+    """Poll the stub until the verification SMS for ``mobile`` arrives"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=sms_url) as client:
+        while time.monotonic() < deadline:
+            response = await client.get(f'/messages/{mobile}')
+            if response.status_code == 200:
+                return CODE.search(response.text).group(1)
+            await asyncio.sleep(0.05)
+    raise FlowError('sms')
+
+
+async def expect(client, recorder, step, method, url, status, location=None, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.record(step, started, response)
+    if response.status_code != status or (location and response.headers.get('Location') != location):
+        raise FlowError(step)
+    return response
+
+
+def csrf(response):
+    return CSRF_INPUT.search(response.text).group(1)
+
+
+async def virtual_user(base_url, sms_url, index, recorder, sms_timeout):
+    username, mobile = f'load_{index}', f'091{index:08d}'
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        try:
+            page = await client.get('/users/register/')
+            await expect(client, recorder, 'register', 'POST', '/users/register/', 302, data={
+                'csrfmiddlewaretoken': csrf(page),
+                'username': username,
+                'email': f'{username}@example.com',
+                'phone_number': mobile,
+                'password1': PASSWORD,
+                'password2': PASSWORD,
+            })
+
+            page = await client.get('/users/login/')
+            await expect(client, recorder, 'login', 'POST', '/users/login/', 302, '/codes/verify/', data={
+                'csrfmiddlewaretoken': csrf(page),
+                'username': username,
+                'password': PASSWORD,
+            })
+
+            started = time.perf_counter()
+            code = await read_code(sms_url, mobile, sms_timeout)
+            recorder.record('sms', started)
+
+            page = await client.get('/codes/verify/')
+            await expect(client, recorder, 'verify', 'POST', '/codes/verify/', 302, '/', data={
+                'csrfmiddlewaretoken': csrf(page),
+                'code': code,
+            })
+            await expect(client, recorder, 'home', 'GET', '/', 200)
+            recorder.flows += 1
+        except FlowError as e:
+            recorder.errors[str(e)] += 1
+        except (httpx.HTTPError, AttributeError):
+            recorder.errors['transport'] += 1
+
+
+async def run_load(base_url, sms_url, users, concurrency, sms_timeout):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index):
+        async with semaphore:
+            await virtual_user(base_url, sms_url, index, recorder, sms_timeout)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(index) for index in range(users)))
+    recorder.elapsed = time.perf_counter() - started
+    return recorder
+
+
+def report(name, recorder, sms_calls):
+    logins = len(recorder.latencies['login'])
+    print(f"\n[{name}] {recorder.flows} flows in {recorder.elapsed:.1f}s: "
+          f"{recorder.flows / recorder.elapsed:.1f} flows/s, {recorder.requests / recorder.elapsed:.1f} req/s, "
+          f"{sms_calls / logins if logins else 0:.2f} SMS calls per login")
+    print(f"{'step':<10}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for step in STEPS:
+        samples = recorder.latencies[step]
+        queries = recorder.queries[step]
+        print(
+            f"{step:<10}{len(samples):>7}{recorder.errors[step]:>8}"
+            f"{percentile(samples, 50) * 1000:>9.1f}{percentile(samples, 95) * 1000:>9.1f}"
+            f"{percentile(samples, 99) * 1000:>9.1f}"
+            f"{(sum(queries) / len(queries) if queries else 0):>9.1f}"
+        )
+    if recorder.errors['transport']:
+        print(f"transport errors: {recorder.errors['transport']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('wsgi', 'asgi', 'both'), default='wsgi')
+    parser.add_argument('--users', type=int, default=200, help="Virtual users (one full flow each)")
+    parser.add_argument('--concurrency', type=int, default=20, help="Virtual users running at once")
+    parser.add_argument('--latency', type=float, default=0.1, help="Stub SMS panel latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of SMS requests failing with HTTP 500")
+    parser.add_argument('--outbox', action='store_true', help="Queue SMS through the outbox (run sms_worker separately)")
+    parser.add_argument('--sms-timeout', type=float, default=30.0, help="Seconds to wait for a code to arrive")
+    parser.add_argument('--workers', type=int, default=2, help="Server processes")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--sms-port', type=int, default=8901)
+    parser.add_argument('--wsgi-command', default=WSGI_COMMAND)
+    parser.add_argument('--asgi-command', default=ASGI_COMMAND)
+    args = parser.parse_args()
+
+    servers = {
+        'wsgi': (args.wsgi_command, {'ASYNC_AUTH_VIEWS': '0'}),
+        'asgi': (args.asgi_command, {'ASYNC_AUTH_VIEWS': '1'}),
+    }
+    names = ('wsgi', 'asgi') if args.server == 'both' else (args.server,)
+
+    sms = StubSmsServer(port=args.sms_port, latency=args.latency, error_rate=args.error_rate).start()
+    env = {'BENCH_SMS_URL': sms.url, 'SMS_OUTBOX_ENABLED': '1' if args.outbox else '0'}
+    print(f"{args.users} users, concurrency {args.concurrency}, SMS latency {args.latency}s, "
+          f"error rate {args.error_rate}, {args.workers} worker(s)")
+    try:
+        for name in names:
+            command, extra_env = servers[name]
+            prepare_database(0)
+            sms.messages.clear()
+            calls_before = sms.calls
+            process = start_server(
+                command, args.port, env={**env, **extra_env},
+                workers=args.workers, threads=args.threads
+            )
+            try:
+                recorder = asyncio.run(run_load(
+                    f"http://127.0.0.1:{args.port}", sms.url, args.users, args.concurrency, args.sms_timeout
+                ))
+            finally:
+                stop_server(process)
+            report(name, recorder, sms.calls - calls_before)
+    finally:
+        sms.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Instrumentation used only by the benchmark settings"""
+
+from django.db import connection
+
+
+class QueryCountMiddleware:
+    """Report the number of SQL statements a request ran in ``X-Query-Count``"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        executed = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal executed
+            executed += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(executed)
+        return response
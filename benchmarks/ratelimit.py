@@ -0,0 +1,54 @@
+"""
+Throughput of the core.ratelimit policies.
+
+Hammers each policy from several threads against the configured cache
+backend (``--cache`` selects another alias from CACHES) and reports checks
+per second. Every check is a constant number of cache operations, so the
+numbers mostly reflect the cache backend.
+
+    python -m benchmarks.ratelimit --threads 8 --checks 20000
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django
+
+
+def run(limiter, threads, checks, keys):
+    def worker(offset):
+        for i in range(checks // threads):
+            limiter.hit(f"bench-{(offset + i) % keys}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    return checks / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000, help="Distinct keys (IPs/phones/users)")
+    parser.add_argument('--cache', default='default', help="CACHES alias to benchmark")
+    args = parser.parse_args()
+
+    setup_django()
+    from unittest import mock
+    from django.core.cache import caches
+    from core import ratelimit
+
+    policies = {
+        'sliding_window': ratelimit.SlidingWindow('bench', limit=10 ** 9, window=60),
+        'token_bucket': ratelimit.TokenBucket('bench', capacity=10 ** 9, refill_seconds=1),
+    }
+    with mock.patch.object(ratelimit, 'cache', caches[args.cache]):
+        for name, limiter in policies.items():
+            rate = run(limiter, args.threads, args.checks, args.keys)
+            print(f"{name:<16}{rate:>12.0f} checks/s ({args.threads} threads, cache '{args.cache}')")
+
+
+if __name__ == '__main__':
+    main()
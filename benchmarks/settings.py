@@ -0,0 +1,56 @@
+"""
+Settings for the benchmark and load-test scripts in this package.
+
+Runs the real project settings with the debug toolbar removed, a local
+SQLite database and the SMS panel pointed at benchmarks.stub_sms.
+"""
+
+from core.settings import *  # noqa: F401,F403
+from core.settings import BASE_DIR, CACHES, INSTALLED_APPS, MIDDLEWARE, SMS_CONFIG, SMS_OUTBOX, env
+
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [
+    # outermost so session and auth queries are counted too
+    'benchmarks.middleware.QueryCountMiddleware',
+    *[middleware for middleware in MIDDLEWARE if 'debug_toolbar' not in middleware],
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env('BENCH_DB_PATH', default=str(BASE_DIR / 'bench.sqlite3')),
+        'OPTIONS': {
+            'timeout': 30,
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': env('BENCH_CACHE_PATH', default=str(BASE_DIR / 'bench_cache.sqlite3')),
+    }
+}
+
+# Password hashing is benchmarked separately; keep it out of the I/O numbers
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+SESSION_COOKIE_SECURE = False
+CSRF_COOKIE_SECURE = False
+
+SMS_CONFIG = {
+    **SMS_CONFIG,
+    'BASE_URL': env('BENCH_SMS_URL', default='http://127.0.0.1:8901/'),
+    'MAX_RETRIES': 0,
+    'POOL_SIZE': env.int('BENCH_SMS_POOL_SIZE', default=100),
+}
+
+# Send inline by default so the request path waits on the (slow) stub panel
+SMS_OUTBOX = {
+    **SMS_OUTBOX,
+    'ENABLED': env.bool('SMS_OUTBOX_ENABLED', default=False),
+}
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the Trez SMS panel.
+
+Answers ``AutoSendCode.ashx`` like the real panel (a transaction id above
+2000 on success) after a configurable delay, fails a configurable share of
+requests with HTTP 500 and remembers the last message per mobile number so
+load tests can read verification codes back via ``GET /messages/<mobile>``.
+
+    python -m benchmarks.stub_sms --port 8901 --latency 0.5 --error-rate 0.01
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubSmsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        server = self.server
+
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.calls += 1
+
+        if random.random() < server.error_rate:
+            with server.lock:
+                server.errors += 1
+            self._reply(500, 'error')
+            return
+
+        if self.path.rstrip('/').endswith('AutoSendCode.ashx'):
+            with server.lock:
+                server.messages[data.get('Mobile', '')] = data.get('Footer', '')
+        self._reply(200, str(random.randint(2001, 10 ** 9)))
+
+    def do_GET(self):
+        if self.path.startswith('/messages/'):
+            mobile = self.path.rsplit('/', 1)[-1]
+            with self.server.lock:
+                message = self.server.messages.get(mobile)
+            if message is None:
+                self._reply(404, '')
+            else:
+                self._reply(200, message)
+            return
+        if self.path == '/stats':
+            self._reply(200, f"calls={self.server.calls} errors={self.server.errors}")
+            return
+        self._reply(404, '')
+
+
+class StubSmsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=8901, latency=0.0, error_rate=0.0):
+        super().__init__((host, port), StubSmsHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self.messages = {}
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds to wait before answering")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = StubSmsServer(args.host, args.port, args.latency, args.error_rate)
+    print(f"Stub SMS panel listening on {server.url} (latency={args.latency}s, error rate={args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import BooleanField, Case, DurationField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Now
+from django.urls import reverse
 from django.utils.html import format_html
-from .models import Code
+from .models import Code, SmsOutbox
 from django.utils import timezone
+from core.export import make_export_action
+from core.paginator import EstimatedCountPaginator
+from core.routers import ReplicaChangeListMixin
 
 @admin.register(Code)
-class CodeAdmin(admin.ModelAdmin):
+class CodeAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     """پنل مدیریت برای مدل Code"""
     
     # فیلدهایی که در لیست نمایش داده می‌شوند
@@ -16,9 +22,6 @@ class CodeAdmin(admin.ModelAdmin):
     # فیلترهای سمت راست
     list_filter = ('is_used', 'created_at', 'expires_at')
     
-    # فیلدهای قابل ویرایش در لیست
-    list_editable = ('is_used',)
-    
     # فیلدهای فقط خواندنی
     readonly_fields = ('number', 'user', 'created_at', 'expires_at', 'is_valid_display', 'time_remaining')
     
@@ -37,23 +40,51 @@ class CodeAdmin(admin.ModelAdmin):
     
     # تعداد آیتم‌ها در هر صفحه
     list_per_page = 20
+
+    # شمارش تخمینی به جای COUNT(*) روی کل جدول
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    list_select_related = ('user',)
+    actions = (
+        'invalidate_codes', 'purge_expired_codes',
+        make_export_action('codes', 'csv'), make_export_action('codes', 'jsonl'),
+    )
+
+    def get_queryset(self, request):
+        """اعتبار و زمان باقی‌مانده در خود SQL محاسبه می‌شود تا قابل مرتب‌سازی باشد"""
+        return super().get_queryset(request).select_related('user').annotate(
+            is_valid_flag=Case(
+                When(is_used=False, expires_at__gt=Now(), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            remaining=ExpressionWrapper(F('expires_at') - Now(), output_field=DurationField())
+        )
     
     # نمایش وضعیت اعتبار به صورت رنگی
     def is_valid_display(self, obj):
-        if obj.is_valid():
+        is_valid = getattr(obj, 'is_valid_flag', None)
+        if is_valid is None:
+            is_valid = obj.is_valid()
+        if is_valid:
             return format_html('<span style="color: green;">معتبر</span>')
         return format_html('<span style="color: red;">منقضی</span>')
     is_valid_display.short_description = 'وضعیت اعتبار'
+    is_valid_display.admin_order_field = 'is_valid_flag'
     
     # نمایش زمان باقی‌مانده تا انقضا
     def time_remaining(self, obj):
-        if obj.expires_at > timezone.now():
+        remaining = getattr(obj, 'remaining', None)
+        if remaining is None:
             remaining = obj.expires_at - timezone.now()
+        if remaining.total_seconds() > 0:
             minutes = int(remaining.total_seconds() / 60)
             seconds = int(remaining.total_seconds() % 60)
             return f"{minutes} دقیقه و {seconds} ثانیه"
         return "منقضی شده"
     time_remaining.short_description = 'زمان باقی‌مانده'
+    time_remaining.admin_order_field = 'remaining'
     
     # غیرفعال کردن امکان اضافه کردن دستی (کدها باید خودکار تولید شوند)
     def has_add_permission(self, request):
@@ -61,17 +92,51 @@ class CodeAdmin(admin.ModelAdmin):
     
     # نمایش کاربر به صورت لینک
     def user(self, obj):
-        from django.urls import reverse
-        from django.utils.html import format_html
-        url = reverse("admin:users_customuser_change", args=(obj.user.id,))
+        url = reverse("admin:users_customuser_change", args=(obj.user_id,))
         return format_html('<a href="{}">{}</a>', url, obj.user.username)
     user.short_description = 'کاربر'
+    user.admin_order_field = 'user__username'
     
     # سفارشی‌سازی نمایش تاریخ‌ها
     def created_at(self, obj):
         return obj.created_at.strftime("%Y-%m-%d %H:%M:%S")
     created_at.short_description = 'تاریخ ایجاد'
+    created_at.admin_order_field = 'created_at'
     
     def expires_at(self, obj):
         return obj.expires_at.strftime("%Y-%m-%d %H:%M:%S")
-    expires_at.short_description = 'تاریخ انقضا'
\ No newline at end of file
+    expires_at.short_description = 'تاریخ انقضا'
+    expires_at.admin_order_field = 'expires_at'
+
+    # عملیات گروهی با یک UPDATE یا DELETE
+    @admin.action(description='باطل کردن کدهای انتخاب شده')
+    def invalidate_codes(self, request, queryset):
+        count = queryset.filter(is_used=False).update(is_used=True)
+        self.message_user(request, f"{count} کد باطل شد.", messages.SUCCESS)
+
+    @admin.action(description='حذف کدهای منقضی انتخاب شده')
+    def purge_expired_codes(self, request, queryset):
+        expired = queryset.filter(expires_at__lte=Now())
+        # Code وابسته یا سیگنال حذف ندارد، پس delete() بدون بارگذاری ردیف‌ها یک DELETE است
+        count, _ = expired.delete()
+        self.message_user(request, f"{count} کد منقضی حذف شد.", messages.SUCCESS)
+
+
+@admin.register(SmsOutbox)
+class SmsOutboxAdmin(admin.ModelAdmin):
+    """پنل مدیریت برای صف پیامک‌های خروجی"""
+
+    list_display = ('phone_number', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('phone_number',)
+    # متن پیامک شامل کد تأیید است و نمایش داده نمی‌شود
+    exclude = ('message',)
+    readonly_fields = (
+        'phone_number', 'status', 'attempts', 'next_attempt_at',
+        'locked_at', 'last_error', 'provider_response', 'created_at', 'sent_at'
+    )
+    list_per_page = 20
+
+    # پیامک‌ها فقط از طریق صف ایجاد می‌شوند
+    def has_add_permission(self, request):
+        return False
@@ -1,42 +1,46 @@
 from django import forms
-from codes.models import Code
+from codes.models import CODE_LENGTH, Code
 from django.core.exceptions import ValidationError
+from core.ratelimit import get_limiter
 from users.models import CustomUser
 
 class CodeVerificationForm(forms.Form):
     code = forms.CharField(
-        max_length=5,
-        min_length=5,
+        max_length=CODE_LENGTH,
+        min_length=CODE_LENGTH,
         widget=forms.TextInput(attrs={
-            'placeholder': '12345',
+            'placeholder': '1234567890'[:CODE_LENGTH],
             'class': 'form-control',
         }),
         label="Verification Code"
     )
     
-    def __init__(self, *args, user=None, **kwargs):
+    def __init__(self, *args, user=None, nonce=None, **kwargs):
         self.user = user
+        self.nonce = nonce
         super().__init__(*args, **kwargs)
     
     def clean_code(self):
+        """
+        بررسی و مصرف کد در یک مرحله (Code.objects.consume)
+        فرم معتبر یعنی کد همین حالا مصرف شده است.
+        هر تلاش پیش از بررسی کد از محدودکننده code_verify_failures یک سهم برمی‌دارد
+        (hit اتمی است، پس درخواست‌های همزمان هم از سقف عبور نمی‌کنند) و تأیید موفق آن را صفر می‌کند.
+        """
         code = self.cleaned_data['code']
         
         if not self.user:
             raise ValidationError("User is required for code verification")
         
-        try:
-            code_obj = Code.objects.get(
-                number=code,
-                user=self.user,
-                is_used=False
-            )
-            
-            if not code_obj.is_valid():
-                raise ValidationError("This code has expired or is invalid")
-                
-            return code_obj
-        except Code.DoesNotExist:
-            raise ValidationError("Invalid verification code")
+        # تعداد تلاش‌ها در عمر یک کد محدود است (پنجره اعتبار چند گامی)
+        limiter = get_limiter('code_verify_failures')
+        if not limiter.hit(self.user.pk):
+            raise ValidationError("Too many wrong codes. Please try again later.")
+
+        if not Code.objects.consume(self.user, code, nonce=self.nonce):
+            raise ValidationError("Invalid or expired verification code")
+        limiter.reset(self.user.pk)
+        return code
         
     class Meta:
         model = Code
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from codes.purge import purge_codes
+
+
+class Command(BaseCommand):
+    help = "Delete used and expired verification codes in bounded primary-key batches"
+
+    def add_arguments(self, parser):
+        purge_config = getattr(settings, 'CODE_PURGE', {})
+        parser.add_argument(
+            '--batch-size', type=int, default=purge_config.get('BATCH_SIZE', 1000),
+            help="Rows deleted per statement"
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=purge_config.get('SLEEP', 0.05),
+            help="Seconds to pause between batches"
+        )
+        parser.add_argument(
+            '--grace-minutes', type=int, default=purge_config.get('GRACE_MINUTES', 0),
+            help="Keep expired codes for this many minutes after expiry"
+        )
+        parser.add_argument(
+            '--archive', action='store_true', default=purge_config.get('ARCHIVE', False),
+            help="Copy deleted codes to the archive table first"
+        )
+
+    def handle(self, *args, **options):
+        def progress(deleted):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {deleted} codes deleted")
+
+        result = purge_codes(
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            archive=options['archive'],
+            grace=timedelta(minutes=options['grace_minutes']),
+            progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {result['codes']} codes, {result['replay_markers']} replay markers "
+            f"and {result['outbox']} outbox messages "
+            f"in {result['seconds']:.2f}s ({result['rows_per_second']:.0f} rows/s)"
+        ))
@@ -0,0 +1,76 @@
+import time
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from codes.models import SmsOutbox
+from core.sms import SmsMessage, get_backend
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Drain the SMS outbox, sending queued messages in concurrent batches"
+
+    def add_arguments(self, parser):
+        outbox_config = getattr(settings, 'SMS_OUTBOX', {})
+        parser.add_argument(
+            '--batch-size', type=int, default=outbox_config.get('BATCH_SIZE', 100),
+            help="Number of messages claimed per batch"
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=outbox_config.get('CONCURRENCY', 8),
+            help="Number of messages sent in parallel"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=outbox_config.get('POLL_INTERVAL', 1.0),
+            help="Seconds to sleep when the outbox is empty"
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the outbox once and exit instead of polling forever"
+        )
+
+    def handle(self, *args, **options):
+        outbox_config = getattr(settings, 'SMS_OUTBOX', {})
+        self.max_attempts = outbox_config.get('MAX_ATTEMPTS', 5)
+        self.retry_delay = outbox_config.get('RETRY_DELAY', 10)
+        lease_seconds = outbox_config.get('LEASE_SECONDS', 60)
+        # a batch still sending when its lease ends is re-claimed and sent twice
+        sms_config = getattr(settings, 'SMS_CONFIG', {})
+        per_message = sms_config.get('TIMEOUT', 5) * (sms_config.get('MAX_RETRIES', 2) + 1)
+        rounds = -(-options['batch_size'] // options['concurrency'])
+        lease_seconds = max(lease_seconds, 2 * rounds * per_message)
+
+        backend = get_backend(concurrency=options['concurrency'])
+        try:
+            while True:
+                batch = SmsOutbox.objects.claim_batch(options['batch_size'], lease_seconds)
+                if batch:
+                    self.process_batch(backend, batch)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        finally:
+            backend.close()
+
+    def process_batch(self, backend, batch):
+        """Hand a claimed batch to the SMS backend; DB writes stay on the main thread"""
+        try:
+            results = backend.send_messages([SmsMessage(message.phone_number, message.message) for message in batch])
+        except Exception as e:
+            logger.exception(f"Error delivering outbox batch: {str(e)}")
+            results = [(False, str(e))] * len(batch)
+
+        sent = 0
+        for message, (success, response) in zip(batch, results):
+            if success:
+                message.mark_as_sent(response)
+                sent += 1
+            else:
+                message.mark_as_failed(response, self.max_attempts, self.retry_delay)
+
+        self.stdout.write(f"Processed {len(batch)} messages: {sent} sent, {len(batch) - sent} failed")
@@ -1,20 +1,29 @@
 
 import secrets
-import time
 import logging
+from asgiref.sync import sync_to_async
 from datetime import timedelta
-from django.db import models, transaction
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Now
 from django.core.validators import MinLengthValidator, RegexValidator
 from django.utils import timezone
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from core.metrics import CODE_ALLOCATIONS
 from users.models import CustomUser
+from .tokens import default_code_generator
 
 
 
 
 logger = logging.getLogger(__name__)
 
+CODE_LENGTH = getattr(settings, 'VERIFICATION_CODE_LENGTH', 5)
+
+
+def is_stateless_mode():
+    """آیا کدها بدون ذخیره در پایگاه داده (HMAC) تولید می‌شوند؟"""
+    return getattr(settings, 'VERIFICATION_CODE_MODE', 'database') == 'stateless'
+
 
 class CodeManager(models.Manager):
     """مدیریت سفارشی برای مدل Code"""
@@ -27,27 +36,94 @@ class CodeManager(models.Manager):
             logger.error(f"Failed to create verification code for user {user.id}: {e}")
             raise
 
+    def issue_code(self, user, nonce=None):
+        """
+        صدور کد جدید برای یک جریان ورود و برگرداندن عدد آن
+        در حالت stateless هیچ ردیفی ساخته یا حذف نمی‌شود
+        """
+        if is_stateless_mode():
+            return default_code_generator.make_code(user, nonce)
+        self.filter(user=user, is_used=False).delete()
+        return self.create_verification_code(user).number
+
+    async def aissue_code(self, user, nonce=None):
+        if is_stateless_mode():
+            return default_code_generator.make_code(user, nonce)
+        await self.filter(user=user, is_used=False).adelete()
+        return (await self.acreate(user=user)).number
+
+    def _current_queryset(self, user):
+        return self.filter(user=user, is_used=False, expires_at__gt=timezone.now())
+
+    def current_code(self, user, nonce=None):
+        """کد معتبر فعلی برای ارسال مجدد یا None"""
+        if is_stateless_mode():
+            return default_code_generator.make_code(user, nonce)
+        try:
+            return self._current_queryset(user).latest('created_at').number
+        except self.model.DoesNotExist:
+            return None
+
+    async def acurrent_code(self, user, nonce=None):
+        if is_stateless_mode():
+            return default_code_generator.make_code(user, nonce)
+        try:
+            return (await self._current_queryset(user).alatest('created_at')).number
+        except self.model.DoesNotExist:
+            return None
+
+    def consume(self, user, number, nonce=None):
+        """
+        تأیید و مصرف کد در یک رفت و برگشت به پایگاه داده
+        UPDATE شرطی (is_used=false و expires_at > now) فقط برای یکی از درخواست‌های
+        همزمان یک ردیف را تغییر می‌دهد، پس دو ارسال موازی یک کد هر دو موفق نمی‌شوند.
+        برمی‌گرداند: True اگر کد معتبر بود و مصرف شد
+        """
+        if is_stateless_mode():
+            return self.verify_stateless(user, nonce, number)
+        return self.filter(
+            user=user,
+            number=number,
+            is_used=False,
+            expires_at__gt=Now()
+        ).update(is_used=True) == 1
+
+    def verify_stateless(self, user, nonce, number):
+        """
+        بررسی کد stateless با محاسبه مجدد و ثبت نشانگر یکتای (user, nonce)
+        برمی‌گرداند: False برای کد نادرست یا استفاده مجدد
+        """
+        if default_code_generator.check_code(user, nonce, number) is None:
+            return False
+        try:
+            with transaction.atomic():
+                CodeReplayMarker.objects.create(user=user, nonce=nonce)
+        except IntegrityError:
+            logger.warning(f"Replayed verification code for user {user.pk}")
+            return False
+        return True
+
 class Code(models.Model):
     """
     مدل پیشرفته برای مدیریت کدهای تأیید کاربران
     ویژگی‌ها:
-    - تولید کد 5 رقمی امن
+    - تولید کد عددی امن با طول قابل تنظیم (VERIFICATION_CODE_LENGTH)
     - اعتبارسنجی خودکار
     - مدیریت زمان انقضا
-    - جلوگیری از کدهای تکراری
+    - جلوگیری از کدهای تکراری برای هر کاربر با constraint پایگاه داده
     """
     
     number = models.CharField(
-        max_length=5,
+        max_length=CODE_LENGTH,
         validators=[
-            MinLengthValidator(5),
+            MinLengthValidator(CODE_LENGTH),
             RegexValidator(
                 regex=r'^\d+$',
                 message="کد باید فقط شامل اعداد باشد."
             )
         ],
         verbose_name="کد تأیید",
-        help_text="کد 5 رقمی ارسال شده به کاربر"
+        help_text="کد عددی ارسال شده به کاربر"
     )
     
     user = models.ForeignKey(
@@ -78,13 +154,23 @@ class Code(models.Model):
         verbose_name_plural = "کدهای تأیید"
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['number', 'is_used']),
             models.Index(fields=['expires_at']),
         ]
+        constraints = [
+            # یکتایی فقط بین کدهای استفاده نشده هر کاربر لازم است؛
+            # این ایندکس جزئی همان جستجوی (user, number) در تأیید کد را هم پوشش می‌دهد
+            models.UniqueConstraint(
+                fields=['user', 'number'],
+                condition=models.Q(is_used=False),
+                name='unique_active_code_per_user'
+            ),
+        ]
 
     def __str__(self):
         """نمایش خوانا از کد و کاربر مربوطه با وضعیت اعتبار"""
-        return f"کد {self.number} برای {self.user.username} ({'معتبر' if self.is_valid() else 'منقضی'})"
+        # بدون کوئری اضافه وقتی کاربر از قبل بارگذاری نشده باشد
+        owner = self.user.username if Code.user.is_cached(self) else self.user_id
+        return f"کد {self.number} برای {owner} ({'معتبر' if self.is_valid() else 'منقضی'})"
     
     
     def save(self, *args, **kwargs):
@@ -92,31 +178,33 @@ class Code(models.Model):
         منطق سفارشی ذخیره:
         - تولید کد منحصر به فرد برای رکوردهای جدید
         - تنظیم زمان انقضا
-        - مدیریت شرایط رقابتی
+        - مدیریت شرایط رقابتی با constraint یکتایی به جای کوئری exists
         """
-        if not self.pk:
-            self._generate_unique_code()
-        super().save(*args, **kwargs)
-    
-    def _generate_unique_code(self):
-        """تولید کد منحصر به فرد با مکانیزم بازگشتی"""
-        max_attempts = 20
+        if self.pk:
+            return super().save(*args, **kwargs)
+
+        max_attempts = 5
         for attempt in range(1, max_attempts + 1):
+            self._generate_unique_code()
             try:
                 with transaction.atomic():
-                    code = ''.join(secrets.choice('0123456789') for _ in range(5))
-                    if not Code.objects.filter(number=code, is_used=False).exists():
-                        self.number = code
-                        self.expires_at = timezone.now() + timedelta(minutes=5)
-                        return
-            
-            except Exception as e:
-                logger.warning(f"Attempt {attempt}: Failed to generate code - {str(e)}")
-            
-            if attempt < max_attempts:
-                time.sleep(0.1 * attempt)
-        
-        raise ValueError("امکان تولید کد منحصر به فرد وجود ندارد پس از 20 تلاش")
+                    super().save(*args, **kwargs)
+                CODE_ALLOCATIONS.inc(result='ok')
+                return
+            except IntegrityError as e:
+                CODE_ALLOCATIONS.inc(result='collision')
+                # فقط وقتی رخ می‌دهد که کاربر کد فعال دیگری با همین عدد داشته باشد
+                logger.warning(f"Attempt {attempt}: Code collision for user {self.user_id} - {str(e)}")
+
+        raise ValueError(f"امکان تولید کد منحصر به فرد وجود ندارد پس از {max_attempts} تلاش")
+
+    def _generate_unique_code(self):
+        """
+        تولید کد تصادفی بدون هیچ کوئری
+        یکتایی بین کدهای فعال هر کاربر توسط unique_active_code_per_user تضمین می‌شود
+        """
+        self.number = ''.join(secrets.choice('0123456789') for _ in range(CODE_LENGTH))
+        self.expires_at = timezone.now() + timedelta(minutes=5)
 
     def is_valid(self):
         """بررسی اعتبار کد"""
@@ -127,30 +215,232 @@ class Code(models.Model):
         self.is_used = True
         self.save(update_fields=['is_used'])
 
-@receiver(post_save, sender=CustomUser)
-def handle_user_creation(sender, instance, created, **kwargs):
+class CodeReplayMarker(models.Model):
+    """
+    نشانگر کوچک جلوگیری از استفاده مجدد کد در حالت stateless
+    هر جریان ورود (nonce) فقط یک بار قابل تأیید است.
+    """
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='code_replay_markers',
+        verbose_name="کاربر"
+    )
+
+    nonce = models.CharField(
+        max_length=32,
+        verbose_name="شناسه جریان"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاریخ ایجاد"
+    )
+
+    class Meta:
+        verbose_name = "نشانگر استفاده از کد"
+        verbose_name_plural = "نشانگرهای استفاده از کد"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'nonce'], name='unique_code_replay_marker'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.nonce}"
+
+
+class ArchivedCode(models.Model):
+    """
+    بایگانی فشرده کدهای پاک شده
+    خود عدد کد نگهداری نمی‌شود و کاربر بدون کلید خارجی ذخیره می‌شود
+    تا حذف کاربر یا کد روی این جدول هزینه‌ای نداشته باشد.
+    """
+
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="شناسه کد"
+    )
+
+    user_id = models.BigIntegerField(
+        db_index=True,
+        verbose_name="شناسه کاربر"
+    )
+
+    created_at = models.DateTimeField(
+        verbose_name="تاریخ ایجاد"
+    )
+
+    expires_at = models.DateTimeField(
+        verbose_name="تاریخ انقضا"
+    )
+
+    was_used = models.BooleanField(
+        verbose_name="استفاده شده"
+    )
+
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاریخ بایگانی"
+    )
+
+    class Meta:
+        verbose_name = "کد بایگانی شده"
+        verbose_name_plural = "کدهای بایگانی شده"
+
+    def __str__(self):
+        return f"کد {self.id} کاربر {self.user_id}"
+
+
+class SmsOutboxManager(models.Manager):
+    """مدیریت صف خروجی پیامک‌ها"""
+
+    def enqueue(self, phone_number, message):
+        """افزودن پیامک به صف برای ارسال توسط worker"""
+        return self.create(phone_number=phone_number, message=message)
+
+    async def aenqueue(self, phone_number, message):
+        return await sync_to_async(self.enqueue)(phone_number, message)
+
+    def claim_batch(self, size, lease_seconds=60):
+        """
+        رزرو دسته‌ای از پیامک‌های آماده ارسال برای یک worker
+        - روی PostgreSQL با SKIP LOCKED چند worker با هم تداخل ندارند
+        - پیامک‌هایی که worker آن‌ها از کار افتاده پس از پایان lease دوباره برداشته می‌شوند
+        """
+        now = timezone.now()
+        ready = (
+            models.Q(status=SmsOutbox.STATUS_PENDING, next_attempt_at__lte=now) |
+            models.Q(status=SmsOutbox.STATUS_SENDING, locked_at__lt=now - timedelta(seconds=lease_seconds))
+        )
+        with transaction.atomic():
+            batch = list(
+                self.select_for_update(skip_locked=True)
+                .filter(ready)
+                .order_by('next_attempt_at', 'id')[:size]
+            )
+            if batch:
+                self.filter(pk__in=[msg.pk for msg in batch]).update(
+                    status=SmsOutbox.STATUS_SENDING,
+                    locked_at=now
+                )
+        return batch
+
+
+class SmsOutbox(models.Model):
     """
-    سیگنال برای ایجاد خودکار کد تأیید هنگام ثبت نام کاربر جدید
+    صف پایدار پیامک‌های خروجی
     ویژگی‌ها:
-    - غیرفعال کردن موقت سیگنال برای جلوگیری از حلقه بی‌نهایت
-    - مدیریت تراکنش
-    - لاگ خطاها
+    - ثبت پیامک در درخواست کاربر و ارسال آن در پس‌زمینه (manage.py sms_worker)
+    - ثبت تعداد تلاش‌ها، خطای آخر و پاسخ پنل
+    - زمان‌بندی تلاش مجدد با تأخیر افزایشی
+    - پاک شدن متن پیامک (شامل کد) پس از ارسال یا شکست نهایی؛
+      ردیف‌های تمام شده توسط purge_codes حذف می‌شوند
     """
-    if created:
-        try:
-            # غیرفعال کردن موقت سیگنال
-            post_save.disconnect(handle_user_creation, sender=CustomUser)
-            
-            with transaction.atomic():
-                # حذف کدهای قدیمی (در صورت وجود)
-                Code.objects.filter(user=instance).delete()
-                # ایجاد کد جدید
-                Code.objects.create_verification_code(user=instance)
-        
-        except Exception as e:
-            logger.error(f"Error creating verification code for user {instance.id}: {e}")
-            raise
-        
-        finally:
-            # اتصال مجدد سیگنال
-            post_save.connect(handle_user_creation, sender=CustomUser)
\ No newline at end of file
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'در صف'),
+        (STATUS_SENDING, 'در حال ارسال'),
+        (STATUS_SENT, 'ارسال شده'),
+        (STATUS_FAILED, 'ناموفق'),
+    )
+
+    phone_number = models.CharField(
+        max_length=11,
+        verbose_name="شماره تلفن"
+    )
+
+    message = models.TextField(
+        verbose_name="متن پیامک"
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="وضعیت"
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="تعداد تلاش"
+    )
+
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="زمان تلاش بعدی"
+    )
+
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="زمان رزرو توسط worker"
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="آخرین خطا"
+    )
+
+    provider_response = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="پاسخ پنل پیامک"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاریخ ایجاد"
+    )
+
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="تاریخ ارسال"
+    )
+
+    objects = SmsOutboxManager()
+
+    class Meta:
+        verbose_name = "پیامک خروجی"
+        verbose_name_plural = "صف پیامک‌های خروجی"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"پیامک به {self.phone_number} ({self.get_status_display()})"
+
+    def mark_as_sent(self, response):
+        """ثبت ارسال موفق و پاک کردن متن پیامک"""
+        SmsOutbox.objects.filter(pk=self.pk).update(
+            status=SmsOutbox.STATUS_SENT,
+            message='',
+            attempts=self.attempts + 1,
+            provider_response=str(response)[:255],
+            last_error='',
+            locked_at=None,
+            sent_at=timezone.now()
+        )
+
+    def mark_as_failed(self, error, max_attempts, retry_delay):
+        """ثبت ارسال ناموفق و زمان‌بندی تلاش مجدد با تأخیر نمایی"""
+        attempts = self.attempts + 1
+        status = SmsOutbox.STATUS_FAILED if attempts >= max_attempts else SmsOutbox.STATUS_PENDING
+        # پس از شکست نهایی متن پیامک دیگر لازم نیست
+        redacted = {'message': ''} if status == SmsOutbox.STATUS_FAILED else {}
+        SmsOutbox.objects.filter(pk=self.pk).update(
+            status=status,
+            **redacted,
+            attempts=attempts,
+            last_error=str(error),
+            locked_at=None,
+            next_attempt_at=timezone.now() + timedelta(seconds=retry_delay * 2 ** (attempts - 1))
+        )
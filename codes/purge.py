@@ -0,0 +1,120 @@
+"""
+پاک‌سازی کدهای منقضی و استفاده شده
+
+حذف در دسته‌های محدود کلید اصلی انجام می‌شود تا هر DELETE فقط چند هزار
+ردیف را از طریق ایندکس کلید اصلی قفل کند و تراکنش‌ها کوتاه بمانند.
+"""
+import time
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ArchivedCode, Code, CodeReplayMarker, SmsOutbox
+
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_in_batches(queryset, condition, batch_size, sleep, archive=None, progress=None):
+    """
+    حذف ردیف‌های منطبق با condition در دسته‌های batch_size تایی
+    هر دسته کلیدهای بعدی منطبق را از آخرین کلید حذف شده به بعد پیدا می‌کند،
+    پس هزینه به تعداد ردیف‌های قابل حذف بستگی دارد، نه اندازه جدول.
+    archive: تابعی که پیش از حذف، ردیف‌های هر دسته را بایگانی می‌کند
+    """
+    deleted = 0
+    last = None
+    while True:
+        matching = queryset.filter(condition)
+        if last is not None:
+            matching = matching.filter(pk__gt=last)
+        keys = list(matching.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            break
+        last = keys[-1]
+        window = queryset.filter(condition, pk__in=keys)
+        with transaction.atomic():
+            if archive:
+                archive(window)
+            count, _ = window.delete()
+        deleted += count
+        if progress and count:
+            progress(deleted)
+        if len(keys) < batch_size:
+            break
+        if sleep and count:
+            time.sleep(sleep)
+    return deleted
+
+
+def _archive_codes(window):
+    ArchivedCode.objects.bulk_create(
+        [
+            ArchivedCode(
+                id=pk,
+                user_id=user_id,
+                created_at=created_at,
+                expires_at=expires_at,
+                was_used=is_used
+            )
+            for pk, user_id, created_at, expires_at, is_used in window.values_list(
+                'pk', 'user_id', 'created_at', 'expires_at', 'is_used'
+            )
+        ],
+        ignore_conflicts=True
+    )
+
+
+def purge_codes(batch_size=1000, sleep=0.0, archive=False, grace=timedelta(0), progress=None):
+    """
+    حذف کدهای استفاده شده و کدهای منقضی (قدیمی‌تر از grace)
+    و نشانگرهای تکرار حالت stateless که از عمر تیکت جریان به اضافه پنجره اعتبار گذشته‌اند
+    و پیامک‌های ارسال شده یا ناموفق صف خروجی (قدیمی‌تر از grace).
+    برمی‌گرداند: دیکشنری شامل تعداد حذف شده‌ها، مدت زمان و سرعت (ردیف در ثانیه)
+    """
+    started = time.monotonic()
+    now = timezone.now()
+
+    codes = _delete_in_batches(
+        Code.objects.all(),
+        Q(is_used=True) | Q(expires_at__lt=now - grace),
+        batch_size,
+        sleep,
+        archive=_archive_codes if archive else None,
+        progress=progress
+    )
+
+    # نشانگر باید از تیکت جریان (core.flow) بیشتر بماند؛ وگرنه ارسال مجدد با همان
+    # تیکت و nonce پس از حذف نشانگر، کدی تازه می‌سازد که دوباره تأیید می‌شود
+    code_window = (
+        getattr(settings, 'STATELESS_CODE_STEP', 60) *
+        getattr(settings, 'STATELESS_CODE_VALID_STEPS', 5)
+    )
+    marker_ttl = max(getattr(settings, 'AUTH_FLOW_TICKET_MAX_AGE', 600), code_window) + code_window
+    markers = _delete_in_batches(
+        CodeReplayMarker.objects.all(),
+        Q(created_at__lt=now - timedelta(seconds=marker_ttl) - grace),
+        batch_size,
+        sleep
+    )
+
+    outbox = _delete_in_batches(
+        SmsOutbox.objects.all(),
+        Q(status__in=(SmsOutbox.STATUS_SENT, SmsOutbox.STATUS_FAILED), created_at__lt=now - grace),
+        batch_size,
+        sleep
+    )
+
+    elapsed = time.monotonic() - started
+    result = {
+        'codes': codes,
+        'replay_markers': markers,
+        'outbox': outbox,
+        'archived': archive,
+        'seconds': elapsed,
+        'rows_per_second': (codes + markers + outbox) / elapsed if elapsed else 0.0,
+    }
+    logger.info(f"Purged {codes} codes, {markers} replay markers and {outbox} outbox messages in {elapsed:.2f}s")
+    return result
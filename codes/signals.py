@@ -1,5 +1,6 @@
+from django.conf import settings  # تنظیمات پروژه
 from django.db.models.signals import post_save  # ایمپورت سیگنال post_save جنگو
-from codes.models import Code  # مدل Code
+from codes.models import Code, is_stateless_mode  # مدل Code
 from users.models import CustomUser  # مدل CustomUser
 from django.dispatch import receiver  # دکوراتور برای ثبت دریافت‌کننده سیگنال
 from django.db import transaction  # برای مدیریت تراکنش‌های دیتابیس
@@ -9,24 +10,36 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-@receiver(post_save, sender=CustomUser)
+PROVISIONING_OFF = 'off'
+PROVISIONING_LAZY = 'lazy'
+PROVISIONING_EAGER = 'eager'
+
+
+def provision_code(user):
+    """ایجاد کد تأیید برای کاربر جدید با ثبت خطا"""
+    try:
+        Code.objects.create_verification_code(user=user)
+    except Exception as e:
+        logger.error(f"خطا در ایجاد کد برای کاربر {user.id}: {e}")
+        raise
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='codes.post_save_generate_code')
 def post_save_generate_code(sender, instance, created, *args, **kwargs):
     """
-    تابعی که پس از ذخیره مدل CustomUser اجرا می‌شود.
-    - اگر کاربر جدید ایجاد شده باشد (created=True)، یک کد تأیید برایش می‌سازد.
+    تنها دریافت‌کننده post_save برای ایجاد کد تأیید کاربر جدید.
+    رفتار با تنظیم CODE_PROVISIONING تعیین می‌شود:
+    - off: هیچ کدی ساخته نمی‌شود؛ اولین ورود کد را صادر می‌کند (پیش‌فرض)
+    - lazy: ایجاد کد پس از commit شدن تراکنش ثبت‌نام (transaction.on_commit)
+    - eager: ایجاد کد بلافاصله در همان تراکنش ثبت‌نام
+    سیگنال هیچ‌وقت قطع و وصل نمی‌شود، پس در سرورهای چندنخی رقابتی وجود ندارد.
     """
-     # فقط برای کاربران جدید (نه هنگام آپدیت)
-    if created:
-        try:
-            # غیرفعال کردن موقت سیگنال
-            post_save.disconnect(post_save_generate_code, sender=CustomUser)
-            
-            with transaction.atomic():
-                Code.objects.filter(user=instance).delete()
-                Code.objects.create(user=instance)
-        except Exception as e:
-            logger.error(f"خطا در ایجاد کد برای کاربر {instance.id}: {e}")
-            raise
-        finally:
-            # اتصال مجدد سیگنال در هر حالت
-            post_save.connect(post_save_generate_code, sender=CustomUser)
\ No newline at end of file
+    # فقط برای کاربران جدید (نه هنگام آپدیت)
+    if not created or is_stateless_mode():
+        return
+
+    mode = getattr(settings, 'CODE_PROVISIONING', PROVISIONING_OFF)
+    if mode == PROVISIONING_LAZY:
+        transaction.on_commit(lambda: provision_code(instance))
+    elif mode == PROVISIONING_EAGER:
+        provision_code(instance)
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.paginator import EstimatedCountPaginator
+from users.models import CustomUser
+from ..models import Code
+
+
+@override_settings(
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class CodeAdminTest(TestCase):
+    url = '/admin/codes/code/'
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='testpass123', email='admin@example.com', phone_number='09120000000'
+        )
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        for i in range(6):
+            user = CustomUser.objects.create_user(
+                username=f'codeuser{i}', password='testpass123', phone_number=f'0912345678{i}'
+            )
+            code = Code.objects.create(user=user)
+            # save() همیشه انقضای 5 دقیقه‌ای می‌گذارد
+            Code.objects.filter(pk=code.pk).update(expires_at=now + timedelta(minutes=(i - 3) * 2 + 1))
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """تست ثابت بودن تعداد کوئری‌ها مستقل از تعداد ردیف‌ها"""
+        _, before = self.changelist_queries()
+        user = CustomUser.objects.create_user(username='extra', password='x', phone_number='09129999999')
+        Code.objects.create(user=user)
+        _, after = self.changelist_queries()
+        self.assertEqual(before, after)
+
+    def test_sort_by_validity_and_remaining(self):
+        """تست مرتب‌سازی بر اساس ستون‌های محاسبه شده در SQL"""
+        response, _ = self.changelist_queries(o='-6')
+        flags = [obj.is_valid_flag for obj in response.context['cl'].result_list]
+        self.assertEqual(flags, sorted(flags, reverse=True))
+
+        response, _ = self.changelist_queries(o='7')
+        remaining = [obj.remaining for obj in response.context['cl'].result_list]
+        self.assertEqual(remaining, sorted(remaining))
+
+    def test_bulk_actions_single_statement(self):
+        """تست اجرای عملیات گروهی با یک دستور"""
+        pks = list(Code.objects.values_list('pk', flat=True))
+        for action, verb in (('invalidate_codes', 'UPDATE'), ('purge_expired_codes', 'DELETE')):
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(self.url, {'action': action, '_selected_action': pks})
+            statements = [q['sql'] for q in context.captured_queries if q['sql'].startswith(verb)]
+            self.assertEqual(len(statements), 1)
+
+        self.assertFalse(Code.objects.filter(is_used=False).exists())
+        self.assertEqual(Code.objects.count(), 3)
+
+    def test_paginator_counts_exactly_off_postgres(self):
+        """تست شمارش دقیق روی دیتابیس غیر PostgreSQL"""
+        self.assertEqual(EstimatedCountPaginator(Code.objects.all(), 2).count, 6)
@@ -0,0 +1,136 @@
+import asyncio
+import httpx
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import include, path
+from core.utils import AsyncRemotePost, get_async_sms_client
+from core.views import home_view
+from users import urls as users_urls
+from users import views as users_views
+from users.models import CustomUser
+from .. import views
+from ..models import Code, SmsOutbox
+
+
+# همان URLها با نسخه‌های async (ASYNC_AUTH_VIEWS=1)
+urlpatterns = [
+    path('', home_view, name='home'),
+    path('codes/', include(([
+        path('verify/', views.async_verify_view, name='verify'),
+        path('verify-password-change/', views.async_verify_password_change_view, name='verify_password_change'),
+    ], 'codes'))),
+    path('users/', include(([
+        path('login/', users_views.async_auth_view, name='login'),
+        *[pattern for pattern in users_urls.urlpatterns if pattern.name != 'login'],
+    ], 'users'))),
+]
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    VERIFICATION_CODE_MODE='database',
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='asyncuser',
+            password='testpass123',
+            phone_number='09123456730'
+        )
+
+    async def login(self):
+        response = await self.async_client.post('/users/login/', {'username': 'asyncuser', 'password': 'testpass123'})
+        self.assertRedirects(response, '/codes/verify/', fetch_redirect_response=False)
+        return await Code.objects.acurrent_code(self.user)
+
+    async def test_login_and_verify(self):
+        """تست ورود و تأیید کد با نماهای async"""
+        number = await self.login()
+        self.assertIsNotNone(number)
+
+        # کد تازه ارسال شده؛ ارسال مجدد محدود است
+        response = await self.async_client.get('/codes/verify/')
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.post('/codes/verify/', {'code': number})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertFalse(await Code.objects.filter(user=self.user, is_used=False).aexists())
+
+    async def test_login_queues_code_through_enqueue(self):
+        """تست صف کردن پیامک کد در نمای async با همان SmsOutbox.objects.enqueue"""
+        with mock.patch.object(SmsOutbox.objects, 'enqueue', wraps=SmsOutbox.objects.enqueue) as enqueue:
+            number = await self.login()
+        enqueue.assert_called_once()
+        message = await SmsOutbox.objects.aget(phone_number='09123456730')
+        self.assertIn(number, message.message)
+
+    async def test_wrong_password(self):
+        """تست رد رمز اشتباه در نمای async ورود"""
+        response = await self.async_client.post('/users/login/', {'username': 'asyncuser', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(await Code.objects.acurrent_code(self.user))
+
+    async def test_verify_password_change_methods(self):
+        """تست رد متدهای غیر GET/POST و نبود تیکت در تأیید تغییر رمز"""
+        response = await self.async_client.put('/codes/verify-password-change/')
+        self.assertEqual(response.status_code, 405)
+        response = await self.async_client.get('/codes/verify-password-change/')
+        self.assertRedirects(response, '/users/change-password/', fetch_redirect_response=False)
+
+    async def test_issue_code_replaces_previous(self):
+        """تست صدور کد جدید با aissue_code و حذف کد قبلی"""
+        await Code.objects.aissue_code(self.user)
+        second = await Code.objects.aissue_code(self.user)
+        self.assertEqual(await Code.objects.acurrent_code(self.user), second)
+        self.assertEqual(await Code.objects.filter(user=self.user).acount(), 1)
+
+
+@override_settings(SMS_CONFIG={'BASE_URL': 'http://sms.test/', 'MAX_RETRIES': 2, 'RETRY_BACKOFF': 0})
+class AsyncRemotePostTest(SimpleTestCase):
+    def client_with(self, handler):
+        client = AsyncRemotePost()
+        client.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return client
+
+    def test_send_code(self):
+        """تست ارسال کد و عدم تلاش مجدد پس از خطای 5xx"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200 if len(requests) == 1 else 502, text='5001')
+
+        client = self.client_with(handler)
+        self.assertEqual(asyncio.run(client.send_code('09123456789', 'text')), '5001')
+        self.assertIsNone(asyncio.run(client.send_code('09123456789', 'text')))
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0].url.path, '/AutoSendCode.ashx')
+        self.assertEqual(client.stats()['retry'], {'requests': 2, 'retries': 0, 'failures': 1})
+
+    def test_connect_errors_are_retried(self):
+        """تست تلاش مجدد وقتی اتصال برقرار نشده"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, text='5001')
+
+        self.assertEqual(asyncio.run(self.client_with(handler).send_code('09123456789', 'text')), '5001')
+        self.assertEqual(len(calls), 2)
+
+    def test_client_per_event_loop(self):
+        """تست کلاینت جداگانه برای هر event loop"""
+        async def pair():
+            return get_async_sms_client(), get_async_sms_client()
+
+        first, again = asyncio.run(pair())
+        second, _ = asyncio.run(pair())
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from users.models import CustomUser
+from ..forms import CodeVerificationForm
+from ..models import Code
+
+
+class CodeVerificationFormTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser(pk=1, username='formuser')
+
+    def test_concurrent_wrong_codes_are_capped(self):
+        """تست اینکه از کدهای اشتباه همزمان حداکثر به اندازه سقف به consume می‌رسند"""
+        calls = []
+
+        def consume(user, code, nonce=None):
+            calls.append(code)
+            return False
+
+        def verify(i):
+            return CodeVerificationForm(user=self.user, data={'code': f'{i:05d}'}).is_valid()
+
+        with mock.patch.object(Code.objects, 'consume', side_effect=consume):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(verify, range(20)))
+
+        self.assertFalse(any(results))
+        self.assertEqual(len(calls), 5)
+
+    def test_success_resets_attempts(self):
+        """تست صفر شدن شمارش تلاش‌ها پس از تأیید موفق"""
+        with mock.patch.object(Code.objects, 'consume', return_value=False):
+            for i in range(4):
+                self.assertFalse(CodeVerificationForm(user=self.user, data={'code': '00000'}).is_valid())
+        with mock.patch.object(Code.objects, 'consume', return_value=True):
+            self.assertTrue(CodeVerificationForm(user=self.user, data={'code': '12345'}).is_valid())
+        with mock.patch.object(Code.objects, 'consume', return_value=False) as consume:
+            for i in range(5):
+                CodeVerificationForm(user=self.user, data={'code': '00000'}).is_valid()
+        self.assertEqual(consume.call_count, 5)
@@ -1,6 +1,5 @@
 import random
 from django.test import TestCase
-from codes.signals import post_save_generate_code
 from users.models import CustomUser
 from ..models import Code
 from django.utils import timezone
@@ -10,39 +9,25 @@ from django.test import TransactionTestCase
 from django.core.exceptions import ValidationError
 from concurrent.futures import ThreadPoolExecutor
 import threading
-from django.db import connections, transaction
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
 from django.test import override_settings
 
 @override_settings(
     AUTH_USER_MODEL='users.CustomUser',
-    AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend']
+    AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+    CODE_PROVISIONING='off'
 )
 
 
 class CodeModelTest(TransactionTestCase):
     def setUp(self):
-        # غیرفعال کردن سیگنال‌ها در طول تست
-        from django.db.models import signals
-        signals.post_save.disconnect(
-            receiver=post_save_generate_code,
-            sender=CustomUser
-        )
-        
         self.user = CustomUser.objects.create_user(
             username='testuser',
             password='testpass123',
             phone_number='09123456789'
         )
         Code.objects.filter(user=self.user).delete()
-            
-
-    def tearDown(self):
-        # اتصال مجدد سیگنال‌ها پس از تست
-        from django.db.models import signals
-        signals.post_save.connect(
-            receiver=post_save_generate_code,
-            sender=CustomUser
-        )
 
 
     def test_code_creation(self):
@@ -111,6 +96,76 @@ class CodeModelTest(TransactionTestCase):
         self.assertEqual(success_count, 10, f"خطاها: {exceptions}")
     
     
+    def allocate_concurrently(self, users):
+        """تولید همزمان کد برای کاربران داده شده؛ کوئری‌های SELECT را برمی‌گرداند"""
+        selects = []
+        lock = threading.Lock()
+
+        def allocate(user):
+            with CaptureQueriesContext(connection) as ctx:
+                Code.objects.create(user=user)
+            with lock:
+                selects.extend(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT'))
+            connection.close()
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            for future in [executor.submit(allocate, user) for user in users]:
+                future.result()
+
+        return selects
+
+    def test_allocation_without_probe_under_load(self):
+        """تست تولید کد بدون SELECT بررسی تکراری با افزایش تعداد کدهای فعال"""
+        def make_users(prefix, count):
+            return CustomUser.objects.bulk_create([
+                CustomUser(username=f'{prefix}_{i}', phone_number=f'09{prefix}{i:07d}', password='!')
+                for i in range(count)
+            ])
+
+        self.assertEqual(self.allocate_concurrently(make_users('10', 20)), [])
+
+        # 20 هزار کد فعال برای کاربران دیگر؛ یکتایی به ازای هر کاربر است پس برخوردی نمی‌سازند،
+        # ولی تولید کد با بزرگ شدن جدول هم نباید آن را جستجو کند.
+        # زمان تولید و برخوردها در benchmarks/allocation.py اندازه‌گیری می‌شوند
+        owners = make_users('20', 200)
+        expires_at = timezone.now() + timedelta(minutes=5)
+        Code.objects.bulk_create([
+            Code(user=owner, number=f'{n:05d}', expires_at=expires_at)
+            for owner in owners for n in range(100)
+        ], batch_size=2000)
+
+        self.assertEqual(self.allocate_concurrently(make_users('30', 20)), [])
+
+    def test_consume(self):
+        """تست مصرف کد با یک UPDATE شرطی"""
+        code = Code.objects.create(user=self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(Code.objects.consume(self.user, code.number))
+        code.refresh_from_db()
+        self.assertTrue(code.is_used)
+        # کد استفاده شده
+        self.assertFalse(Code.objects.consume(self.user, code.number))
+
+        # کد منقضی شده
+        expired = Code.objects.create(user=self.user)
+        Code.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertFalse(Code.objects.consume(self.user, expired.number))
+
+    def test_concurrent_consume(self):
+        """تست اینکه از چند ارسال همزمان یک کد فقط یکی موفق می‌شود"""
+        code = Code.objects.create(user=self.user)
+
+        def consume(_):
+            try:
+                return Code.objects.consume(self.user, code.number)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(consume, range(10)))
+
+        self.assertEqual(results.count(True), 1)
+
     def test_string_representation(self):
         """تست نمایش رشته‌ای مدل"""
         code = Code.objects.create(user=self.user)
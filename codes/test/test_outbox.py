@@ -0,0 +1,67 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.helper import queue_verification_code
+from users.models import CustomUser
+from ..models import SmsOutbox
+
+
+@override_settings(
+    SMS_OUTBOX={'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 60},
+    SMS_BACKEND='core.sms.backends.trez.SmsBackend',
+)
+class SmsOutboxTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='outboxuser',
+            password='testpass123',
+            phone_number='09123456700'
+        )
+
+    def run_worker(self):
+        call_command('sms_worker', once=True, stdout=StringIO())
+
+    def test_queue_does_not_call_panel(self):
+        """تست اینکه ثبت کد در صف هیچ درخواستی به پنل پیامک نمی‌فرستد"""
+        with mock.patch('core.utils.RemotePost.send_code') as send_code:
+            self.assertTrue(queue_verification_code(self.user, '12345'))
+        send_code.assert_not_called()
+
+        message = SmsOutbox.objects.get()
+        self.assertEqual(message.phone_number, self.user.phone_number)
+        self.assertIn('12345', message.message)
+        self.assertEqual(message.status, SmsOutbox.STATUS_PENDING)
+
+    def test_worker_marks_message_as_sent(self):
+        """تست ارسال موفق پیامک توسط worker"""
+        SmsOutbox.objects.enqueue(self.user.phone_number, 'test')
+        with mock.patch('core.utils.RemotePost.send_code', return_value='987654'):
+            self.run_worker()
+
+        message = SmsOutbox.objects.get()
+        self.assertEqual(message.status, SmsOutbox.STATUS_SENT)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.provider_response, '987654')
+        self.assertIsNotNone(message.sent_at)
+        self.assertEqual(message.message, '')
+
+    def test_worker_retries_then_fails(self):
+        """تست ثبت خطا، تلاش مجدد و در نهایت وضعیت ناموفق"""
+        SmsOutbox.objects.enqueue(self.user.phone_number, 'test')
+        with mock.patch('core.utils.RemotePost.send_code', return_value=None):
+            self.run_worker()
+            message = SmsOutbox.objects.get()
+            self.assertEqual(message.status, SmsOutbox.STATUS_PENDING)
+            self.assertEqual(message.attempts, 1)
+            self.assertTrue(message.last_error)
+            self.assertEqual(message.message, 'test')
+
+            SmsOutbox.objects.update(next_attempt_at=timezone.now())
+            self.run_worker()
+
+        message = SmsOutbox.objects.get()
+        self.assertEqual(message.status, SmsOutbox.STATUS_FAILED)
+        self.assertEqual(message.attempts, 2)
+        self.assertEqual(message.message, '')
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from users.models import CustomUser
+from ..models import ArchivedCode, Code, CodeReplayMarker, SmsOutbox
+from ..purge import purge_codes
+
+
+class PurgeCodesTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='purgeuser',
+            password='testpass123',
+            phone_number='09123456720'
+        )
+        Code.objects.all().delete()
+        self.valid = Code.objects.create(user=self.user)
+        self.used = Code.objects.create(user=self.user)
+        Code.objects.filter(pk=self.used.pk).update(is_used=True)
+        self.expired = [Code.objects.create(user=self.user) for _ in range(3)]
+        Code.objects.filter(pk__in=[code.pk for code in self.expired]).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_purge_keeps_valid_codes(self):
+        """تست حذف کدهای استفاده شده و منقضی در دسته‌های کوچک"""
+        result = purge_codes(batch_size=2)
+        self.assertEqual(result['codes'], 4)
+        self.assertEqual(list(Code.objects.values_list('pk', flat=True)), [self.valid.pk])
+        self.assertFalse(ArchivedCode.objects.exists())
+
+    def test_batches_follow_matching_rows(self):
+        """تست تعداد دسته‌ها متناسب با ردیف‌های قابل حذف، نه بازه کلیدها"""
+        # فاصله بزرگ کلید اصلی بین کدها
+        Code.objects.filter(pk=self.valid.pk).update(id=self.valid.pk + 100000)
+        with CaptureQueriesContext(connection) as context:
+            purge_codes(batch_size=2)
+        deletes = [q for q in context.captured_queries
+                   if q['sql'].startswith('DELETE') and '"codes_code"' in q['sql']]
+        self.assertEqual(len(deletes), 2)
+
+    def test_purge_with_archive(self):
+        """تست بایگانی کدها پیش از حذف"""
+        purge_codes(batch_size=2, archive=True)
+        archived = ArchivedCode.objects.get(pk=self.used.pk)
+        self.assertTrue(archived.was_used)
+        self.assertEqual(archived.user_id, self.user.pk)
+        self.assertEqual(ArchivedCode.objects.count(), 4)
+
+    def test_purge_replay_markers(self):
+        """تست حذف نشانگرهای قدیمی حالت stateless"""
+        marker = CodeReplayMarker.objects.create(user=self.user, nonce='old')
+        CodeReplayMarker.objects.filter(pk=marker.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        CodeReplayMarker.objects.create(user=self.user, nonce='fresh')
+        self.assertEqual(purge_codes()['replay_markers'], 1)
+        self.assertEqual(list(CodeReplayMarker.objects.values_list('nonce', flat=True)), ['fresh'])
+
+    def test_purge_finished_outbox_messages(self):
+        """تست حذف پیامک‌های ارسال شده و ناموفق و نگهداری پیامک‌های در صف"""
+        pending = SmsOutbox.objects.enqueue(self.user.phone_number, 'code 1')
+        SmsOutbox.objects.enqueue(self.user.phone_number, 'code 2').mark_as_sent('ok')
+        SmsOutbox.objects.enqueue(self.user.phone_number, 'code 3').mark_as_failed('error', 1, 10)
+        self.assertEqual(purge_codes()['outbox'], 2)
+        self.assertEqual(list(SmsOutbox.objects.values_list('pk', flat=True)), [pending.pk])
+
+    def test_command_reports_rate(self):
+        """تست گزارش سرعت حذف توسط دستور مدیریتی"""
+        out = StringIO()
+        call_command('purge_codes', sleep=0, stdout=out)
+        self.assertIn('Deleted 4 codes', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
@@ -1,18 +1,24 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from users.models import CustomUser
 from ..models import Code
 
 class CodeSignalsTest(TestCase):
+    def create_user(self, username, phone_number):
+        return CustomUser.objects.create_user(
+            username=username,
+            password='testpass123',
+            phone_number=phone_number
+        )
+
+    @override_settings(CODE_PROVISIONING='eager')
     def test_code_creation_on_user_creation(self):
         """تست ایجاد خودکار کد هنگام ساخت کاربر جدید"""
         # تعداد کدهای قبل از ایجاد کاربر
         initial_count = Code.objects.count()
         
-        user = CustomUser.objects.create_user(
-            username='newuser',
-            password='testpass123',
-            phone_number='09123456780'
-        )
+        user = self.create_user('newuser', '09123456780')
         
         # باید یک کد جدید ایجاد شده باشد
         self.assertEqual(Code.objects.count(), initial_count + 1)
@@ -21,11 +27,35 @@ class CodeSignalsTest(TestCase):
         code = Code.objects.get(user=user)
         self.assertEqual(code.user, user)
         
-        # تست حذف کدهای قبلی اگر کاربر جدیدی با همان اطلاعات ایجاد شود
-        # (این سناریو بستگی به منطق کسب‌وکار شما دارد)
-        new_user = CustomUser.objects.create_user(
-            username='newuser2',
-            password='testpass123',
-            phone_number='09123456781'  
+        new_user = self.create_user('newuser2', '09123456781')
+        self.assertEqual(Code.objects.filter(user=new_user).count(), 1)
+
+    @override_settings(CODE_PROVISIONING='lazy')
+    def test_lazy_provisioning_waits_for_commit(self):
+        """تست ایجاد کد پس از commit تراکنش ثبت‌نام"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            user = self.create_user('lazyuser', '09123456782')
+            self.assertFalse(Code.objects.filter(user=user).exists())
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertEqual(Code.objects.filter(user=user).count(), 1)
+
+    @override_settings(CODE_PROVISIONING='off')
+    def test_queries_per_registration(self):
+        """تست تعداد کوئری‌های ثبت‌نام: فقط INSERT کاربر"""
+        with self.assertNumQueries(1):
+            self.create_user('offuser', '09123456783')
+        self.assertFalse(Code.objects.exists())
+
+    @override_settings(CODE_PROVISIONING='eager')
+    def test_queries_per_registration_eager(self):
+        """تست تعداد کوئری‌های ثبت‌نام با ایجاد کد: یک INSERT برای هر جدول"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.create_user('eageruser', '09123456784')
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(
+            [q for q in ctx.captured_queries if q['sql'].startswith(('SELECT', 'DELETE'))],
+            []
         )
-        self.assertEqual(Code.objects.filter(user=new_user).count(), 1)
\ No newline at end of file
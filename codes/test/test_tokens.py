@@ -0,0 +1,51 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from users.models import CustomUser
+from ..forms import CodeVerificationForm
+from ..models import Code, CodeReplayMarker
+from ..tokens import default_code_generator, make_nonce
+
+
+@override_settings(VERIFICATION_CODE_MODE='stateless')
+class StatelessCodeTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='statelessuser',
+            password='testpass123',
+            phone_number='09123456710'
+        )
+        Code.objects.all().delete()
+        self.nonce = make_nonce()
+
+    def verify(self, number, nonce=None):
+        form = CodeVerificationForm(user=self.user, nonce=nonce or self.nonce, data={'code': number})
+        return form.is_valid()
+
+    def test_issue_code_without_queries(self):
+        """تست صدور کد بدون هیچ کوئری پایگاه داده"""
+        with self.assertNumQueries(0):
+            number = Code.objects.issue_code(self.user, self.nonce)
+        self.assertEqual(len(number), 5)
+        self.assertTrue(number.isdigit())
+        self.assertFalse(Code.objects.exists())
+
+    def test_valid_code_is_accepted_once(self):
+        """تست پذیرش کد درست فقط یک بار"""
+        number = Code.objects.issue_code(self.user, self.nonce)
+        self.assertTrue(self.verify(number))
+        self.assertEqual(CodeReplayMarker.objects.count(), 1)
+        self.assertFalse(self.verify(number))
+
+    def test_code_bound_to_flow(self):
+        """تست عدم اعتبار کد برای nonce یا کاربر دیگر"""
+        number = Code.objects.issue_code(self.user, self.nonce)
+        self.assertFalse(self.verify(number, nonce=make_nonce()))
+
+    def test_code_expires_after_window(self):
+        """تست انقضای کد پس از پنجره اعتبار"""
+        number = Code.objects.issue_code(self.user, self.nonce)
+        step = default_code_generator._now_step()
+        with mock.patch.object(default_code_generator, '_now_step', return_value=step + 4):
+            self.assertIsNotNone(default_code_generator.check_code(self.user, self.nonce, number))
+        with mock.patch.object(default_code_generator, '_now_step', return_value=step + 5):
+            self.assertIsNone(default_code_generator.check_code(self.user, self.nonce, number))
@@ -0,0 +1,182 @@
+from datetime import timedelta
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core import flow, sms
+from core.flow import make_ticket, read_ticket
+from core.ratelimit import get_limiter
+from users.models import CustomUser
+from ..models import Code, CodeReplayMarker
+from ..purge import purge_codes
+
+
+@override_settings(
+    VERIFICATION_CODE_MODE='database',
+    CODE_PROVISIONING='off',
+    # نوار debug_toolbar کوئری‌ها و پاسخ را تغییر می‌دهد
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+)
+class VerifyViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='verifyuser',
+            password='testpass123',
+            phone_number='09123456789'
+        )
+        self.number = Code.objects.issue_code(self.user, 'nonce')
+        self.client.cookies['auth_flow'] = make_ticket(flow.LOGIN, self.user.pk, 'nonce')
+
+    def writes_to(self, context, table):
+        return [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE')) and f'"{table}"' in q['sql']
+        ]
+
+    def test_verify_writes_user_row_once(self):
+        """تست نوشتن یک‌باره ردیف کاربر و کد پس از تایید"""
+        CustomUser.objects.filter(pk=self.user.pk).update(failed_login_attempts=2)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/codes/verify/', {'code': self.number}, REMOTE_ADDR='10.0.0.7')
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+        self.assertEqual(len(self.writes_to(context, 'users_customuser')), 1)
+        self.assertEqual(len(self.writes_to(context, 'codes_code')), 1)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(self.user.last_login, self.user.last_login_at)
+        self.assertEqual(self.user.last_login_ip, '10.0.0.7')
+        self.assertEqual(self.user.failed_login_attempts, 0)
+        self.assertTrue(Code.objects.get(user=self.user).is_used)
+
+    def test_wrong_code_writes_nothing(self):
+        """تست عدم نوشتن ردیف کاربر با کد اشتباه"""
+        wrong = '0' * len(self.number) if self.number != '0' * len(self.number) else '1' * len(self.number)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/codes/verify/', {'code': wrong})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.writes_to(context, 'users_customuser'), [])
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+    def test_wrong_codes_are_limited(self):
+        """تست رد کد درست پس از چند کد اشتباه پیاپی"""
+        wrong = '0' * len(self.number) if self.number != '0' * len(self.number) else '1' * len(self.number)
+        for _ in range(5):
+            self.client.post('/codes/verify/', {'code': wrong})
+        response = self.client.post('/codes/verify/', {'code': self.number})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Too many wrong codes")
+        self.assertTrue(Code.objects.filter(number=self.number, is_used=False).exists())
+
+    def test_verify_steps_do_not_write_session(self):
+        """تست عدم نوشتن جدول session در مراحل تأیید تا ورود موفق"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/codes/verify/')
+            self.client.post('/codes/verify/', {'code': 'x' * len(self.number)})
+        self.assertEqual(self.writes_to(context, 'django_session'), [])
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post('/codes/verify/', {'code': self.number})
+        self.assertTrue(self.writes_to(context, 'django_session'))
+        self.assertEqual(self.client.cookies['auth_flow'].value, '')
+
+
+@override_settings(
+    VERIFICATION_CODE_MODE='stateless',
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+)
+class StatelessReplayTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='replayuser',
+            password='testpass123',
+            phone_number='09123456786'
+        )
+        self.ticket = make_ticket(flow.LOGIN, self.user.pk, 'nonce')
+        self.client.cookies['auth_flow'] = self.ticket
+
+    def test_ticket_replay_after_purge(self):
+        """تست رد کد ارسال مجدد با تیکت قدیمی پس از purge نشانگرها"""
+        number = Code.objects.current_code(self.user, 'nonce')
+        self.assertRedirects(
+            self.client.post('/codes/verify/', {'code': number}), '/', fetch_redirect_response=False
+        )
+        # پس از پنجره اعتبار کد اما پیش از انقضای تیکت
+        CodeReplayMarker.objects.update(created_at=timezone.now() - timedelta(seconds=400))
+        self.assertEqual(purge_codes()['replay_markers'], 0)
+
+        self.client.logout()
+        self.client.cookies['auth_flow'] = self.ticket
+        self.assertEqual(self.client.get('/codes/verify/').status_code, 200)
+        response = self.client.post('/codes/verify/', {'code': Code.objects.current_code(self.user, 'nonce')})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Invalid or expired verification code")
+
+
+@override_settings(
+    VERIFICATION_CODE_MODE='database',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class PasswordChangeFlowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        sms.outbox.clear()
+        self.user = CustomUser.objects.create_user(
+            username='changeuser',
+            password='testpass123',
+            phone_number='09123456785'
+        )
+        self.client.force_login(self.user)
+
+    def test_password_hash_stays_server_side(self):
+        """تست نگهداری هش رمز جدید در کش (نه کوکی) و اعمال آن پس از تأیید"""
+        response = self.client.post('/users/change-password/', {
+            'old_password': 'testpass123',
+            'new_password1': 'N3w-Passw0rd!',
+            'new_password2': 'N3w-Passw0rd!',
+        })
+        self.assertRedirects(response, '/codes/verify-password-change/', fetch_redirect_response=False)
+        request = RequestFactory().get('/')
+        request.COOKIES['auth_flow'] = self.client.cookies['auth_flow'].value
+        ticket = read_ticket(request, flow.PASSWORD_CHANGE)
+        self.assertTrue(ticket.password.startswith('md5$'))
+        payload = signing.loads(request.COOKIES['auth_flow'], salt=f"{flow.SALT}.{flow.PASSWORD_CHANGE}")
+        self.assertNotIn(ticket.password, str(payload))
+
+        number = Code.objects.get(user=self.user, is_used=False).number
+        response = self.client.post('/codes/verify-password-change/', {'code': number})
+        self.assertRedirects(response, '/users/profile/', fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('N3w-Passw0rd!'))
+        self.assertIsNone(read_ticket(request, flow.PASSWORD_CHANGE))
+
+    def test_change_password_right_after_login(self):
+        """تست باز شدن صفحه تغییر رمز بلافاصله پس از ورود با کد"""
+        self.client.logout()
+        self.client.post('/users/login/', {'username': 'changeuser', 'password': 'testpass123'})
+        number = Code.objects.get(user=self.user, is_used=False).number
+        self.assertRedirects(
+            self.client.post('/codes/verify/', {'code': number}), '/', fetch_redirect_response=False
+        )
+
+        response = self.client.get('/users/change-password/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_redirect_loop_without_pending_ticket(self):
+        """تست عدم بازگشت به صفحه تأیید وقتی تیکت تغییر رمز وجود ندارد"""
+        get_limiter('code_resend').hit(f"{flow.PASSWORD_CHANGE}:{self.user.pk}")
+        response = self.client.get('/users/change-password/')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.cookies['auth_flow'] = make_ticket(flow.PASSWORD_CHANGE, self.user.pk, 'nonce', 'md5$ab$x')
+        response = self.client.get('/users/change-password/')
+        self.assertRedirects(response, '/codes/verify-password-change/', fetch_redirect_response=False)
@@ -0,0 +1,62 @@
+import secrets
+import time
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+class StatelessCodeGenerator:
+    """
+    تولید و بررسی کد تأیید بدون ذخیره در پایگاه داده (شبیه HOTP/TOTP)
+    کد از کلید مخفی سرور، شناسه کاربر، nonce هر جریان ورود و گام زمانی مشتق می‌شود؛
+    بررسی کد فقط محاسبه مجدد آن برای چند گام اخیر است.
+    """
+    key_salt = "codes.tokens.StatelessCodeGenerator"
+    algorithm = "sha256"
+
+    @property
+    def length(self):
+        return getattr(settings, 'VERIFICATION_CODE_LENGTH', 5)
+
+    @property
+    def step(self):
+        return getattr(settings, 'STATELESS_CODE_STEP', 60)
+
+    @property
+    def valid_steps(self):
+        return getattr(settings, 'STATELESS_CODE_VALID_STEPS', 5)
+
+    def _now_step(self):
+        return int(time.time()) // self.step
+
+    def _code_for_step(self, user, nonce, step):
+        digest = salted_hmac(
+            self.key_salt,
+            f"{user.pk}:{nonce}:{step}",
+            algorithm=self.algorithm
+        ).digest()
+        # dynamic truncation مانند RFC 4226
+        offset = digest[-1] & 0x0F
+        value = int.from_bytes(digest[offset:offset + 4], 'big') & 0x7FFFFFFF
+        return str(value % 10 ** self.length).zfill(self.length)
+
+    def make_code(self, user, nonce):
+        """کد گام زمانی فعلی برای این کاربر و جریان"""
+        return self._code_for_step(user, nonce, self._now_step())
+
+    def check_code(self, user, nonce, number):
+        """بررسی کد در پنجره اعتبار؛ گام تطبیق یافته یا None"""
+        if not (user and nonce and number):
+            return None
+        now_step = self._now_step()
+        for step in range(now_step, now_step - self.valid_steps, -1):
+            if constant_time_compare(self._code_for_step(user, nonce, step), number):
+                return step
+        return None
+
+
+default_code_generator = StatelessCodeGenerator()
+
+
+def make_nonce():
+    """nonce تصادفی برای هر جریان ورود یا تغییر رمز"""
+    return secrets.token_urlsafe(12)
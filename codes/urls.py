@@ -1,9 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'codes'
 
 urlpatterns = [
-    path('verify/', views.verify_view, name='verify'),
-    path('verify-password-change/', views.verify_password_change_view, name='verify_password_change'),
+    path('verify/', views.async_verify_view if settings.ASYNC_AUTH_VIEWS else views.verify_view, name='verify'),
+    path(
+        'verify-password-change/',
+        views.async_verify_password_change_view if settings.ASYNC_AUTH_VIEWS else views.verify_password_change_view,
+        name='verify_password_change'
+    ),
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.core.exceptions import ObjectDoesNotExist
-from core.helper import clean_auth_session, get_client_ip, send_verification_code
-from core.settings import CODE_RESEND_TIMEOUT
+from core import flow
+from core.flow import clear_ticket, discard_password, read_ticket
+from core.helper import adispatch_verification_code, dispatch_verification_code
+from core.ratelimit import get_limiter
+from users.auth_cache import aget_auth_user, get_auth_user, invalidate_auth_user
 from users.models import CustomUser
 from django.contrib.auth import login,update_session_auth_hash
 from .forms import CodeVerificationForm
@@ -13,90 +17,140 @@ from .models import Code
 
 @require_http_methods(["GET", "POST"])
 def verify_view(request):
-    """Code verification view with session validation"""
-    if 'pk' not in request.session:
+    """Code verification view; flow state comes from the signed ticket (core.flow)"""
+    ticket = read_ticket(request, flow.LOGIN)
+    if ticket is None:
         messages.warning(request, "Please login first")
-        return redirect('users:login')
+        return clear_ticket(redirect('users:login'))
 
     try:
-        user = CustomUser.objects.get(pk=request.session['pk'])
+        user = get_auth_user(request, ticket.user_pk)
     except ObjectDoesNotExist:
         messages.error(request, "User not found")
-        clean_auth_session(request)
-        return redirect('users:login')
+        return clear_ticket(redirect('users:login'))
 
-    form = CodeVerificationForm(user=user, data=request.POST or None)
+    form = CodeVerificationForm(user=user, nonce=ticket.nonce, data=request.POST or None)
     
+    # form.is_valid() consumes the code (single conditional UPDATE)
     if request.method == "POST" and form.is_valid():
-        code_obj = form.cleaned_data['code']
-        if code_obj.is_valid():
-            code_obj.mark_as_used()
-            login(request, user)
-            
-            user.last_login_ip = get_client_ip(request)
-            user.last_login_at = timezone.now()
-            user.reset_login_attempts()
-            user.save()
-            
-            clean_auth_session(request)
-            messages.success(request, "Successfully logged in!")
-            return redirect('home')
-        messages.error(request, "Invalid or expired code")
-        return redirect('users:login')
+        # users.signals.finalize_login writes the login metadata in one UPDATE
+        login(request, user)
+        
+        messages.success(request, "Successfully logged in!")
+        return clear_ticket(redirect('home'))
 
     # Handle GET requests (code resend logic)
     if request.method == "GET":
-        last_sent = request.session.get('last_code_sent')
-        if last_sent:
-            last_sent_time = timezone.datetime.fromisoformat(last_sent)
-            if (timezone.now() - last_sent_time).seconds < CODE_RESEND_TIMEOUT:
-                messages.info(request, "Code already sent. Please wait before requesting a new one.")
-                return render(request, 'codes/verify.html', {'form': form, 'user': user})
-
-        try:
-            code = Code.objects.filter(
-                user=user,
-                is_used=False,
-                expires_at__gt=timezone.now()
-            ).latest('created_at')
-            send_verification_code(user, code.number)
-            request.session['last_code_sent'] = timezone.now().isoformat()
-            messages.info(request, "Verification code sent")
-        except Code.DoesNotExist:
+        if not get_limiter('code_resend').hit(f"{flow.LOGIN}:{user.pk}"):
+            messages.info(request, "Code already sent. Please wait before requesting a new one.")
+            return render(request, 'codes/verify.html', {'form': form, 'user': user})
+
+        number = Code.objects.current_code(user, ticket.nonce)
+        if number is None:
             messages.error(request, "No valid code found")
-            return redirect('users:login')
+            return clear_ticket(redirect('users:login'))
+        dispatch_verification_code(user, number)
+        messages.info(request, "Verification code sent")
 
     return render(request, 'codes/verify.html', {'form': form, 'user': user})
- 
+
+
+@require_http_methods(["GET", "POST"])
 def verify_password_change_view(request):
     """Password change verification view"""
-    pk = request.session.get('password_change_user_pk')
-    new_password = request.session.get('new_password')
+    ticket = read_ticket(request, flow.PASSWORD_CHANGE)
 
-    if not pk or not new_password:
+    if ticket is None or not ticket.password:
         messages.error(request, "Invalid request")
-        return redirect('password_change')
+        return redirect('users:password_change')
 
     try:
-        user = CustomUser.objects.get(pk=pk)
+        user = get_auth_user(request, ticket.user_pk)
     except CustomUser.DoesNotExist:
         messages.error(request, "User not found")
-        return redirect('password_change')
+        return clear_ticket(redirect('users:password_change'))
 
-    form = CodeVerificationForm(user=user, data=request.POST or None)
+    form = CodeVerificationForm(user=user, nonce=ticket.nonce, data=request.POST or None)
 
     if request.method == "POST" and form.is_valid():
-        code_obj = form.cleaned_data['code']
-        if code_obj.is_valid():
-            code_obj.mark_as_used()
-            user.set_password(new_password)
-            user.save()
-            update_session_auth_hash(request, user)
-            clean_auth_session(request)
-            request.session.pop('new_password', None)
-            request.session.pop('password_change_user_pk', None)
-            messages.success(request, "Password changed successfully.")
-            return redirect('profile')
-        messages.error(request, "Invalid or expired code.")
-
-    return render(request, 'codes/verify_password_change.html', {'form': form})
\ No newline at end of file
+        # already hashed by password_change_view
+        user.password = ticket.password
+        user.save(update_fields=['password'])
+        discard_password(ticket)
+        update_session_auth_hash(request, user)
+        messages.success(request, "Password changed successfully.")
+        return clear_ticket(redirect('users:profile'))
+
+    return render(request, 'codes/verify_password_change.html', {'form': form})
+
+
+async def async_verify_view(request):
+    """ASGI counterpart of verify_view using the async ORM and SMS client"""
+    if request.method not in ("GET", "POST"):
+        return HttpResponseNotAllowed(["GET", "POST"])
+
+    ticket = await sync_to_async(read_ticket)(request, flow.LOGIN)
+    if ticket is None:
+        messages.warning(request, "Please login first")
+        return clear_ticket(redirect('users:login'))
+
+    try:
+        user = await aget_auth_user(request, ticket.user_pk)
+    except ObjectDoesNotExist:
+        messages.error(request, "User not found")
+        return clear_ticket(redirect('users:login'))
+
+    form = CodeVerificationForm(user=user, nonce=ticket.nonce, data=request.POST or None)
+
+    if request.method == "POST" and await sync_to_async(form.is_valid)():
+        await sync_to_async(login)(request, user)
+
+        messages.success(request, "Successfully logged in!")
+        return clear_ticket(redirect('home'))
+
+    # Handle GET requests (code resend logic)
+    if request.method == "GET":
+        if not await sync_to_async(get_limiter('code_resend').hit)(f"{flow.LOGIN}:{user.pk}"):
+            messages.info(request, "Code already sent. Please wait before requesting a new one.")
+            return await sync_to_async(render)(request, 'codes/verify.html', {'form': form, 'user': user})
+
+        number = await Code.objects.acurrent_code(user, ticket.nonce)
+        if number is None:
+            messages.error(request, "No valid code found")
+            return clear_ticket(redirect('users:login'))
+        await adispatch_verification_code(user, number)
+        messages.info(request, "Verification code sent")
+
+    return await sync_to_async(render)(request, 'codes/verify.html', {'form': form, 'user': user})
+
+
+async def async_verify_password_change_view(request):
+    """ASGI counterpart of verify_password_change_view"""
+    if request.method not in ("GET", "POST"):
+        return HttpResponseNotAllowed(["GET", "POST"])
+
+    ticket = await sync_to_async(read_ticket)(request, flow.PASSWORD_CHANGE)
+
+    if ticket is None or not ticket.password:
+        messages.error(request, "Invalid request")
+        return redirect('users:password_change')
+
+    try:
+        user = await aget_auth_user(request, ticket.user_pk)
+    except CustomUser.DoesNotExist:
+        messages.error(request, "User not found")
+        return clear_ticket(redirect('users:password_change'))
+
+    form = CodeVerificationForm(user=user, nonce=ticket.nonce, data=request.POST or None)
+
+    if request.method == "POST" and await sync_to_async(form.is_valid)():
+        # already hashed by password_change_view
+        user.password = ticket.password
+        await CustomUser.objects.filter(pk=user.pk).aupdate(password=user.password)
+        await sync_to_async(invalidate_auth_user)(user.pk)
+        await sync_to_async(discard_password)(ticket)
+        await sync_to_async(update_session_auth_hash)(request, user)
+        messages.success(request, "Password changed successfully.")
+        return clear_ticket(redirect('users:profile'))
+
+    return await sync_to_async(render)(request, 'codes/verify_password_change.html', {'form': form})
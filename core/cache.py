@@ -0,0 +1,191 @@
+"""
+Shared cache backend on a local SQLite file in WAL mode.
+
+Every worker process on the host opens the same file, so throttles and
+lockout counters are shared without running Redis or memcached:
+
+* ``incr``/``decr`` are one ``UPDATE ... RETURNING`` statement and ``add``
+  is one ``INSERT ... ON CONFLICT`` statement. SQLite serialises writers,
+  so concurrent workers never lose updates.
+* Integers are stored natively so they can be incremented in SQL. Anything
+  else is pickled.
+* Expired rows are invisible immediately and deleted during culling. The
+  table is culled every ``CULL_EVERY`` writes once it exceeds
+  ``MAX_ENTRIES`` (Django's usual ``MAX_ENTRIES``/``CULL_FREQUENCY``).
+
+    CACHES = {'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': '/var/run/account/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }}
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+"""
+
+LIVE = "(expires IS NULL OR expires > ?)"
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5.0)
+        self._cull_every = options.get('CULL_EVERY', 100)
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        # one connection per thread, reopened after fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _fetchone(self, sql, params):
+        # fetchall() steps the statement to completion so no read snapshot
+        # or write lock outlives the call
+        rows = self._connection.execute(sql, params).fetchall()
+        return rows[0] if rows else None
+
+    def _expires(self, timeout):
+        # absolute expiry timestamp, None for no timeout
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self._cull_every == 0:
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        count = self._fetchone("SELECT COUNT(*) FROM cache", ())[0]
+        if count > self._max_entries:
+            if self._cull_frequency == 0:
+                connection.execute("DELETE FROM cache")
+            else:
+                # soonest-expiring first; entries without a timeout last
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+                    (count // self._cull_frequency,)
+                )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._fetchone(f"SELECT value FROM cache WHERE key = ? AND {LIVE}", (key, time.time()))
+        return default if row is None else self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ','.join('?' * len(key_map))
+        rows = self._connection.execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND {LIVE}",
+            (*key_map, time.time())
+        ).fetchall()
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, self._encode(value), self._expires(timeout))
+        )
+        self._wrote()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # replaces the row only if it has expired
+        cursor = self._connection.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._encode(value), self._expires(timeout), time.time())
+        )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            f"UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}",
+            (self._expires(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        while True:
+            row = self._fetchone(
+                f"UPDATE cache SET value = value + ? WHERE key = ? AND {LIVE} "
+                "AND typeof(value) = 'integer' RETURNING value",
+                (delta, key, time.time())
+            )
+            if row is not None:
+                return row[0]
+            kind = self._fetchone(f"SELECT typeof(value) FROM cache WHERE key = ? AND {LIVE}", (key, time.time()))
+            if kind is None:
+                raise ValueError(f"Key '{key}' not found")
+            if kind[0] != 'integer':
+                raise TypeError(f"Value for key '{key}' is not an integer")
+            # another process add()ed the key between the two statements
+
+    def _exists(self, key):
+        return self._fetchone(f"SELECT 1 FROM cache WHERE key = ? AND {LIVE}", (key, time.time())) is not None
+
+    def has_key(self, key, version=None):
+        return self._exists(self.make_and_validate_key(key, version=version))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            self._connection.execute(f"DELETE FROM cache WHERE key IN ({placeholders})", keys)
+
+    def clear(self):
+        self._connection.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # connections are kept for the life of the thread, like LocMemCache
+        pass
@@ -0,0 +1,101 @@
+"""
+Signed, expiring ticket carrying the login and password-change flow state.
+
+The flows used to keep ``pk``, ``code_nonce``, ``password_change_user_pk``
+and the plaintext ``new_password`` as separate session keys. Every verify
+request therefore read the session row and usually wrote it back. Now the
+whole state is one compact cookie signed with ``django.core.signing``:
+
+    {'f': flow, 'u': user pk, 'n': code nonce, 'p': 1 if a password is pending}
+
+* The verify views only read the cookie, so resend polls and wrong codes
+  cause no session writes. Only ``login()`` and ``update_session_auth_hash()``
+  write the session, once, on success.
+* The signature covers the flow name, so a login ticket cannot be replayed
+  as a password-change ticket. Tickets expire after
+  ``AUTH_FLOW_TICKET_MAX_AGE`` seconds.
+* The cookie is signed, not encrypted, so the new password never goes
+  into it. Its hash (made before the code is sent, so verify does no
+  hashing) waits in the cache under the user pk and nonce for the ticket's
+  lifetime, and a ticket whose hash is gone is invalid. The cookie is
+  HttpOnly, SameSite=Lax and Secure like the session cookie.
+* Codes are single-use, so a copied ticket is worthless once its code has
+  been consumed. In stateless mode that rests on the nonce's replay
+  marker, which ``codes.purge`` keeps for the ticket lifetime plus the
+  code window, so a resend with an old ticket cannot mint a code that
+  verifies again.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+LOGIN = 'login'
+PASSWORD_CHANGE = 'password_change'
+
+SALT = 'core.flow'
+
+Ticket = namedtuple('Ticket', ('flow', 'user_pk', 'nonce', 'password'))
+
+
+def _cookie_name():
+    return getattr(settings, 'AUTH_FLOW_COOKIE_NAME', 'auth_flow')
+
+
+def _max_age():
+    return getattr(settings, 'AUTH_FLOW_TICKET_MAX_AGE', 600)
+
+
+def _password_key(user_pk, nonce):
+    return f"{SALT}:password:{user_pk}:{nonce}"
+
+
+def make_ticket(flow, user_pk, nonce, password=None):
+    """Signed cookie value for a flow ticket; ``password`` (a hash) stays in the cache"""
+    payload = {'f': flow, 'u': user_pk, 'n': nonce}
+    if password is not None:
+        cache.set(_password_key(user_pk, nonce), password, _max_age())
+        payload['p'] = 1
+    return signing.dumps(payload, salt=f"{SALT}.{flow}", compress=True)
+
+
+def issue_ticket(response, flow, user_pk, nonce, password=None):
+    """Attach the ticket to ``response``, replacing any earlier one"""
+    response.set_cookie(
+        _cookie_name(),
+        make_ticket(flow, user_pk, nonce, password),
+        max_age=_max_age(),
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite='Lax',
+    )
+    return response
+
+
+def read_ticket(request, flow):
+    """The request's ticket for ``flow``, or None if missing, forged or expired"""
+    value = request.COOKIES.get(_cookie_name())
+    if not value:
+        return None
+    try:
+        payload = signing.loads(value, salt=f"{SALT}.{flow}", max_age=_max_age())
+    except signing.BadSignature:
+        return None
+    password = None
+    if payload.get('p'):
+        password = cache.get(_password_key(payload['u'], payload['n']))
+        if password is None:
+            return None
+    return Ticket(payload['f'], payload['u'], payload['n'], password)
+
+
+def discard_password(ticket):
+    """Drop the pending password hash once it has been applied"""
+    cache.delete(_password_key(ticket.user_pk, ticket.nonce))
+
+
+def clear_ticket(response):
+    response.delete_cookie(_cookie_name(), samesite='Lax')
+    return response
@@ -1,14 +1,39 @@
 # core/helpers.py
 from django.conf import settings
 from django.contrib import messages
-from django.core.cache import cache
-from .utils import RemotePost
+from asgiref.sync import sync_to_async
+from codes.models import SmsOutbox
+from .ratelimit import get_limiter
+from .sms import asend_sms, send_sms
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
+def build_verification_message(code):
+    """Return the SMS text carrying a verification code"""
+    sms_footer = getattr(settings, 'SMS_CONFIG', {}).get('FOOTER', 'Your Company')
+    return f"{sms_footer}\nکد: {code}"
+
+
+def deliver_sms(phone_number, message):
+    """
+    Send a single SMS through settings.SMS_BACKEND
+    Args:
+        phone_number: Recipient mobile number
+        message: Text to send
+    Returns:
+        tuple: (success, backend response or error description)
+    """
+    return send_sms(phone_number, message)
+
+
+async def adeliver_sms(phone_number, message):
+    """Async counterpart of deliver_sms"""
+    return await asend_sms(phone_number, message)
+
+
 def send_verification_code(user, code):
     """
     Send verification code via SMS with rate limiting
@@ -19,62 +44,112 @@ def send_verification_code(user, code):
         bool: True if SMS was sent successfully, False otherwise
     """
     try:
-        # Get SMS configuration from settings
-        sms_config = getattr(settings, 'SMS_CONFIG', {})
-        sms_username = sms_config.get('USERNAME', '')
-        sms_password = sms_config.get('PASSWORD', '')
-        sms_footer = sms_config.get('FOOTER', 'Your Company')
-        
-        if not all([sms_username, sms_password]):
-            logger.error("SMS credentials not configured")
+        # Rate limiting check
+        if not get_limiter('sms').hit(user.phone_number):
+            logger.warning(f"SMS rate limited for {user.phone_number}")
             return False
 
-        # Rate limiting check
-        cache_key = f"sms_rate_limit_{user.phone_number}"
-        if cache.get(cache_key):
+        sent, _ = deliver_sms(user.phone_number, build_verification_message(code))
+        return sent
+
+    except Exception as e:
+        logger.exception(f"Error in send_verification_code: {str(e)}")
+        return False
+
+
+def queue_verification_code(user, code):
+    """
+    Queue verification code in the SMS outbox with rate limiting.
+    The message is delivered by the ``sms_worker`` management command,
+    so the request never waits on the SMS panel.
+    Args:
+        user: User object with phone_number
+        code: Verification code to send
+    Returns:
+        bool: True if the SMS was queued, False otherwise
+    """
+    try:
+        if not get_limiter('sms').hit(user.phone_number):
             logger.warning(f"SMS rate limited for {user.phone_number}")
             return False
 
-        # Prepare and send SMS
-        sms = RemotePost(username=sms_username, password=sms_password, footer=sms_footer)
-        footer_with_code = f"{sms_footer}\nکد: {code}"
-        result = sms.send_code(user.phone_number, footer_with_code)
-        
-        # Process response
-        try:
-            if result and int(result) > 2000:
-                logger.info(f"SMS sent to {user.phone_number} | Transaction ID: {result}")
-                cache.set(cache_key, True, 60)  # 1 minute rate limit
-                return True
-            
-            
-            logger.error(f"SMS failed for {user.phone_number}. Response: {result}")
-            # TODO: löschen dieses print
-            print(footer_with_code)
+        SmsOutbox.objects.enqueue(user.phone_number, build_verification_message(code))
+        return True
+
+    except Exception as e:
+        logger.exception(f"Error in queue_verification_code: {str(e)}")
+        return False
+
+
+async def asend_verification_code(user, code):
+    """Async counterpart of send_verification_code"""
+    try:
+        if not await sync_to_async(get_limiter('sms').hit)(user.phone_number):
+            logger.warning(f"SMS rate limited for {user.phone_number}")
             return False
-        except (ValueError, TypeError) as e:
-            logger.error(f"Invalid server response: {result} | Error: {str(e)}")
+
+        sent, _ = await adeliver_sms(user.phone_number, build_verification_message(code))
+        return sent
+
+    except Exception as e:
+        logger.exception(f"Error in asend_verification_code: {str(e)}")
+        return False
+
+
+async def aqueue_verification_code(user, code):
+    """Async counterpart of queue_verification_code"""
+    try:
+        if not await sync_to_async(get_limiter('sms').hit)(user.phone_number):
+            logger.warning(f"SMS rate limited for {user.phone_number}")
             return False
 
+        await SmsOutbox.objects.aenqueue(user.phone_number, build_verification_message(code))
+        return True
+
     except Exception as e:
-        logger.exception(f"Error in send_verification_code: {str(e)}")
+        logger.exception(f"Error in aqueue_verification_code: {str(e)}")
         return False
 
 
-def clean_auth_session(request):
+def _outbox_enabled():
+    return getattr(settings, 'SMS_OUTBOX', {}).get('ENABLED', True)
+
+
+def dispatch_verification_code(user, code):
+    """
+    Deliver a verification code: queue it in the outbox when
+    SMS_OUTBOX['ENABLED'] is set (the default), otherwise send it inline
+    """
+    if _outbox_enabled():
+        return queue_verification_code(user, code)
+    return send_verification_code(user, code)
+
+
+async def adispatch_verification_code(user, code):
+    """Async counterpart of dispatch_verification_code"""
+    if _outbox_enabled():
+        return await aqueue_verification_code(user, code)
+    return await asend_verification_code(user, code)
+
+
+def _login_rate_key(request):
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def is_login_rate_limited(request):
     """
-    Clean authentication-related session data
+    Check whether the client IP already used up its failed login attempts
     Args:
         request: Django request object
+    Returns:
+        bool: True if further attempts should be refused
     """
-    session_keys = [
-        'pk', 'auth_attempts', 'last_code_sent', 
-        'password_change_user_pk', 'new_password',
-        'password_change_code_sent'
-    ]
-    for key in session_keys:
-        if key in request.session:
-            del request.session[key]
+    try:
+        return get_limiter('login_failures').exceeded(_login_rate_key(request))
+    except Exception as e:
+        logger.error(f"Error in is_login_rate_limited: {str(e)}")
+        return False
+
 
 def handle_failed_attempt(request):
     """
@@ -84,19 +159,10 @@ def handle_failed_attempt(request):
     Returns:
         bool: True if rate limit exceeded, False otherwise
     """
-    ip_address = request.META.get('REMOTE_ADDR', 'unknown')
-    cache_key = f"login_attempts_{ip_address}"
+    ip_address = _login_rate_key(request)
     
     try:
-        attempts = cache.get(cache_key, 0) + 1
-        cache.set(
-            cache_key, 
-            attempts, 
-            timeout=getattr(settings, 'LOGIN_ATTEMPT_TIMEOUT', 300)
-        )
-
-        max_attempts = getattr(settings, 'MAX_LOGIN_ATTEMPTS', 5)
-        if attempts >= max_attempts:
+        if not get_limiter('login_failures').hit(ip_address):
             logger.warning(f"Rate limit exceeded for IP: {ip_address}")
             messages.error(request, "Too many attempts. Please try again later.")
             return True
@@ -0,0 +1,269 @@
+"""
+Process-safe metrics in the Prometheus text format.
+
+Recording is a dict update under a lock; nothing touches the disk, the
+cache or the network on the hot path. With several worker processes, set
+``METRICS['DIR']`` to a directory shared by the workers (wiped on deploy).
+Each process then writes its totals to its own file, at most every
+``FLUSH_INTERVAL`` seconds and at exit. ``/metrics`` sums all files at
+scrape time, in the same way as prometheus_client's multiprocess mode.
+Without a directory only the serving process's own numbers are exported.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+_values = {}
+_metrics = {}
+_config = None
+_last_flush = 0.0
+_process_id = f"{os.getpid()}-{int(time.time() * 1000)}"
+
+
+def _settings():
+    global _config
+    if _config is None:
+        config = getattr(settings, 'METRICS', {})
+        _config = {
+            'enabled': config.get('ENABLED', True),
+            'dir': config.get('DIR', ''),
+            'flush_interval': config.get('FLUSH_INTERVAL', 1.0),
+        }
+    return _config
+
+
+def _reset_settings(*, setting, **kwargs):
+    global _config
+    if setting == 'METRICS':
+        _config = None
+
+
+setting_changed.connect(_reset_settings)
+
+
+def _after_fork():
+    # totals inherited from the parent belong to the parent's file
+    global _values, _process_id, _last_flush
+    _values = {}
+    _process_id = f"{os.getpid()}-{int(time.time() * 1000)}"
+    _last_flush = 0.0
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics[name] = self
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels.get(label, '')) for label in self.labelnames))
+
+    def _record(self, labels, update):
+        config = _settings()
+        if not config['enabled']:
+            return
+        key = self._key(labels)
+        with _lock:
+            update(key)
+        if config['dir']:
+            _maybe_flush(config)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        def update(key):
+            _values[key] = _values.get(key, 0) + amount
+        self._record(labels, update)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        index = bisect_left(self.buckets, value)
+
+        def update(key):
+            # per-bucket counts (the last one is +Inf), then sum and count
+            sample = _values.get(key)
+            if sample is None:
+                sample = _values[key] = [0] * (len(self.buckets) + 3)
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+        self._record(labels, update)
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def _snapshot():
+    with _lock:
+        return {key: list(value) if isinstance(value, list) else value for key, value in _values.items()}
+
+
+def _encode(values):
+    return [[name, list(labels), value] for (name, labels), value in values.items()]
+
+
+def flush(config=None):
+    """Write this process's totals to its file in the metrics directory"""
+    global _last_flush
+    config = config or _settings()
+    if not config['dir']:
+        return
+    _last_flush = time.monotonic()
+    os.makedirs(config['dir'], exist_ok=True)
+    path = os.path.join(config['dir'], f"metrics-{_process_id}.json")
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(_encode(_snapshot()), f)
+    os.replace(temporary, path)
+
+
+def _maybe_flush(config):
+    if time.monotonic() - _last_flush >= config['flush_interval']:
+        flush(config)
+
+
+atexit.register(flush)
+
+
+def _merge(total, values):
+    for key, value in values.items():
+        if isinstance(value, list):
+            current = total.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def collect():
+    """Totals across every process sharing the metrics directory"""
+    config = _settings()
+    if not config['dir']:
+        return _snapshot()
+
+    flush(config)
+    total = {}
+    for filename in os.listdir(config['dir']):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(config['dir'], filename)) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        _merge(total, {(name, tuple(labels)): value for name, labels, value in entries})
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = list(zip(labelnames, labels))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)"""
+    values = collect()
+    lines = []
+    for name, metric in sorted(_metrics.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        samples = sorted((labels, value) for (metric_name, labels), value in values.items() if metric_name == name)
+        for labels, value in samples:
+            if metric.kind == 'counter':
+                lines.append(f"{name}_total{_format_labels(metric.labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_format_labels(metric.labelnames, labels, ('le', bound))} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(metric.labelnames, labels)} {value[-2]}")
+            lines.append(f"{name}_count{_format_labels(metric.labelnames, labels)} {value[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics recorded by the project
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "View latency", ('view', 'method', 'status')
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', "SQL statements per request", ('view',), buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    'db_query_seconds_per_request', "Time spent in SQL per request", ('view',)
+)
+SMS_LATENCY = Histogram(
+    'sms_request_duration_seconds', "SMS panel request latency", ('endpoint',)
+)
+SMS_REQUESTS = Counter(
+    'sms_requests', "SMS panel requests by outcome (ok, error, retry, circuit_open)", ('endpoint', 'outcome')
+)
+CODE_ALLOCATIONS = Counter(
+    'code_allocation_attempts', "Verification code allocation attempts (ok, collision)", ('result',)
+)
+LOCKOUTS = Counter(
+    'login_lockouts', "Accounts locked after too many failed logins"
+)
+RATE_LIMIT_HITS = Counter(
+    'rate_limit_hits', "Rate limiter checks (allowed, denied)", ('limiter', 'outcome')
+)
+AUTH_USER_CACHE = Counter(
+    'auth_user_cache', "Auth flow user lookups (request, hit, miss)", ('result',)
+)
+SESSION_OPERATIONS = Counter(
+    'session_operations', "Session store operations (load: cache/db/miss, save: db/skipped, delete, sweep)",
+    ('operation', 'result')
+)
+SESSION_IO = Histogram(
+    'session_io_per_request', "Session cache reads, database reads and database writes per request",
+    ('view', 'kind'), buckets=QUERY_COUNT_BUCKETS
+)
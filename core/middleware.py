@@ -0,0 +1,115 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.metrics import DB_QUERIES, DB_TIME, REQUEST_LATENCY, SESSION_IO
+
+
+class _QueryTimer:
+    """Counts the statements of one request and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+# Connections are per thread and the async ORM runs in sync_to_async's
+# thread, so the timer travels in the request context (copied into that
+# thread) and one wrapper installed on every connection reads it.
+_timer = ContextVar('query_timer', default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def _install(connection):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def _install_all():
+    for alias in connections:
+        _install(connections[alias])
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+class MetricsMiddleware:
+    """
+    Records view latency and the SQL statements each request runs.
+    Views are labelled by URL name, so the label set stays bounded;
+    unresolved paths are grouped under ``<unmatched>``. Session I/O is
+    recorded when the engine counts it (``core.sessions``).
+    Keep it first in MIDDLEWARE so the whole stack is timed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._installed_async = False
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _install_all()
+        timer, started = _QueryTimer(), time.perf_counter()
+        token = _timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self._record(request, response, timer, started)
+        return response
+
+    async def __acall__(self, request):
+        if not self._installed_async:
+            # connections opened before this module was imported; new ones
+            # get the wrapper from connection_created
+            await sync_to_async(_install_all)()
+            self._installed_async = True
+        timer, started = _QueryTimer(), time.perf_counter()
+        token = _timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self._record(request, response, timer, started)
+        return response
+
+    @staticmethod
+    def _record(request, response, timer, started):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else '<unmatched>'
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started, view=view, method=request.method, status=response.status_code
+        )
+        DB_QUERIES.observe(timer.count, view=view)
+        DB_TIME.observe(timer.seconds, view=view)
+        # SessionMiddleware has saved the session by now
+        io = getattr(getattr(request, 'session', None), 'io', None)
+        if io is not None:
+            for kind, count in io.items():
+                SESSION_IO.observe(count, view=view, kind=kind)
@@ -0,0 +1,115 @@
+"""
+Paginators for very large tables.
+
+``EstimatedCountPaginator`` avoids ``SELECT COUNT(*)`` over a whole table by
+reading the planner's row estimate (``pg_class.reltuples``) on PostgreSQL.
+Filtered querysets, small tables and other backends still get an exact
+count, so the numbers are only approximate where an exact count would be
+expensive anyway.
+
+``KeysetChangeList`` replaces admin OFFSET paging with a seek on
+``(keyset_field, pk)`` so deep pages cost the same as the first one.
+"""
+
+from datetime import datetime
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# below this estimate an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_count_threshold = EXACT_COUNT_THRESHOLD
+
+    def estimated_count(self):
+        """Planner estimate for an unfiltered queryset, or None"""
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # -1 means the table was never analyzed
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+
+KEYSET_VAR = 'after'
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Admin changelist paged by seeking past the last row shown.
+
+    Used while the list has the default ``(-keyset_field, -pk)`` ordering;
+    sorting by a column falls back to regular page numbers. The ModelAdmin
+    names the seek column with ``keyset_field`` and should index
+    ``(-keyset_field, -pk)``.
+    """
+
+    def get_queryset(self, request):
+        # read (and drop) the cursor so filter and search links start over
+        self.keyset = self.params.pop(KEYSET_VAR, None)
+        queryset = super().get_queryset(request)
+        self.keyset_paging = ORDER_VAR not in self.params
+        self.unseeked_queryset = queryset
+        if self.keyset_paging and self.keyset:
+            value, pk = self.parse_keyset(self.keyset)
+            field = self.model_admin.keyset_field
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            )
+        return queryset
+
+    def parse_keyset(self, keyset):
+        try:
+            value, pk = keyset.rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except ValueError:
+            raise IncorrectLookupParameters
+
+    def get_results(self, request):
+        if not self.keyset_paging:
+            return super().get_results(request)
+
+        rows = list(self.queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        self.result_list = rows[:self.list_per_page]
+
+        # estimated on large unfiltered tables, see EstimatedCountPaginator
+        self.paginator = self.model_admin.get_paginator(request, self.unseeked_queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.can_show_all = False
+        self.multi_page = has_next or bool(self.keyset)
+
+        field = self.model_admin.keyset_field
+        self.first_page_url = self.get_query_string(remove=[KEYSET_VAR, PAGE_VAR]) if self.keyset else None
+        self.next_page_url = None
+        if has_next:
+            last = self.result_list[-1]
+            cursor = f"{getattr(last, field).isoformat()}|{last.pk}"
+            self.next_page_url = self.get_query_string({KEYSET_VAR: cursor}, [PAGE_VAR])
@@ -0,0 +1,176 @@
+"""
+Rate limiting on top of the Django cache.
+
+Every check costs a constant number of cache operations and relies only on
+the atomic ``add``/``incr``/``decr`` primitives, so concurrent requests (and
+worker processes sharing a cache) never lose updates the way a
+``get`` followed by ``set`` does.
+
+Limiters are configured by name in ``settings.RATE_LIMITS`` and keyed per
+caller, e.g. by IP address, phone number or user id::
+
+    if not get_limiter('sms').hit(user.phone_number):
+        ...
+"""
+import math
+import time
+import uuid
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+
+from core.metrics import RATE_LIMIT_HITS
+
+logger = logging.getLogger(__name__)
+
+
+def _incr(key, timeout, delta=1):
+    """Atomically increment ``key``, creating it with ``timeout`` if missing"""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _counted(name, allowed):
+    RATE_LIMIT_HITS.inc(limiter=name, outcome='allowed' if allowed else 'denied')
+    return allowed
+
+
+class SlidingWindow:
+    """
+    Sliding-window counter: at most ``limit`` hits in any ``window`` seconds.
+    Approximates the true sliding window by weighting the previous fixed
+    window's count by how much of it still overlaps the sliding one.
+    One ``incr`` and one ``get`` per hit.
+    """
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _keys(self, key, now):
+        index = int(now // self.window)
+        prefix = f"ratelimit:{self.name}:{key}"
+        return f"{prefix}:{index}", f"{prefix}:{index - 1}", (now % self.window) / self.window
+
+    def _estimate(self, current, previous, elapsed):
+        return previous * (1 - elapsed) + current
+
+    def hit(self, key):
+        """Record a hit; returns True while the caller is within the limit"""
+        now = time.time()
+        current_key, previous_key, elapsed = self._keys(key, now)
+        current = _incr(current_key, self.window * 2)
+        previous = cache.get(previous_key, 0)
+        return _counted(self.name, self._estimate(current, previous, elapsed) <= self.limit)
+
+    def exceeded(self, key):
+        """Whether ``key`` is over the limit, without recording a hit"""
+        current_key, previous_key, elapsed = self._keys(key, time.time())
+        values = cache.get_many([current_key, previous_key])
+        estimate = self._estimate(values.get(current_key, 0), values.get(previous_key, 0), elapsed)
+        return estimate >= self.limit
+
+    def reset(self, key):
+        current_key, previous_key, _ = self._keys(key, time.time())
+        cache.delete_many([current_key, previous_key])
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to ``capacity`` tokens, refilled at one token
+    every ``refill_seconds``.
+
+    Tokens are handed out as slots from an atomic counter: slot ``n`` is
+    granted when ``n <= capacity + elapsed / refill_seconds``, and a refused
+    slot is given back with ``decr``. When idle credit exceeds the capacity a
+    single caller (elected with ``add``) starts a fresh generation so the
+    bucket never holds more than ``capacity`` tokens.
+    """
+
+    def __init__(self, name, capacity, refill_seconds):
+        self.name = name
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.timeout = math.ceil(capacity * refill_seconds) + 1
+
+    def _state_key(self, key):
+        return f"ratelimit:{self.name}:{key}"
+
+    def _state(self, state_key, now):
+        state = cache.get(state_key)
+        if state is None:
+            state = (uuid.uuid4().hex[:8], now)
+            if not cache.add(state_key, state, self.timeout):
+                state = cache.get(state_key, state)
+        return state
+
+    def _budget(self, origin, now):
+        return self.capacity + (now - origin) / self.refill_seconds
+
+    def hit(self, key):
+        """Take a token; returns False when the bucket is empty"""
+        now = time.time()
+        state_key = self._state_key(key)
+        generation, origin = self._state(state_key, now)
+        counter_key = f"{state_key}:{generation}"
+
+        slot = _incr(counter_key, self.timeout * 2)
+        budget = self._budget(origin, now)
+        if budget - slot >= self.capacity and cache.add(f"{counter_key}:rebase", 1, self.timeout):
+            # Idle credit beyond capacity: start a full bucket from now
+            generation, origin = uuid.uuid4().hex[:8], now
+            cache.set(state_key, (generation, origin), self.timeout)
+            counter_key = f"{state_key}:{generation}"
+            slot = _incr(counter_key, self.timeout * 2)
+            budget = self.capacity
+        else:
+            cache.touch(state_key, self.timeout)
+
+        if slot <= budget:
+            return _counted(self.name, True)
+        cache.decr(counter_key)
+        return _counted(self.name, False)
+
+    def exceeded(self, key):
+        """Whether the bucket is empty, without taking a token"""
+        now = time.time()
+        state_key = self._state_key(key)
+        state = cache.get(state_key)
+        if state is None:
+            return False
+        generation, origin = state
+        return cache.get(f"{state_key}:{generation}", 0) + 1 > self._budget(origin, now)
+
+    def reset(self, key):
+        cache.delete(self._state_key(key))
+
+
+POLICIES = {
+    'sliding_window': lambda name, config: SlidingWindow(name, config['limit'], config['window']),
+    'token_bucket': lambda name, config: TokenBucket(name, config['capacity'], config['refill_seconds']),
+}
+
+_limiters = {}
+
+
+def get_limiter(name):
+    """Return the limiter configured under ``settings.RATE_LIMITS[name]``"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        config = settings.RATE_LIMITS[name]
+        limiter = _limiters[name] = POLICIES[config['policy']](name, config)
+    return limiter
+
+
+def _reset_limiters(*, setting, **kwargs):
+    if setting == 'RATE_LIMITS':
+        _limiters.clear()
+
+
+setting_changed.connect(_reset_limiters)
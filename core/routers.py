@@ -0,0 +1,127 @@
+"""
+Read-replica database routing.
+
+Reads go to a replica only inside ``replica_reads()`` (or views decorated
+with ``read_from_replicas``), so every other code path keeps reading from
+the primary exactly as before. Within that scope:
+
+* one replica is picked per scope, weighted by ``settings.DATABASE_REPLICAS``
+  (``{alias: weight}``), so a request sees a single consistent snapshot;
+* the first write pins the rest of the scope to the primary
+  (read-your-writes), as does an open transaction on the primary;
+* apps in ``settings.REPLICA_EXCLUDED_APPS`` (sessions by default) are
+  always read from the primary because they are written on the previous
+  request and must not lag behind it;
+* ``read_from_replicas`` loads ``request.user`` from the primary before
+  the scope opens. The session auth hash is checked against that row, and
+  a password written on the previous request (password change) may not
+  have reached the replica yet: a stale hash would log the user out.
+
+State lives in context variables, so it is per-thread for WSGI workers and
+per-task for ASGI, and asgiref carries it across sync_to_async.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica = ContextVar('replica_alias', default=None)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def choose_replica():
+    """Weighted pick among the configured replicas, or None without any"""
+    replicas = getattr(settings, 'DATABASE_REPLICAS', {})
+    if not replicas:
+        return None
+    aliases = list(replicas)
+    return random.choices(aliases, weights=[replicas[alias] for alias in aliases])[0]
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads of this block to one replica until the first write"""
+    replica_token = _replica.set(choose_replica())
+    pinned_token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _replica.reset(replica_token)
+        _pinned.reset(pinned_token)
+
+
+def pin_to_primary():
+    """Read from the primary for the rest of the current replica scope"""
+    _pinned.set(True)
+
+
+def _load_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None:
+        # evaluates AuthenticationMiddleware's lazy user
+        user.is_authenticated
+
+
+def read_from_replicas(view):
+    """Decorator running a (sync or async) view inside replica_reads()"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            await sync_to_async(_load_user)(request)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            _load_user(request)
+            with replica_reads():
+                response = view(request, *args, **kwargs)
+                # TemplateResponse querysets are evaluated on render
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or _pinned.get():
+            return None
+        if model._meta.app_label in getattr(settings, 'REPLICA_EXCLUDED_APPS', ('sessions',)):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if _replica.get() is not None:
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', {})}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive schema changes through replication
+        if db in getattr(settings, 'DATABASE_REPLICAS', {}):
+            return False
+        return None
+
+
+class ReplicaChangeListMixin:
+    """ModelAdmin mixin serving changelist GETs from a replica"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        return read_from_replicas(super().changelist_view)(request, extra_context)
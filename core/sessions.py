@@ -0,0 +1,164 @@
+"""
+Cache-fronted database sessions that skip redundant writes.
+
+Django's ``cached_db`` engine still writes ``django_session`` every time a
+session is marked modified, even if the stored data did not change. It
+also only refreshes ``expire_date`` by rewriting the row. This engine keeps
+the ``cached_db`` layout (the cache in front, the database as the source of
+truth) and adds the following:
+
+* Loads remember a digest of the data and the stored expiry. ``save()``
+  skips the database when the data is unchanged and the stored expiry
+  is still fresh, i.e. less than ``REFRESH_FRACTION`` of the session age
+  would be gained by rewriting it.
+* The cache entry carries the expiry with the data, so a cache hit can
+  coalesce writes as well as a database load.
+* ``clear_expired()`` (used by ``clearsessions``) deletes in bounded
+  batches through ``sweep_expired_sessions()``, never in one full-table
+  DELETE. ``manage.py sweep_sessions`` runs the same sweep continuously.
+* Each store counts its cache reads, database reads and database writes.
+  ``MetricsMiddleware`` reports them per view.
+
+    SESSION_ENGINE = 'core.sessions'
+    SESSION_STORE = {'REFRESH_FRACTION': 0.5, 'SWEEP_BATCH_SIZE': 500}
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils import timezone
+
+from core.metrics import SESSION_OPERATIONS
+
+KEY_PREFIX = 'core.sessions'
+
+
+def _config():
+    config = getattr(settings, 'SESSION_STORE', {})
+    return {
+        'refresh_fraction': config.get('REFRESH_FRACTION', 0.5),
+        'batch_size': config.get('SWEEP_BATCH_SIZE', 500),
+        'sleep': config.get('SWEEP_SLEEP', 0.05),
+    }
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # (digest, expiry timestamp) of the stored copy, None if nothing stored
+        self._stored = None
+        self.io = {'cache_read': 0, 'db_read': 0, 'db_write': 0}
+
+    def _digest(self, data):
+        return hashlib.blake2b(self.serializer().dumps(data), digest_size=16).digest()
+
+    def _remember(self, data, expires):
+        self._stored = (self._digest(data), expires)
+        self._cache.set(self.cache_key, (data, expires), max(0, int(expires - time.time())))
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # invalid cache keys are treated as a miss, like cached_db
+            entry = None
+
+        if entry is not None:
+            self.io['cache_read'] += 1
+            SESSION_OPERATIONS.inc(operation='load', result='cache')
+            data, expires = entry
+            self._stored = (self._digest(data), expires)
+            return data
+
+        self.io['db_read'] += 1
+        s = self._get_session_from_db()
+        if s is None:
+            SESSION_OPERATIONS.inc(operation='load', result='miss')
+            return {}
+        SESSION_OPERATIONS.inc(operation='load', result='db')
+        data = self.decode(s.session_data)
+        self._remember(data, s.expire_date.timestamp())
+        return data
+
+    def _is_unchanged(self, data):
+        if self._stored is None:
+            return False
+        digest, expires = self._stored
+        if digest != self._digest(data):
+            return False
+        gained = self.get_expiry_date().timestamp() - expires
+        return gained < self.get_expiry_age() * _config()['refresh_fraction']
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if not must_create and self._is_unchanged(data):
+            SESSION_OPERATIONS.inc(operation='save', result='skipped')
+            return
+        # DBStore.save, not CachedDBStore.save: the cache entry is written below
+        super(CachedDBStore, self).save(must_create)
+        self.io['db_write'] += 1
+        SESSION_OPERATIONS.inc(operation='save', result='db')
+        self._remember(data, self.get_expiry_date().timestamp())
+
+    def delete(self, session_key=None):
+        if session_key is None and self.session_key is None:
+            return
+        super().delete(session_key)
+        if session_key is None or session_key == self.session_key:
+            self._stored = None
+        self.io['db_write'] += 1
+        SESSION_OPERATIONS.inc(operation='delete', result='db')
+
+    @classmethod
+    def clear_expired(cls):
+        sweep_expired_sessions()
+
+
+def sweep_expired_sessions(batch_size=None, sleep=None, progress=None):
+    """
+    Delete expired sessions, oldest first, ``batch_size`` rows per statement.
+
+    Each batch picks keys through the ``expire_date`` index and deletes them
+    by primary key in its own short statement, so the sweep can run beside
+    live traffic without holding long locks. Rows refreshed in the meantime
+    are kept. Cache entries expire on their own with the session.
+    Returns a dict with the number deleted, the duration and the rate.
+    """
+    config = _config()
+    batch_size = batch_size or config['batch_size']
+    sleep = config['sleep'] if sleep is None else sleep
+    model = SessionStore.get_model_class()
+
+    started = time.monotonic()
+    deleted = 0
+    while True:
+        now = timezone.now()
+        keys = list(
+            model.objects.filter(expire_date__lt=now)
+            .order_by('expire_date')
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        count, _ = model.objects.filter(session_key__in=keys, expire_date__lt=now).delete()
+        deleted += count
+        SESSION_OPERATIONS.inc(count, operation='sweep', result='deleted')
+        if progress and count:
+            progress(deleted)
+        if len(keys) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    seconds = time.monotonic() - started
+    return {
+        'sessions': deleted,
+        'seconds': seconds,
+        'rows_per_second': deleted / seconds if seconds else 0.0,
+    }
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -112,6 +113,45 @@ DATABASES = {
     }
 }
 
+# Read replicas: DB_REPLICAS=host[:port][@weight],...  e.g. 10.0.0.2@3,10.0.0.3:5433@1
+# فقط خواندن‌های داخل core.routers.replica_reads به رپلیکاها می‌رود
+DATABASE_REPLICAS = {}
+for _index, _spec in enumerate(env.list('DB_REPLICAS', default=[]), start=1):
+    _address, _, _weight = _spec.partition('@')
+    _host, _, _port = _address.partition(':')
+    DATABASES[f'replica{_index}'] = dict(
+        DATABASES['default'],
+        HOST=_host,
+        PORT=_port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS[f'replica{_index}'] = int(_weight or 1)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# کش مشترک بین همه پروسس‌های یک سرور (بدون Redis/memcached) تا محدودیت‌های
+# نرخ و قفل حساب بین workerها تقسیم نشوند؛ برای چند سرور یک کش شبکه‌ای لازم است
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': env('CACHE_LOCATION', default=str(BASE_DIR / 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=100000),
+        },
+    }
+}
+# apps always read from the primary (written on the previous request)
+REPLICA_EXCLUDED_APPS = ('sessions',)
+
+# سشن‌ها با کش جلوی دیتابیس؛ ذخیره سشن بدون تغییر به دیتابیس نمی‌رسد
+SESSION_ENGINE = 'core.sessions'
+SESSION_STORE = {
+    'REFRESH_FRACTION': 0.5,  # تمدید expire_date فقط وقتی بیش از این کسر از عمر سشن اضافه شود
+    'SWEEP_BATCH_SIZE': 500,  # تعداد سشن منقضی در هر DELETE (manage.py sweep_sessions)
+    'SWEEP_SLEEP': 0.05,  # مکث بین دسته‌ها (ثانیه)
+    'SWEEP_INTERVAL': 300,  # فاصله اجرای sweep_sessions --loop (ثانیه)
+}
+
 
 
 
@@ -159,7 +199,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.CustomUser'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'home'
-AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+# تنها backend؛ ModelBackend دوم رمز اشتباه را دوباره هش می‌کرد
+AUTHENTICATION_BACKENDS = ['users.backends.LockoutModelBackend']
 
 
 # Security headers
@@ -178,7 +219,50 @@ LOGIN_ATTEMPT_TIMEOUT = 300  # 5 minutes
 ACCOUNT_LOCKOUT_MINUTES = 30
 PASSWORD_RESET_TIMEOUT = 86400  # 24 hours
 CODE_RESEND_TIMEOUT = 60  # seconds
+VERIFICATION_CODE_LENGTH = 5  # digits
+VERIFICATION_CODE_MODE = env('VERIFICATION_CODE_MODE', default='database')  # 'database' or 'stateless' (HMAC, no Code row)
+STATELESS_CODE_STEP = 60  # seconds per time step
+STATELESS_CODE_VALID_STEPS = 5  # steps a stateless code stays valid
+CODE_PROVISIONING = 'off'  # code at registration: 'off' (first login issues one), 'lazy' (on commit) or 'eager'
 PASSWORD_CHANGE_TIMEOUT = 60  # seconds
+AUTH_USER_CACHE_TIMEOUT = 300  # seconds a user stays in users.auth_cache
+AUTH_FLOW_TICKET_MAX_AGE = 600  # seconds a core.flow login/password-change ticket is valid
+
+
+# Named limiters used by core.ratelimit.get_limiter()
+RATE_LIMITS = {
+    # failed logins per client IP
+    'login_failures': {'policy': 'sliding_window', 'limit': MAX_LOGIN_ATTEMPTS, 'window': LOGIN_ATTEMPT_TIMEOUT},
+    # SMS sends per phone number
+    'sms': {'policy': 'token_bucket', 'capacity': 1, 'refill_seconds': 60},
+    # verification code (re)sends per user
+    'code_resend': {'policy': 'token_bucket', 'capacity': 1, 'refill_seconds': CODE_RESEND_TIMEOUT},
+    # verification code attempts per user during one code lifetime (reset on success)
+    'code_verify_failures': {
+        'policy': 'sliding_window',
+        'limit': MAX_LOGIN_ATTEMPTS,
+        'window': STATELESS_CODE_STEP * STATELESS_CODE_VALID_STEPS,
+    },
+}
+
+# core.metrics; DIR is shared by all worker processes of one host
+METRICS = {
+    'ENABLED': env.bool('METRICS_ENABLED', default=True),
+    'DIR': env('METRICS_DIR', default=''),
+    'FLUSH_INTERVAL': 1.0,  # seconds between per-process snapshots
+    'ALLOWED_IPS': env.list('METRICS_ALLOWED_IPS', default=['127.0.0.1', '::1']),  # empty: anyone
+}
+
+# users.hashing: password checks in a process pool (WORKERS = 0: in the request thread)
+PASSWORD_HASHING = {
+    'WORKERS': env.int('PASSWORD_HASH_WORKERS', default=0),
+    'MAX_QUEUE': env.int('PASSWORD_HASH_MAX_QUEUE', default=64),  # beyond this logins get "busy"
+    'TIMEOUT': 10,  # seconds to wait for one hash
+    'START_METHOD': 'forkserver',
+}
+
+# Serve login/verify through the async views (run under core.asgi)
+ASYNC_AUTH_VIEWS = env.bool('ASYNC_AUTH_VIEWS', default=False)
 
 
 # Debug Toolbar
@@ -195,12 +279,41 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # SMS Configuration
 
+# core.sms.backends.{trez,locmem,console,filebased}.SmsBackend
+SMS_BACKEND = env('SMS_BACKEND', default='core.sms.backends.trez.SmsBackend')
+SMS_FILE_PATH = env('SMS_FILE_PATH', default='')  # پوشه فایل‌های backend فایلی
+
 SMS_CONFIG = {
     'USERNAME': 'your_sms_username',  # نام کاربری پنل پیامک
     'PASSWORD': 'your_sms_password',  # رمز عبور پنل پیامک
     'FOOTER': 'YourBrand',  # امضا/پایگاه پیامک
     'API_KEY': 'your_api_key',  # کلید API (اگر نیاز است)
     'BASE_URL': 'http://smspanel.Trez.ir/',  # آدرس پایگاه سرویس پیامک
+    'TIMEOUT': 5,  # مهلت هر درخواست (ثانیه)
+    'POOL_SIZE': 10,  # حداکثر اتصال keep-alive به پنل
+    'MAX_RETRIES': 2,  # تلاش مجدد فقط وقتی اتصال برقرار نشده (درخواست ارسال نشده)؛ بقیه با صف خروجی
+    'RETRY_BACKOFF': 0.2,  # تأخیر پایه تلاش مجدد (ثانیه، نمایی با jitter)
+    'BREAKER_THRESHOLD': 5,  # تعداد خطای پیاپی تا باز شدن circuit breaker
+    'BREAKER_RESET_TIMEOUT': 30,  # مدت باز ماندن circuit breaker (ثانیه)
+}
+
+# صف پیامک‌های خروجی (manage.py sms_worker)
+SMS_OUTBOX = {
+    'ENABLED': env.bool('SMS_OUTBOX_ENABLED', default=True),  # غیرفعال: ارسال مستقیم در درخواست
+    'BATCH_SIZE': 100,  # تعداد پیامک در هر دسته
+    'CONCURRENCY': 8,  # تعداد ارسال همزمان
+    'MAX_ATTEMPTS': 5,  # حداکثر تلاش برای هر پیامک
+    'RETRY_DELAY': 10,  # تأخیر پایه تلاش مجدد (ثانیه، نمایی)
+    'POLL_INTERVAL': 1.0,  # فاصله بررسی صف خالی (ثانیه)
+    'LEASE_SECONDS': 60,  # مدت رزرو پیامک توسط worker
+}
+
+# پاک‌سازی کدهای منقضی (manage.py purge_codes)
+CODE_PURGE = {
+    'BATCH_SIZE': 1000,  # تعداد ردیف در هر DELETE
+    'SLEEP': 0.05,  # مکث بین دسته‌ها (ثانیه)
+    'GRACE_MINUTES': 0,  # نگهداری کدهای منقضی پس از انقضا (دقیقه)
+    'ARCHIVE': False,  # انتقال به جدول بایگانی پیش از حذف
 }
 
 
@@ -227,8 +340,24 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': ':memory:',
-        }
+            # فایل به جای حافظه مشترک تا تست‌های همزمان به جای خطای
+            # "table is locked" منتظر آزاد شدن قفل بمانند
+            'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')},
+            'OPTIONS': {'timeout': 20},
+        },
+        # رپلیکای آزمایشی؛ همان فایل تست را می‌خواند
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+            'OPTIONS': {'timeout': 20},
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+    # تست‌های router آن را با override_settings فعال می‌کنند
+    DATABASE_REPLICAS = {}
+    CACHES['default']['LOCATION'] = str(BASE_DIR / 'test_cache.sqlite3')
+    # پیامک‌ها در core.sms.outbox می‌مانند؛ بدون شبکه
+    SMS_BACKEND = 'core.sms.backends.locmem.SmsBackend'
     
     
 
@@ -0,0 +1,44 @@
+"""
+Pluggable SMS delivery, modeled on ``django.core.mail``.
+
+``settings.SMS_BACKEND`` names the backend class:
+
+* ``core.sms.backends.trez.SmsBackend``: the Trez panel (default)
+* ``core.sms.backends.locmem.SmsBackend``: keeps messages in ``core.sms.outbox``
+* ``core.sms.backends.console.SmsBackend``: writes messages to stdout
+* ``core.sms.backends.filebased.SmsBackend``: appends messages under ``SMS_FILE_PATH``
+
+Every backend takes a batch of ``(phone_number, text)`` pairs and returns
+one ``(success, response)`` pair per message, in order::
+
+    sent, response = send_sms(user.phone_number, text)
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'core.sms.backends.trez.SmsBackend'
+
+SmsMessage = namedtuple('SmsMessage', ('phone_number', 'text'))
+
+# Messages delivered by the locmem backend, like django.core.mail.outbox
+outbox = []
+
+
+def get_backend(backend=None, **kwargs):
+    """Instantiate ``backend`` or ``settings.SMS_BACKEND`` with ``kwargs``"""
+    klass = import_string(backend or getattr(settings, 'SMS_BACKEND', DEFAULT_BACKEND))
+    return klass(**kwargs)
+
+
+def send_sms(phone_number, text, backend=None):
+    """Send one message; returns ``(success, response)``"""
+    return get_backend(backend).send_messages([SmsMessage(phone_number, text)])[0]
+
+
+async def asend_sms(phone_number, text, backend=None):
+    """Async counterpart of send_sms"""
+    results = await get_backend(backend).asend_messages([SmsMessage(phone_number, text)])
+    return results[0]
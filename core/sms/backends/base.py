@@ -0,0 +1,30 @@
+from asgiref.sync import sync_to_async
+
+from core.sms import SmsMessage
+
+
+class BaseSmsBackend:
+    """
+    Base class for SMS backends.
+
+    Subclasses implement ``send_messages``. It returns one
+    ``(success, response)`` pair per message and reports delivery failures
+    in that pair instead of raising.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    @staticmethod
+    def _messages(messages):
+        return [SmsMessage(*message) for message in messages]
+
+    def send_messages(self, messages):
+        raise NotImplementedError('subclasses of BaseSmsBackend must override send_messages()')
+
+    async def asend_messages(self, messages):
+        return await sync_to_async(self.send_messages, thread_sensitive=False)(messages)
+
+    def close(self):
+        """Release resources held between batches"""
+        pass
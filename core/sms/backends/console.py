@@ -0,0 +1,28 @@
+"""Backend for development: writes messages to a stream (stdout by default)"""
+
+import sys
+import threading
+
+from core.sms.backends.base import BaseSmsBackend
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_message(message):
+        return f"To: {message.phone_number}\n{message.text}\n{'-' * 40}\n"
+
+    def write_messages(self, stream, messages):
+        for message in messages:
+            stream.write(self.format_message(message))
+        stream.flush()
+
+    def send_messages(self, messages):
+        messages = self._messages(messages)
+        with self._lock:
+            self.write_messages(self.stream, messages)
+        return [(True, 'console')] * len(messages)
@@ -0,0 +1,27 @@
+"""Backend appending messages to one log file per process under ``SMS_FILE_PATH``"""
+
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from core.sms.backends.console import SmsBackend as ConsoleSmsBackend
+
+
+class SmsBackend(ConsoleSmsBackend):
+    def __init__(self, file_path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.file_path = file_path or getattr(settings, 'SMS_FILE_PATH', '')
+        if not self.file_path:
+            raise ImproperlyConfigured("SMS_FILE_PATH must be set to use the file SMS backend")
+        os.makedirs(self.file_path, exist_ok=True)
+
+    def _filename(self):
+        return os.path.join(self.file_path, f"{timezone.now():%Y%m%d}-{os.getpid()}.log")
+
+    def send_messages(self, messages):
+        messages = self._messages(messages)
+        with self._lock, open(self._filename(), 'a', encoding='utf-8') as stream:
+            self.write_messages(stream, messages)
+        return [(True, 'file')] * len(messages)
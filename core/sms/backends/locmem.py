@@ -0,0 +1,21 @@
+"""Backend for tests and benchmarks: keeps messages in ``core.sms.outbox``"""
+
+import threading
+
+from core import sms
+from core.sms.backends.base import BaseSmsBackend
+
+_lock = threading.Lock()
+
+
+class SmsBackend(BaseSmsBackend):
+    def send_messages(self, messages):
+        results = []
+        with _lock:
+            for message in self._messages(messages):
+                sms.outbox.append(message)
+                results.append((True, f"locmem-{len(sms.outbox)}"))
+        return results
+
+    async def asend_messages(self, messages):
+        return self.send_messages(messages)
@@ -0,0 +1,83 @@
+"""Trez SMS panel, sent through the pooled clients in ``core.utils``"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from core.sms.backends.base import BaseSmsBackend
+from core.utils import get_async_sms_client, get_sms_client
+
+logger = logging.getLogger(__name__)
+
+
+def credentials_configured():
+    sms_config = getattr(settings, 'SMS_CONFIG', {})
+    if not all([sms_config.get('USERNAME'), sms_config.get('PASSWORD')]):
+        logger.error("SMS credentials not configured")
+        return False
+    return True
+
+
+def interpret_panel_response(phone_number, result):
+    """The panel answers with a transaction id above 2000 on success"""
+    try:
+        if result and int(result) > 2000:
+            logger.info(f"SMS sent to {phone_number} | Transaction ID: {result}")
+            return True, result
+        logger.error(f"SMS failed for {phone_number}. Response: {result}")
+        return False, f"Panel response: {result}"
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid server response: {result} | Error: {str(e)}")
+        return False, f"Invalid server response: {result}"
+
+
+class SmsBackend(BaseSmsBackend):
+    """
+    Batches are sent ``concurrency`` messages at a time over the shared
+    keep-alive pool; the executor lives until ``close()``.
+    """
+
+    def __init__(self, concurrency=1, **kwargs):
+        super().__init__(**kwargs)
+        self.concurrency = concurrency
+        self._executor = None
+
+    def _send(self, message):
+        try:
+            result = get_sms_client().send_code(message.phone_number, message.text)
+        except Exception as e:
+            logger.exception(f"Error sending SMS to {message.phone_number}: {str(e)}")
+            return False, str(e)
+        return interpret_panel_response(message.phone_number, result)
+
+    def send_messages(self, messages):
+        messages = self._messages(messages)
+        if not credentials_configured():
+            return [(False, "SMS credentials not configured")] * len(messages)
+        if self.concurrency > 1 and len(messages) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+            return list(self._executor.map(self._send, messages))
+        return [self._send(message) for message in messages]
+
+    async def _asend(self, client, message):
+        try:
+            result = await client.send_code(message.phone_number, message.text)
+        except Exception as e:
+            logger.exception(f"Error sending SMS to {message.phone_number}: {str(e)}")
+            return False, str(e)
+        return interpret_panel_response(message.phone_number, result)
+
+    async def asend_messages(self, messages):
+        messages = self._messages(messages)
+        if not credentials_configured():
+            return [(False, "SMS credentials not configured")] * len(messages)
+        client = get_async_sms_client()
+        return list(await asyncio.gather(*(self._asend(client, message) for message in messages)))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from core.cache import SQLiteCache
+
+
+def _hammer(path, count):
+    cache = SQLiteCache(path, {})
+    for _ in range(count):
+        cache.incr('hits')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_EVERY': 5}})
+
+    def test_basic_operations(self):
+        """تست عملیات پایه و حفظ نوع مقادیر"""
+        self.cache.set('obj', {'a': [1, 2]})
+        self.cache.set('flag', True)
+        self.assertEqual(self.cache.get('obj'), {'a': [1, 2]})
+        self.assertIs(self.cache.get('flag'), True)
+        self.assertEqual(self.cache.get_many(['obj', 'missing']), {'obj': {'a': [1, 2]}})
+
+        self.assertTrue(self.cache.add('n', 1))
+        self.assertFalse(self.cache.add('n', 5))
+        self.assertEqual(self.cache.incr('n', 4), 5)
+        self.assertEqual(self.cache.decr('n'), 4)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+        self.assertTrue(self.cache.delete('n'))
+        self.assertFalse(self.cache.delete('n'))
+
+    def test_expiry(self):
+        """تست انقضا، add روی کلید منقضی و touch"""
+        with mock.patch('time.time', return_value=1000.0):
+            self.cache.set('short', 'v', 10)
+            self.cache.set('forever', 'v', None)
+        with mock.patch('time.time', return_value=1011.0):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertFalse(self.cache.touch('short'))
+            self.assertTrue(self.cache.add('short', 'new', 10))
+            self.assertEqual(self.cache.get('short'), 'new')
+            self.assertEqual(self.cache.get('forever'), 'v')
+
+    def test_size_is_bounded(self):
+        """تست محدود ماندن تعداد ردیف‌ها"""
+        for i in range(100):
+            self.cache.set(f'key{i}', i)
+        count = self.cache._fetchone("SELECT COUNT(*) FROM cache", ())[0]
+        self.assertLessEqual(count, 10 + 5)
+
+    def test_increments_shared_across_processes(self):
+        """تست عدم از دست رفتن افزایش‌ها بین چند پروسس"""
+        self.cache.set('hits', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_hammer, args=(self.path, 200)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('hits'), 800)
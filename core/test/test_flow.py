@@ -0,0 +1,32 @@
+from unittest import mock
+from django.core import signing
+from django.test import RequestFactory, SimpleTestCase
+from core import flow
+from core.flow import make_ticket, read_ticket
+
+
+class FlowTicketTest(SimpleTestCase):
+    def request(self, value):
+        request = RequestFactory().get('/')
+        request.COOKIES['auth_flow'] = value
+        return request
+
+    def test_round_trip(self):
+        """تست خواندن تیکت امضا شده و هش رمز از کش"""
+        value = make_ticket(flow.PASSWORD_CHANGE, 7, 'abc', 'md5$x$y')
+        self.assertNotIn('md5$x$y', str(signing.loads(value, salt=f"{flow.SALT}.{flow.PASSWORD_CHANGE}")))
+        ticket = read_ticket(self.request(value), flow.PASSWORD_CHANGE)
+        self.assertEqual(ticket, flow.Ticket(flow.PASSWORD_CHANGE, 7, 'abc', 'md5$x$y'))
+
+        # پس از اعمال رمز، تیکت دیگر معتبر نیست
+        flow.discard_password(ticket)
+        self.assertIsNone(read_ticket(self.request(value), flow.PASSWORD_CHANGE))
+
+    def test_rejects_other_flow_tampering_and_expiry(self):
+        """تست رد تیکت جریان دیگر، دستکاری شده و منقضی"""
+        value = make_ticket(flow.LOGIN, 7, 'abc')
+        self.assertIsNone(read_ticket(self.request(value), flow.PASSWORD_CHANGE))
+        self.assertIsNone(read_ticket(self.request(value[:-2] + 'xx'), flow.LOGIN))
+        self.assertIsNone(read_ticket(RequestFactory().get('/'), flow.LOGIN))
+        with mock.patch('django.core.signing.time.time', return_value=signing.time.time() + 601):
+            self.assertIsNone(read_ticket(self.request(value), flow.LOGIN))
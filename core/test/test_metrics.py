@@ -0,0 +1,95 @@
+import multiprocessing
+import tempfile
+
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.middleware import MetricsMiddleware
+from users.models import CustomUser
+
+
+def _record_in_child(directory):
+    with override_settings(METRICS={'DIR': directory}):
+        metrics.LOCKOUTS.inc()
+        metrics.SMS_LATENCY.observe(0.3, endpoint='child.ashx')
+        metrics.flush()
+
+
+class MetricsTest(SimpleTestCase):
+    def _value(self, metric, **labels):
+        return metrics.collect().get(metric._key(labels), 0)
+
+    def test_counter_and_histogram_render(self):
+        """تست خروجی متنی شمارنده و هیستوگرام"""
+        before = self._value(metrics.RATE_LIMIT_HITS, limiter='sms', outcome='denied')
+        metrics.RATE_LIMIT_HITS.inc(limiter='sms', outcome='denied')
+        metrics.SMS_LATENCY.observe(0.02, endpoint='render.ashx')
+        metrics.SMS_LATENCY.observe(3.0, endpoint='render.ashx')
+
+        text = metrics.render()
+        self.assertIn("# TYPE rate_limit_hits counter", text)
+        self.assertIn(f'rate_limit_hits_total{{limiter="sms",outcome="denied"}} {before + 1}', text)
+        self.assertIn('sms_request_duration_seconds_bucket{endpoint="render.ashx",le="0.01"} 0', text)
+        self.assertIn('sms_request_duration_seconds_bucket{endpoint="render.ashx",le="0.025"} 1', text)
+        self.assertIn('sms_request_duration_seconds_bucket{endpoint="render.ashx",le="+Inf"} 2', text)
+        self.assertIn('sms_request_duration_seconds_count{endpoint="render.ashx"} 2', text)
+
+    def test_disabled(self):
+        """تست عدم ثبت در حالت غیرفعال"""
+        before = self._value(metrics.LOCKOUTS)
+        with override_settings(METRICS={'ENABLED': False}):
+            metrics.LOCKOUTS.inc()
+        self.assertEqual(self._value(metrics.LOCKOUTS), before)
+
+    def test_processes_are_merged(self):
+        """تست جمع مقادیر چند پروسه از طریق پوشه مشترک"""
+        context = multiprocessing.get_context('fork')
+        # این پروسه هم فایل خود را در پوشه می‌نویسد
+        own = self._value(metrics.LOCKOUTS)
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [context.Process(target=_record_in_child, args=(directory,)) for _ in range(3)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            with override_settings(METRICS={'DIR': directory}):
+                self.assertEqual(self._value(metrics.LOCKOUTS), own + 3)
+                self.assertEqual(self._value(metrics.SMS_LATENCY, endpoint='child.ashx')[-1], 3)
+                self.assertIn('sms_request_duration_seconds_count{endpoint="child.ashx"} 3', metrics.render())
+
+
+@override_settings(
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CODE_PROVISIONING='off',
+)
+class MetricsViewTest(TestCase):
+    def test_endpoint_reports_views_and_queries(self):
+        """تست ثبت زمان و تعداد کوئری هر view و نمایش در /metrics"""
+        self.client.get(reverse('users:login'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="users:login",method="GET",status="200"}', text)
+        self.assertIn('db_queries_per_request_count{view="users:login"}', text)
+
+    def test_forbidden_outside_allowed_ips(self):
+        """تست دسترسی فقط از آدرس‌های مجاز"""
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5', HTTP_X_FORWARDED_FOR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    async def test_async_requests_count_queries(self):
+        """تست شمارش کوئری‌های ORM async که در thread دیگری اجرا می‌شوند"""
+        async def view(request):
+            await CustomUser.objects.acount()
+            await CustomUser.objects.filter(is_active=True).aexists()
+            return HttpResponse()
+
+        before = metrics.collect().get(metrics.DB_QUERIES._key({'view': '<unmatched>'}))
+        before = before[-2] if before else 0
+        await MetricsMiddleware(view)(AsyncRequestFactory().get('/async'))
+        after = metrics.collect()[metrics.DB_QUERIES._key({'view': '<unmatched>'})]
+        self.assertEqual(after[-2] - before, 2)
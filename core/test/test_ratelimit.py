@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from core.ratelimit import SlidingWindow, TokenBucket
+
+
+class RateLimitTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sliding_window(self):
+        """تست محدودیت پنجره لغزان و عدم مصرف در exceeded"""
+        limiter = SlidingWindow('test', limit=3, window=60)
+        self.assertEqual([limiter.hit('ip') for _ in range(4)], [True, True, True, False])
+        self.assertTrue(limiter.exceeded('ip'))
+        self.assertFalse(limiter.exceeded('other-ip'))
+        limiter.reset('ip')
+        self.assertTrue(limiter.hit('ip'))
+
+    def test_sliding_window_weights_previous_window(self):
+        """تست اثر کاهشی پنجره قبلی"""
+        limiter = SlidingWindow('test', limit=2, window=60)
+        with mock.patch('core.ratelimit.time.time', return_value=600.0):
+            limiter.hit('ip')
+            limiter.hit('ip')
+        # نیمه پنجره بعد: نصف شمارش قبلی هنوز حساب می‌شود
+        with mock.patch('core.ratelimit.time.time', return_value=690.0):
+            self.assertTrue(limiter.hit('ip'))
+            self.assertFalse(limiter.hit('ip'))
+
+    def test_concurrent_hits_are_not_lost(self):
+        """تست شمارش دقیق ضربه‌های همزمان"""
+        limiter = SlidingWindow('test', limit=1000, window=60)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: limiter.hit('ip'), range(200)))
+        current_key = limiter._keys('ip', time.time())[0]
+        self.assertEqual(cache.get(current_key), 200)
+
+    def test_token_bucket_refill(self):
+        """تست خالی شدن و پر شدن سطل توکن"""
+        limiter = TokenBucket('test', capacity=2, refill_seconds=10)
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual([limiter.hit('user') for _ in range(3)], [True, True, False])
+            self.assertTrue(limiter.exceeded('user'))
+        # توکن رد شده پس داده شده، پس پس از 10 ثانیه دقیقاً یک توکن هست
+        with mock.patch('core.ratelimit.time.time', return_value=1010.0):
+            self.assertFalse(limiter.exceeded('user'))
+            self.assertEqual([limiter.hit('user') for _ in range(2)], [True, False])
+
+    def test_token_bucket_capacity_is_capped(self):
+        """تست اینکه اعتبار انباشته از ظرفیت سطل بیشتر نمی‌شود"""
+        limiter = TokenBucket('test', capacity=2, refill_seconds=10)
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            limiter.hit('user')
+        with mock.patch('core.ratelimit.time.time', return_value=1029.0):
+            self.assertEqual([limiter.hit('user') for _ in range(3)], [True, True, False])
@@ -0,0 +1,83 @@
+from django.contrib.sessions.models import Session
+from django.db import connections, transaction
+from django.utils.functional import SimpleLazyObject
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from core.routers import ReplicaRouter, choose_replica, read_from_replicas, replica_reads
+from users.models import CustomUser
+
+
+@override_settings(DATABASE_REPLICAS={'replica': 1, 'unused': 0})
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_primary_outside_scope(self):
+        """تست خواندن از دیتابیس اصلی خارج از replica_reads"""
+        self.assertIsNone(self.router.db_for_read(CustomUser))
+
+    def test_weighted_choice(self):
+        """تست انتخاب وزنی رپلیکا"""
+        self.assertEqual({choose_replica() for _ in range(50)}, {'replica'})
+        with self.settings(DATABASE_REPLICAS={}):
+            self.assertIsNone(choose_replica())
+
+    def test_read_your_writes(self):
+        """تست بازگشت به دیتابیس اصلی پس از اولین نوشتن"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(CustomUser), 'replica')
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+            self.assertIsNone(self.router.db_for_read(CustomUser))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(CustomUser), 'replica')
+
+    def test_no_migrations_on_replicas(self):
+        """تست عدم اجرای migrate روی رپلیکا"""
+        self.assertFalse(self.router.allow_migrate('replica', 'users'))
+        self.assertIsNone(self.router.allow_migrate('default', 'users'))
+
+
+@override_settings(DATABASE_REPLICAS={'replica': 1})
+class ReplicaReadsTest(TransactionTestCase):
+    # رپلیکای تست همان فایل دیتابیس تست است، پس داده commit شده را می‌بیند
+    databases = {'default', 'replica'}
+
+    def test_reads_hit_replica_connection(self):
+        """تست ارسال واقعی کوئری‌ها به اتصال رپلیکا"""
+        user = CustomUser.objects.create_user(
+            username='replicauser',
+            password='testpass123',
+            phone_number='09123456789'
+        )
+        with replica_reads():
+            with CaptureQueriesContext(connections['replica']) as replica_queries:
+                self.assertEqual(CustomUser.objects.get(pk=user.pk).username, 'replicauser')
+                CustomUser.objects.filter(pk=user.pk).update(first_name='x')
+                self.assertEqual(CustomUser.objects.get(pk=user.pk).first_name, 'x')
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_open_transaction_reads_primary(self):
+        """تست خواندن از دیتابیس اصلی داخل تراکنش"""
+        with replica_reads(), transaction.atomic():
+            with CaptureQueriesContext(connections['replica']) as replica_queries:
+                CustomUser.objects.count()
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_request_user_read_from_primary(self):
+        """تست بارگذاری request.user از دیتابیس اصلی در نماهای read_from_replicas"""
+        user = CustomUser.objects.create_user(
+            username='replicauser',
+            password='testpass123',
+            phone_number='09123456789'
+        )
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(lambda: CustomUser.objects.get(pk=user.pk))
+
+        @read_from_replicas
+        def view(request):
+            return (request.user.username, CustomUser.objects.count())
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(view(request), ('replicauser', 1))
+        self.assertEqual(len(replica_queries), 1)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.sessions import SessionStore, sweep_expired_sessions
+
+
+def session_writes(context):
+    return [
+        q['sql'] for q in context.captured_queries
+        if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE')) and '"django_session"' in q['sql']
+    ]
+
+
+class SessionStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        session = SessionStore()
+        session['flow'] = 'login'
+        session.save()
+        self.key = session.session_key
+
+    def test_unchanged_save_is_skipped(self):
+        """تست عدم نوشتن دیتابیس برای سشن تغییر نکرده"""
+        session = SessionStore(self.key)
+        session['flow'] = 'login'
+        self.assertTrue(session.modified)
+        with CaptureQueriesContext(connection) as context:
+            session.save()
+        self.assertEqual(context.captured_queries, [])
+        self.assertEqual(session.io, {'cache_read': 1, 'db_read': 0, 'db_write': 0})
+
+        session['flow'] = 'password_change'
+        with CaptureQueriesContext(connection) as context:
+            session.save()
+        self.assertEqual(len(session_writes(context)), 1)
+        self.assertEqual(SessionStore(self.key)['flow'], 'password_change')
+
+    def test_stale_expiry_is_refreshed(self):
+        """تست تمدید expire_date وقتی بیش از نیمی از عمر سشن گذشته"""
+        Session.objects.filter(pk=self.key).update(expire_date=timezone.now() + timedelta(hours=1))
+        cache.clear()
+        session = SessionStore(self.key)
+        session['flow'] = 'login'
+        session.save()
+        self.assertEqual(session.io, {'cache_read': 0, 'db_read': 1, 'db_write': 1})
+        self.assertGreater(Session.objects.get(pk=self.key).expire_date, timezone.now() + timedelta(days=7))
+
+    def test_flush_removes_cache_entry(self):
+        """تست حذف سشن از دیتابیس و کش با flush"""
+        session = SessionStore(self.key)
+        session.flush()
+        self.assertFalse(Session.objects.filter(pk=self.key).exists())
+        self.assertEqual(SessionStore(self.key).load(), {})
+
+
+class SweepSessionsTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i:026d}', session_data='', expire_date=now - timedelta(minutes=1))
+             for i in range(5)]
+            + [Session(session_key='live' + '0' * 28, session_data='', expire_date=now + timedelta(days=1))]
+        )
+
+    def test_sweep_in_batches(self):
+        """تست حذف سشن‌های منقضی در دسته‌های کوچک"""
+        with CaptureQueriesContext(connection) as context:
+            result = sweep_expired_sessions(batch_size=2, sleep=0)
+        self.assertEqual(result['sessions'], 5)
+        self.assertEqual(len(session_writes(context)), 3)
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['live' + '0' * 28])
+
+    def test_command_and_clearsessions(self):
+        """تست دستور sweep_sessions و استفاده clearsessions از همان sweep"""
+        out = StringIO()
+        call_command('sweep_sessions', '--batch-size', '2', '--sleep', '0', stdout=out)
+        self.assertIn("Deleted 5 expired sessions", out.getvalue())
+
+        Session.objects.filter(pk='live' + '0' * 28).update(expire_date=timezone.now() - timedelta(minutes=1))
+        call_command('clearsessions')
+        self.assertFalse(Session.objects.exists())
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from core import sms
+from core.helper import deliver_sms
+from core.sms import SmsMessage, get_backend
+from core.utils import RemotePost
+
+SMS_CONFIG = {'USERNAME': 'user', 'PASSWORD': 'pass', 'BASE_URL': 'http://sms.test/panel/'}
+
+
+class SmsBackendTest(SimpleTestCase):
+    def setUp(self):
+        sms.outbox.clear()
+
+    def test_locmem_outbox(self):
+        """تست نگهداری پیامک‌ها در core.sms.outbox"""
+        self.assertEqual(deliver_sms('09123456789', 'hello'), (True, 'locmem-1'))
+        self.assertEqual(sms.outbox, [SmsMessage('09123456789', 'hello')])
+
+    def test_locmem_async_batch(self):
+        """تست ارسال دسته‌ای async"""
+        backend = get_backend()
+        results = async_to_sync(backend.asend_messages)([('0911', 'a'), ('0912', 'b')])
+        self.assertEqual([sent for sent, _ in results], [True, True])
+        self.assertEqual([message.phone_number for message in sms.outbox], ['0911', '0912'])
+
+    def test_console(self):
+        """تست نوشتن پیامک در جریان خروجی"""
+        stream = StringIO()
+        backend = get_backend('core.sms.backends.console.SmsBackend', stream=stream)
+        self.assertEqual(backend.send_messages([('0911', 'hello')]), [(True, 'console')])
+        self.assertIn("To: 0911\nhello", stream.getvalue())
+
+    def test_file(self):
+        """تست افزودن پیامک به فایل SMS_FILE_PATH"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(SMS_FILE_PATH=directory):
+            backend = get_backend('core.sms.backends.filebased.SmsBackend')
+            backend.send_messages([('0911', 'first')])
+            backend.send_messages([('0912', 'second')])
+            [filename] = os.listdir(directory)
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                content = f.read()
+        self.assertIn('first', content)
+        self.assertIn('second', content)
+
+    @override_settings(SMS_FILE_PATH='')
+    def test_file_requires_path(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_backend('core.sms.backends.filebased.SmsBackend')
+
+
+@override_settings(SMS_CONFIG=SMS_CONFIG, SMS_BACKEND='core.sms.backends.trez.SmsBackend')
+class TrezBackendTest(SimpleTestCase):
+    def test_batch_results_in_order(self):
+        """تست ارسال همزمان دسته و حفظ ترتیب نتایج"""
+        replies = {'0911': '5001', '0912': '1', '0913': None}
+        backend = get_backend(concurrency=3)
+        with mock.patch('core.utils.RemotePost.send_code', side_effect=lambda mobile, text: replies[mobile]):
+            results = backend.send_messages([(mobile, 'text') for mobile in replies])
+        backend.close()
+        self.assertEqual([sent for sent, _ in results], [True, False, False])
+        self.assertEqual(results[0][1], '5001')
+
+    def test_client_exception_is_reported(self):
+        """تست تبدیل خطای کلاینت به نتیجه ناموفق"""
+        with mock.patch('core.utils.RemotePost.send_code', side_effect=RuntimeError('boom')):
+            self.assertEqual(deliver_sms('0911', 'text'), (False, 'boom'))
+
+    @override_settings(SMS_CONFIG={})
+    def test_missing_credentials(self):
+        with mock.patch('core.utils.RemotePost.send_code') as send_code:
+            self.assertFalse(deliver_sms('0911', 'text')[0])
+        send_code.assert_not_called()
+
+    def test_endpoints_use_base_url(self):
+        """تست استفاده همه متدها از BASE_URL"""
+        client = RemotePost()
+        with mock.patch.object(client, '_post', return_value='ok') as post:
+            client.is_code_valid('0911', '12345')
+            client.send_custom_message('0911', 'hello')
+        urls = [call.args[0] for call in post.call_args_list]
+        self.assertEqual(urls, [
+            'http://sms.test/panel/CheckSendCode.ashx',
+            'http://sms.test/panel/SendMessageWithCode.ashx',
+        ])
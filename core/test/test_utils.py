@@ -0,0 +1,68 @@
+from unittest import mock
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from django.test import SimpleTestCase, override_settings
+from core.utils import CircuitBreaker, RemotePost, get_sms_client
+
+
+SMS_CONFIG = {
+    'USERNAME': 'user',
+    'PASSWORD': 'pass',
+    'BASE_URL': 'http://sms.test/',
+    'MAX_RETRIES': 2,
+    'RETRY_BACKOFF': 0,
+    'BREAKER_THRESHOLD': 2,
+    'BREAKER_RESET_TIMEOUT': 60,
+}
+
+
+def response(status, text=''):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = text.encode()
+    return resp
+
+
+@override_settings(SMS_CONFIG=SMS_CONFIG)
+class RemotePostTest(SimpleTestCase):
+    def test_shared_client(self):
+        """تست استفاده از یک کلاینت مشترک در کل پروسه"""
+        self.assertIs(get_sms_client(), get_sms_client())
+
+    def test_retries_connection_failures(self):
+        """تست تلاش مجدد وقتی اتصال برقرار نشده و موفقیت در تلاش بعدی"""
+        client = RemotePost()
+        refused = requests.ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'refused')))
+        with mock.patch.object(client.session, 'post', side_effect=[refused, response(200, '5001')]) as post:
+            self.assertEqual(client.send_code('09123456789', 'text'), '5001')
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(client.stats()['retry']['retries'], 1)
+
+    def test_sent_requests_are_not_retried(self):
+        """تست عدم تلاش مجدد پس از ارسال درخواست (5xx، 4xx و read timeout)"""
+        for side_effect in (response(502), response(400), requests.ReadTimeout()):
+            client = RemotePost()
+            with mock.patch.object(client.session, 'post', side_effect=[side_effect]) as post:
+                self.assertIsNone(client.send_code('09123456789', 'text'))
+            self.assertEqual(post.call_count, 1)
+
+    def test_breaker_fails_fast(self):
+        """تست باز شدن circuit breaker و رد سریع درخواست‌ها"""
+        client = RemotePost()
+        with mock.patch.object(client.session, 'post', side_effect=requests.ConnectionError) as post:
+            client.send_code('09123456789', 'text')
+            client.send_code('09123456789', 'text')
+            self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+            calls = post.call_count
+            self.assertIsNone(client.send_code('09123456789', 'text'))
+        self.assertEqual(post.call_count, calls)
+        self.assertEqual(client.stats()['breaker']['rejected'], 1)
+
+    def test_breaker_half_open_probe(self):
+        """تست بسته شدن circuit breaker پس از موفقیت درخواست آزمایشی"""
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
@@ -3,13 +3,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
-from core.views import home_view
+from core.views import home_view, metrics_view
 
 
 
 
 urlpatterns = [
     path('', home_view, name='home'),
+    path('metrics', metrics_view, name='metrics'),
     path('admin/', admin.site.urls),
     path('codes/', include('codes.urls')),
     path('users/', include('users.urls')),
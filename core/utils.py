@@ -1,9 +1,98 @@
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from urllib.parse import quote
+from django.core.signals import setting_changed
+from urllib.parse import quote, urlsplit
+import asyncio
 import hmac
 import hashlib
+import logging
+import random
+import threading
 import time
+import weakref
+
+from urllib3.exceptions import ConnectTimeoutError
+
+from core.metrics import SMS_LATENCY, SMS_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def _endpoint(url):
+    # label by panel endpoint (``AutoSendCode.ashx``), never by full URL
+    return urlsplit(url).path.rsplit('/', 1)[-1]
+
+
+def _not_sent(error):
+    """
+    True if a ``requests`` error happened before the request reached the panel.
+    Only these are retried: the send endpoints are not idempotent, so a read
+    timeout or a 5xx may already have delivered the SMS. Anything else is
+    left to the outbox retry policy.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # connection refused / DNS failure: MaxRetryError(reason=NewConnectionError)
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def _observe(endpoint, started, outcome):
+    SMS_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+    SMS_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the SMS panel is down.
+    Opens after ``threshold`` consecutive failures, lets a single probe
+    request through after ``reset_timeout`` seconds (half-open) and closes
+    again on the first success.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'rejected': self.rejected,
+        }
+
 
 class RemotePost:
     def __init__(self, username=None, password=None, footer=None):
@@ -13,8 +102,75 @@ class RemotePost:
         self.footer = footer or sms_config.get('FOOTER', '')
         self.api_key = sms_config.get('API_KEY', '')
         self.base_url = sms_config.get('BASE_URL', 'http://smspanel.Trez.ir/')
-    
-    
+        self.timeout = sms_config.get('TIMEOUT', 5)
+        self.max_retries = sms_config.get('MAX_RETRIES', 2)
+        self.backoff = sms_config.get('RETRY_BACKOFF', 0.2)
+        self.pool_size = sms_config.get('POOL_SIZE', 10)
+
+        # Keep-alive connection pool shared by every send from this client
+        self.session = self._create_session()
+
+        self.breaker = CircuitBreaker(
+            threshold=sms_config.get('BREAKER_THRESHOLD', 5),
+            reset_timeout=sms_config.get('BREAKER_RESET_TIMEOUT', 30)
+        )
+        self._counters = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._counters_lock = threading.Lock()
+
+    def _create_session(self):
+        session = requests.Session()
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size
+        )
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        return session
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _post(self, url, data):
+        """
+        POST through the pooled session with the circuit breaker. Connection
+        failures are retried with jittered exponential backoff; errors after
+        the request was sent are not (see ``_not_sent``).
+        Returns the response text or None on failure.
+        """
+        endpoint = _endpoint(url)
+        if not self.breaker.allow_request():
+            logger.warning(f"SMS circuit open, skipping request to {url}")
+            SMS_REQUESTS.inc(endpoint=endpoint, outcome='circuit_open')
+            return None
+
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url,
+                    data=data,
+                    timeout=self.timeout,
+                    verify=True  # Enable SSL verification
+                )
+                response.raise_for_status()
+                self.breaker.record_success()
+                _observe(endpoint, started, 'ok')
+                return response.text
+            except requests.RequestException as e:
+                if not _not_sent(e) or attempt == self.max_retries:
+                    logger.error(f"[SMS ERROR] Request failed: {e}")
+                    _observe(endpoint, started, 'error')
+                    break
+                _observe(endpoint, started, 'retry')
+                self._count('retries')
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        self._count('failures')
+        self.breaker.record_failure()
+        return None
+
     def _generate_signature(self, params):
         """Generate HMAC signature for API requests"""
         sorted_params = '&'.join(f"{k}={quote(str(v))}" for k, v in sorted(params.items()))
@@ -24,69 +180,171 @@ class RemotePost:
             hashlib.sha256
         ).hexdigest()
 
-    def _make_request(self, endpoint, data):
-        """Secure request method with timeout and signature"""
+    def _sign(self, endpoint, data):
         url = f"{self.base_url.rstrip('/')}/{endpoint}"
         data['Timestamp'] = int(time.time())
         data['Signature'] = self._generate_signature(data)
-        
-        try:
-            response = requests.post(
-                url,
-                data=data,
-                timeout=5,
-                verify=True  # Enable SSL verification
-            )
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"[SMS ERROR] Request failed: {e}")
-            return None
+        return url, data
 
-    def send_code(self, mobile_number, footer):
-        data = {
+    def _make_request(self, endpoint, data):
+        """Secure request method with timeout and signature"""
+        url, data = self._sign(endpoint, data)
+        return self._post(url, data)
+
+    def stats(self):
+        """Pool, retry and circuit breaker state for metrics"""
+        pools = self._adapter.poolmanager.pools
+        connections = [pools[key] for key in pools.keys()]
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            'pool': {
+                'maxsize': self.pool_size,
+                'hosts': len(connections),
+                'connections_opened': sum(pool.num_connections for pool in connections),
+                'idle_connections': sum(pool.pool.qsize() for pool in connections if pool.pool),
+            },
+            'retry': counters,
+            'breaker': self.breaker.stats(),
+        }
+
+    def _send_code_payload(self, mobile_number, footer):
+        return {
             'Username': self.username,
             'Password': self.password,
             'Mobile': mobile_number,
             'Footer': footer,
         }
+
+    def send_code(self, mobile_number, footer):
+        data = self._send_code_payload(mobile_number, footer)
         return self._make_request("AutoSendCode.ashx", data)
-        try:
-            response = requests.post(url, data=data, timeout=5)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"[SMS ERROR] ارسال کد شکست خورد: {e}")
-            return None
 
     def is_code_valid(self, mobile_number, code):
-        url = "http://smspanel.Trez.ir/CheckSendCode.ashx"
         data = {
             'Username': self.username,
             'Password': self.password,
             'Mobile': mobile_number,
             'Code': code,
         }
-        try:
-            response = requests.post(url, data=data, timeout=5)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"[SMS ERROR] بررسی کد شکست خورد: {e}")
-            return None
+        return self._make_request("CheckSendCode.ashx", data)
 
     def send_custom_message(self, mobile_number, message):
-        url = "http://smspanel.Trez.ir/SendMessageWithCode.ashx"
         data = {
             'Username': self.username,
             'Password': self.password,
             'Mobile': mobile_number,
             'Message': message,
         }
-        try:
-            response = requests.post(url, data=data, timeout=5)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"[SMS ERROR] ارسال پیامک سفارشی شکست خورد: {e}")
-            return None
\ No newline at end of file
+        return self._make_request("SendMessageWithCode.ashx", data)
+
+
+class AsyncRemotePost(RemotePost):
+    """
+    asyncio counterpart of RemotePost for ASGI views.
+    Uses a pooled httpx.AsyncClient so a single event loop can keep many
+    sends to the panel in flight without tying up threads.
+    """
+
+    def _create_session(self):
+        import httpx
+
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            ),
+            timeout=self.timeout
+        )
+
+    async def _post(self, url, data):
+        import httpx
+
+        endpoint = _endpoint(url)
+        if not self.breaker.allow_request():
+            logger.warning(f"SMS circuit open, skipping request to {url}")
+            SMS_REQUESTS.inc(endpoint=endpoint, outcome='circuit_open')
+            return None
+
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = await self.session.post(url, data=data)
+                response.raise_for_status()
+                self.breaker.record_success()
+                _observe(endpoint, started, 'ok')
+                return response.text
+            except httpx.HTTPError as e:
+                # no connection was made, so nothing reached the panel
+                if not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)) or attempt == self.max_retries:
+                    logger.error(f"[SMS ERROR] Request failed: {e}")
+                    _observe(endpoint, started, 'error')
+                    break
+                _observe(endpoint, started, 'retry')
+                self._count('retries')
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        self._count('failures')
+        self.breaker.record_failure()
+        return None
+
+    async def _make_request(self, endpoint, data):
+        url, data = self._sign(endpoint, data)
+        return await self._post(url, data)
+
+    async def send_code(self, mobile_number, footer):
+        data = self._send_code_payload(mobile_number, footer)
+        return await self._make_request("AutoSendCode.ashx", data)
+
+    def stats(self):
+        # httpx exposes no public pool counters, so only the configured size
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            'pool': {'maxsize': self.pool_size},
+            'retry': counters,
+            'breaker': self.breaker.stats(),
+        }
+
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+
+
+def get_sms_client():
+    """Return the process-wide pooled SMS client, built once from SMS_CONFIG"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RemotePost()
+    return _client
+
+
+def get_async_sms_client():
+    """
+    Return the pooled async SMS client of the running event loop.
+    httpx connections belong to the loop that opened them, so each loop
+    (one per ASGI worker, one per ``async_to_sync`` call) gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _client_lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                client = _async_clients[loop] = AsyncRemotePost()
+    return client
+
+
+def _reset_sms_client(*, setting, **kwargs):
+    global _client
+    if setting == 'SMS_CONFIG':
+        with _client_lock:
+            _client = None
+            _async_clients.clear()
+
+
+setting_changed.connect(_reset_sms_client)
@@ -1,6 +1,11 @@
 
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from core import metrics
 # from django.contrib.auth.forms import AuthenticationForm
 # from django.contrib.auth import login, logout, update_session_auth_hash
 # from django.contrib import messages
@@ -233,3 +238,13 @@ from django.contrib.auth.decorators import login_required
 @login_required
 def home_view(request):
     return render(request, 'home.html')
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint, limited to METRICS['ALLOWED_IPS']"""
+    allowed = getattr(settings, 'METRICS', {}).get('ALLOWED_IPS')
+    # REMOTE_ADDR, not X-Forwarded-For: the header is client controlled
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
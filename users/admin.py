@@ -1,16 +1,31 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+from django.db.models import Q
 from django.urls import reverse
+from core.export import make_export_action
+from core.paginator import EstimatedCountPaginator, KeysetChangeList
+from core.routers import ReplicaChangeListMixin
 from .models import CustomUser
+from .validator import normalize_phone_prefix
 from django.utils.translation import gettext_lazy as _
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ReplicaChangeListMixin, UserAdmin):
     list_display = ('username_link', 'display_phone_number', 'email', 'is_active', 'is_staff', 'is_superuser', 'date_joined')
     list_filter = ('is_active', 'is_staff', 'is_superuser', 'date_joined')
-    search_fields = ('username', 'phone_number', 'email', 'first_name', 'last_name')
-    ordering = ('-date_joined',)
+    # get_search_results فقط جستجوهای پیشوندی قابل استفاده از ایندکس را اجرا می‌کند
+    search_fields = ('username', 'phone_number', 'email')
+    search_help_text = _('شماره تلفن (کامل یا پیشوند)، یا ابتدای نام کاربری یا ایمیل (حساس به حروف)')
+    ordering = ('-date_joined', '-pk')
     list_per_page = 20
+
+    # صفحه‌بندی keyset روی date_joined و شمارش تخمینی برای جدول‌های بزرگ
+    keyset_field = 'date_joined'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # خروجی جریانی بدون محدودیت list_per_page
+    actions = (make_export_action('users', 'csv'), make_export_action('users', 'jsonl'))
     readonly_fields = (
         'last_login', 'date_joined',
         'last_login_ip', 'last_login_at',
@@ -51,6 +66,23 @@ class CustomUserAdmin(UserAdmin):
         return format_html('<a href="{}">{}</a>', url, obj.username)
     username_link.short_description = _('نام کاربری')
 
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        phone = normalize_phone_prefix(term)
+        if phone:
+            if len(phone) == 11:
+                return queryset.filter(phone_number=phone), False
+            return queryset.filter(phone_number__startswith=phone), False
+        if '@' in term:
+            return queryset.filter(email__startswith=term), False
+        return queryset.filter(Q(username__startswith=term) | Q(email__startswith=term)), False
+
     def has_delete_permission(self, request, obj=None):
         if obj and obj.is_superuser:
             return False
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+        import users.signals
+
+        # last_login در همان UPDATE سیگنال users نوشته می‌شود
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
@@ -0,0 +1,109 @@
+"""
+کش کاربر در جریان ورود (صفحه تأیید کد و تأیید تغییر رمز)
+
+کاربر بر اساس pk در دو لایه نگهداری می‌شود:
+- در همان درخواست: اگر AuthenticationMiddleware کاربر را بارگذاری کرده باشد
+  از همان استفاده می‌شود و هر کاربر در هر درخواست حداکثر یک بار خوانده می‌شود
+- بین درخواست‌ها: فقط فیلدهای AUTH_FLOW_FIELDS به صورت یک tuple در کش
+  ذخیره می‌شود و نمونه با from_db ساخته می‌شود (فیلدهای دیگر deferred هستند)؛
+  کش فقط از دیتابیس اصلی پر می‌شود
+
+با save و delete (سیگنال‌ها) و هر update مستقیم روی این فیلدها باید
+invalidate_auth_user صدا زده شود. آمار hit/miss در core.metrics ثبت می‌شود.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from core.metrics import AUTH_USER_CACHE
+
+# فیلدهای مورد نیاز login، فرم تأیید کد و finalize_login
+AUTH_FLOW_FIELDS = (
+    'id', 'username', 'phone_number', 'password', 'is_active',
+    'failed_login_attempts', 'account_locked_until',
+)
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def auth_user_key(pk):
+    # با تغییر AUTH_FLOW_FIELDS کلیدهای قبلی خوانده نمی‌شوند
+    return f"auth_user:{len(AUTH_FLOW_FIELDS)}:{pk}"
+
+
+def _from_request(request, pk):
+    users = request.__dict__.setdefault('_auth_flow_users', {})
+    user = users.get(pk)
+    if user is None:
+        loaded = getattr(request, '_cached_user', None)
+        if loaded is not None and loaded.pk == pk:
+            user = users[pk] = loaded
+    return users, user
+
+
+def _field_order():
+    # from_db مقادیر را به ترتیب فیلدهای مدل می‌خواهد
+    return [f.attname for f in get_user_model()._meta.concrete_fields if f.attname in AUTH_FLOW_FIELDS]
+
+
+def _build(values):
+    return get_user_model().from_db('default', _field_order(), values)
+
+
+def _projection(user):
+    return tuple(getattr(user, field) for field in _field_order())
+
+
+def _query(pk):
+    # همیشه از دیتابیس اصلی: رپلیکای عقب‌مانده هش رمز یا is_active قدیمی را
+    # پس از invalidate دوباره تا پایان AUTH_USER_CACHE_TIMEOUT در کش می‌گذاشت
+    return get_user_model()._default_manager.using('default').only(*AUTH_FLOW_FIELDS).filter(pk=pk)
+
+
+def get_auth_user(request, pk):
+    """
+    کاربر با pk از کش درخواست، کش مشترک یا دیتابیس
+    در صورت نبود کاربر DoesNotExist مدل کاربر برگردانده می‌شود.
+    """
+    pk = int(pk)
+    users, user = _from_request(request, pk)
+    if user is not None:
+        AUTH_USER_CACHE.inc(result='request')
+        return user
+
+    values = cache.get(auth_user_key(pk))
+    if values is not None:
+        AUTH_USER_CACHE.inc(result='hit')
+        user = _build(values)
+    else:
+        AUTH_USER_CACHE.inc(result='miss')
+        user = _query(pk).get()
+        cache.set(auth_user_key(pk), _projection(user), _timeout())
+    users[pk] = user
+    return user
+
+
+async def aget_auth_user(request, pk):
+    """نسخه async تابع get_auth_user"""
+    pk = int(pk)
+    users, user = _from_request(request, pk)
+    if user is not None:
+        AUTH_USER_CACHE.inc(result='request')
+        return user
+
+    values = await cache.aget(auth_user_key(pk))
+    if values is not None:
+        AUTH_USER_CACHE.inc(result='hit')
+        user = _build(values)
+    else:
+        AUTH_USER_CACHE.inc(result='miss')
+        user = await _query(pk).aget()
+        await cache.aset(auth_user_key(pk), _projection(user), _timeout())
+    users[pk] = user
+    return user
+
+
+def invalidate_auth_user(pk):
+    """حذف کاربر از کش مشترک؛ بعد از هر تغییر فیلدهای AUTH_FLOW_FIELDS"""
+    cache.delete(auth_user_key(pk))
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from users.hashing import HashingBusy, check_password, make_password
+
+UserModel = get_user_model()
+
+
+class LockoutModelBackend(ModelBackend):
+    """
+    ModelBackend با بررسی قفل حساب در همان یک کوئری خواندن کاربر
+
+    - برای حساب قفل شده رمز عبور هش نمی‌شود و PermissionDenied بقیه
+      backendها را هم متوقف می‌کند؛ حمله brute-force به حساب قفل شده
+      تقریباً هزینه CPU ندارد
+    - رمز اشتباه با increment_failed_attempt در کش شمرده می‌شود
+    - هش رمز در سرویس users.hashing اجرا می‌شود؛ اگر صف آن پر باشد
+      تلاش ناموفق شمرده نمی‌شود و request.hashing_busy تنظیم می‌شود
+    - request.account_locked برای نمایش پیام قفل در فرم ورود تنظیم می‌شود
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # هزینه زمانی برابر با کاربر موجود، مانند ModelBackend
+            try:
+                make_password(password)
+            except HashingBusy:
+                self._mark(request, 'hashing_busy')
+            return None
+
+        if user.is_account_locked():
+            self._mark(request, 'account_locked')
+            raise PermissionDenied
+
+        try:
+            valid = check_password(user, password)
+        except HashingBusy:
+            self._mark(request, 'hashing_busy')
+            raise PermissionDenied
+        if not valid:
+            if user.increment_failed_attempt():
+                self._mark(request, 'account_locked')
+            return None
+        if self.user_can_authenticate(user):
+            return user
+
+    @staticmethod
+    def _mark(request, flag):
+        if request is not None:
+            setattr(request, flag, True)
@@ -14,21 +14,21 @@ import time
 
 
 class CustomAuthenticationForm(AuthenticationForm):
-    def clean(self):
-        username = self.cleaned_data.get('username')
-        password = self.cleaned_data.get('password')
-        
-        if username and password:
-            try:
-                user = CustomUser.objects.get(username=username)
-                if user.is_account_locked():
-                    raise ValidationError(
-                        "حساب شما موقتاً قفل شده است. لطفاً بعداً تلاش کنید."
-                    )
-            except CustomUser.DoesNotExist:
-                pass
-        
-        return super().clean()
+    """
+    قفل حساب و شمارش تلاش‌های ناموفق در users.backends.LockoutModelBackend
+    انجام می‌شود؛ فرم فقط پیام قفل بودن حساب را نمایش می‌دهد.
+    """
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        'account_locked': "حساب شما موقتاً قفل شده است. لطفاً بعداً تلاش کنید.",
+        'hashing_busy': "سرور در حال حاضر شلوغ است. لطفاً چند لحظه دیگر تلاش کنید.",
+    }
+
+    def get_invalid_login_error(self):
+        for code in ('account_locked', 'hashing_busy'):
+            if getattr(self.request, code, False):
+                return ValidationError(self.error_messages[code], code=code)
+        return super().get_invalid_login_error()
 
 
 class CustomRegisterForm(UserCreationForm):
@@ -0,0 +1,157 @@
+"""
+سرویس هش رمز عبور در یک process pool محدود
+
+هش PBKDF2 بیشترین هزینه CPU هر ورود است. با PASSWORD_HASHING['WORKERS'] > 0
+بررسی رمز در پروسه‌های جداگانه اجرا می‌شود و thread درخواست و GIL
+در این مدت آزاد هستند:
+- حداکثر WORKERS هش همزمان و MAX_QUEUE هش در صف؛ بیشتر از آن
+  HashingBusy داده می‌شود تا در هجوم ورود صف بی‌پایان ساخته نشود
+- اگر پارامترهای hasher تغییر کرده باشد (must_update)، هش جدید در همان
+  پروسه ساخته و با یک save(update_fields=['password']) ذخیره می‌شود،
+  همان رفتار AbstractBaseUser.check_password
+با WORKERS = 0 همه چیز مثل قبل در همان thread اجرا می‌شود.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+
+
+class HashingBusy(Exception):
+    """صف هش پر است یا پاسخ در مهلت TIMEOUT نرسید"""
+
+
+def _init_worker(password_hashers):
+    # پروسه‌های forkserver/spawn فقط به PASSWORD_HASHERS نیاز دارند
+    if not settings.configured:
+        settings.configure(PASSWORD_HASHERS=password_hashers)
+
+
+def _check(password, encoded):
+    """(درست بودن رمز، هش جدید در صورت نیاز به بروزرسانی)"""
+    updated = []
+    valid = hashers.check_password(password, encoded, setter=lambda raw: updated.append(hashers.make_password(raw)))
+    return valid, updated[0] if updated else None
+
+
+class PasswordHashingService:
+    def __init__(self, workers, max_queue=64, timeout=10, start_method='forkserver'):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def _get_executor(self):
+        # pool پروسه والد پس از fork قابل استفاده نیست
+        if self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(list(settings.PASSWORD_HASHERS),),
+            )
+            self._pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise HashingBusy(f"{self._pending} password hashes in flight")
+            executor = self._get_executor()
+            self._pending += 1
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        if not self.enabled:
+            return fn(*args)
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingBusy(f"password hash took longer than {self.timeout}s")
+        except BrokenProcessPool:
+            # یک worker از بین رفته؛ pool در درخواست بعدی دوباره ساخته می‌شود
+            with self._lock:
+                self._pid = None
+            raise HashingBusy("password hashing pool is broken")
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._pid = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hashing_service():
+    """سرویس مشترک پروسه با تنظیمات PASSWORD_HASHING"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                config = getattr(settings, 'PASSWORD_HASHING', {})
+                _service = PasswordHashingService(
+                    workers=config.get('WORKERS', 0),
+                    max_queue=config.get('MAX_QUEUE', 64),
+                    timeout=config.get('TIMEOUT', 10),
+                    start_method=config.get('START_METHOD', 'forkserver'),
+                )
+    return _service
+
+
+def _reset_service(*, setting, **kwargs):
+    global _service
+    if setting in ('PASSWORD_HASHING', 'PASSWORD_HASHERS'):
+        with _service_lock:
+            if _service is not None:
+                _service.shutdown()
+            _service = None
+
+
+setting_changed.connect(_reset_service)
+
+
+def _save_rehashed(user, encoded):
+    if encoded is not None:
+        user.password = encoded
+        user._password = None
+        user.save(update_fields=['password'])
+
+
+def check_password(user, raw_password):
+    """
+    جایگزین user.check_password با اجرای هش در pool
+    در صورت پر بودن صف HashingBusy داده می‌شود.
+    """
+    valid, encoded = get_hashing_service().run(_check, raw_password, user.password)
+    if valid:
+        _save_rehashed(user, encoded)
+    return valid
+
+
+def make_password(raw_password):
+    """هش رمز در pool؛ برای هزینه زمانی برابر در نبود کاربر هم استفاده می‌شود"""
+    return get_hashing_service().run(hashers.make_password, raw_password)
@@ -0,0 +1,162 @@
+"""
+ورود گروهی کاربران از فایل CSV یا JSONL
+
+فایل به صورت جریانی و در دسته‌های batch_size تایی خوانده می‌شود، پس مصرف
+حافظه به اندازه فایل بستگی ندارد. برای هر دسته:
+- شماره‌ها یکسان‌سازی و تکراری‌های داخل دسته حذف می‌شوند
+- کاربران موجود با یک کوئری روی شماره تلفن و نام کاربری کنار گذاشته می‌شوند
+- کاربران با یک bulk_create ساخته می‌شوند (بدون save و سیگنال post_save)
+- در صورت نیاز کدهای تأیید با یک bulk_create دیگر ساخته می‌شوند
+
+ستون‌ها: phone_number (الزامی)، username (پیش‌فرض: شماره تلفن)، email،
+first_name، last_name و password. password می‌تواند هش آماده جنگو باشد
+(بدون هزینه هش کردن) یا رمز ساده؛ بدون آن رمز غیرقابل استفاده ثبت می‌شود.
+"""
+import csv
+import json
+import time
+import logging
+from itertools import islice
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from codes.models import Code, is_stateless_mode
+from .models import CustomUser
+from .validator import normalize_phone_prefix, validate_iranian_phone_number
+
+
+logger = logging.getLogger(__name__)
+
+def read_rows(path, fmt=None):
+    """خواندن جریانی ردیف‌ها به صورت دیکشنری؛ قالب از پسوند فایل تشخیص داده می‌شود"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _password_hash(password):
+    """هش آماده بدون تغییر برگردانده می‌شود؛ رمز ساده هش می‌شود"""
+    if not password:
+        return make_password(None)
+    try:
+        identify_hasher(password)
+        return password
+    except ValueError:
+        return make_password(password)
+
+
+def _build_user(row):
+    raw = row.get('phone_number')
+    phone_number = validate_iranian_phone_number(normalize_phone_prefix(raw) or raw)
+    if not phone_number:
+        raise ValidationError("phone_number is required")
+    username = (row.get('username') or phone_number).strip()
+    CustomUser.username_validator(username)
+    return CustomUser(
+        phone_number=phone_number,
+        username=username,
+        email=CustomUser.objects.normalize_email(row.get('email') or ''),
+        first_name=row.get('first_name') or '',
+        last_name=row.get('last_name') or '',
+        password=_password_hash(row.get('password')),
+    )
+
+
+def _inserted_user_ids(users):
+    """
+    شناسه کاربرانی که همین دسته واقعاً درج کرده است
+    با ignore_conflicts ردیف‌هایی که در رقابت با ثبت‌نام همزمان باخته‌اند درج نمی‌شوند؛
+    هش رمز (با salt تصادفی) ردیف این دسته را از ردیف همزمان جدا می‌کند.
+    """
+    expected = {(user.phone_number, user.username, user.password) for user in users}
+    rows = CustomUser.objects.filter(
+        phone_number__in=[user.phone_number for user in users]
+    ).values_list('pk', 'phone_number', 'username', 'password')
+    return [pk for pk, *key in rows if tuple(key) in expected]
+
+
+def _provision_codes(user_ids):
+    """ساخت گروهی کد تأیید؛ معادل CODE_PROVISIONING برای کاربران وارد شده"""
+    codes = []
+    for user_id in user_ids:
+        code = Code(user_id=user_id)
+        code._generate_unique_code()
+        codes.append(code)
+    Code.objects.bulk_create(codes, ignore_conflicts=True)
+    return len(codes)
+
+
+def import_batch(rows, provision_codes=False):
+    """
+    وارد کردن یک دسته ردیف
+    برمی‌گرداند: دیکشنری شامل created، duplicates، invalid و codes
+    """
+    result = {'created': 0, 'duplicates': 0, 'invalid': 0, 'codes': 0}
+    users = {}
+    usernames = set()
+    for row in rows:
+        try:
+            user = _build_user(row)
+        except (ValidationError, AttributeError, TypeError) as e:
+            result['invalid'] += 1
+            logger.debug(f"Skipping invalid row {row}: {e}")
+            continue
+        if user.phone_number in users or user.username in usernames:
+            result['duplicates'] += 1
+            continue
+        users[user.phone_number] = user
+        usernames.add(user.username)
+
+    if not users:
+        return result
+
+    existing = CustomUser.objects.filter(
+        Q(phone_number__in=list(users)) | Q(username__in=list(usernames))
+    ).values_list('phone_number', 'username')
+    phone_by_username = {user.username: phone_number for phone_number, user in users.items()}
+    for phone_number, username in existing:
+        for key in (phone_number, phone_by_username.get(username)):
+            if key is not None and users.pop(key, None) is not None:
+                result['duplicates'] += 1
+
+    with transaction.atomic():
+        # ignore_conflicts فقط برای رقابت با ثبت‌نام همزمان است
+        CustomUser.objects.bulk_create(users.values(), ignore_conflicts=True)
+        inserted = _inserted_user_ids(users.values())
+        result['created'] = len(inserted)
+        result['duplicates'] += len(users) - len(inserted)
+        if provision_codes and inserted and not is_stateless_mode():
+            result['codes'] = _provision_codes(inserted)
+    return result
+
+
+def import_users(rows, batch_size=1000, provision_codes=False, progress=None):
+    """
+    وارد کردن جریانی ردیف‌ها در دسته‌های batch_size تایی
+    برمی‌گرداند: دیکشنری شامل شمارش‌ها، مدت زمان و سرعت (ردیف در ثانیه)
+    """
+    started = time.monotonic()
+    totals = {'rows': 0, 'created': 0, 'duplicates': 0, 'invalid': 0, 'codes': 0}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        result = import_batch(batch, provision_codes=provision_codes)
+        totals['rows'] += len(batch)
+        for key, value in result.items():
+            totals[key] += value
+        if progress:
+            progress(totals, time.monotonic() - started)
+
+    elapsed = time.monotonic() - started
+    totals['seconds'] = elapsed
+    totals['rows_per_second'] = totals['rows'] / elapsed if elapsed else 0.0
+    logger.info(f"Imported {totals['created']} of {totals['rows']} users in {elapsed:.2f}s")
+    return totals
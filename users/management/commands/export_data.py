@@ -0,0 +1,45 @@
+from django.core.exceptions import FieldError, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import CHUNK_SIZE, EXPORTS, FORMATS, get_export, resolve_fields, resolve_filters, write_export
+
+
+class Command(BaseCommand):
+    help = "Stream users or codes to CSV/JSONL with a constant memory footprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help="What to export")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument(
+            '--fields',
+            help="Comma-separated columns, related ones as user__phone_number (default: a safe preset)"
+        )
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='LOOKUP=VALUE',
+            help="Queryset filter, e.g. is_used=False; may be repeated"
+        )
+        parser.add_argument('--output', help="File to write (default: stdout)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched per cursor round trip")
+
+    def handle(self, *args, **options):
+        model, export = get_export(options['name'])
+        try:
+            fields = resolve_fields(
+                model,
+                options['fields'].split(',') if options['fields'] else export['fields'],
+                export['excluded']
+            )
+            filters = resolve_filters(
+                model, dict(item.split('=', 1) for item in options['filter']), export['excluded']
+            )
+            queryset = model._default_manager.filter(**filters).order_by('pk')
+        except (FieldError, ValidationError, ValueError) as e:
+            raise CommandError(e)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                rows = write_export(stream, queryset, fields, options['format'], options['chunk_size'])
+        else:
+            rows = write_export(self.stdout, queryset, fields, options['format'], options['chunk_size'])
+
+        self.stderr.write(f"Exported {rows} {options['name']}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importer import import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-import users from a CSV or JSONL file in streamed batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with header) or JSONL file")
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help="Input format (default: guessed from the file extension)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Rows read, validated and inserted per batch"
+        )
+        parser.add_argument(
+            '--provision-codes', action='store_true',
+            help="Create a verification code for every imported user"
+        )
+
+    def handle(self, *args, **options):
+        def progress(totals, elapsed):
+            if options['verbosity'] > 1:
+                rate = totals['rows'] / elapsed if elapsed else 0.0
+                self.stdout.write(f"  {totals['rows']} rows, {totals['created']} created ({rate:.0f} rows/s)")
+
+        try:
+            result = import_users(
+                read_rows(options['path'], options['format']),
+                batch_size=options['batch_size'],
+                provision_codes=options['provision_codes'],
+                progress=progress
+            )
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} of {result['rows']} rows "
+            f"({result['duplicates']} duplicates, {result['invalid']} invalid, {result['codes']} codes) "
+            f"in {result['seconds']:.2f}s ({result['rows_per_second']:.0f} rows/s)"
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sessions import sweep_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches, once or continuously"
+
+    def add_arguments(self, parser):
+        store_config = getattr(settings, 'SESSION_STORE', {})
+        parser.add_argument(
+            '--batch-size', type=int, default=store_config.get('SWEEP_BATCH_SIZE', 500),
+            help="Expired sessions deleted per statement"
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=store_config.get('SWEEP_SLEEP', 0.05),
+            help="Seconds to pause between batches"
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep sweeping every --interval seconds instead of exiting"
+        )
+        parser.add_argument(
+            '--interval', type=float, default=store_config.get('SWEEP_INTERVAL', 300),
+            help="Seconds between sweeps with --loop"
+        )
+
+    def handle(self, *args, **options):
+        def progress(deleted):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {deleted} sessions deleted")
+
+        while True:
+            result = sweep_expired_sessions(
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                progress=progress
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {result['sessions']} expired sessions "
+                f"in {result['seconds']:.2f}s ({result['rows_per_second']:.0f} rows/s)"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
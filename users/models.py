@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models import F
+from django.core.cache import cache
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from users.validator import validate_iranian_phone_number
+from core.metrics import LOCKOUTS
+from users.auth_cache import invalidate_auth_user
 from django.conf import settings
 
 
@@ -24,6 +28,16 @@ class CustomUser(AbstractUser):
     last_login_at = models.DateTimeField(null=True, blank=True)
     failed_login_attempts = models.PositiveIntegerField(default=0)
     account_locked_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # صفحه‌بندی keyset پنل مدیریت
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+            # جستجوی پیشوندی (LIKE 'x%') در PostgreSQL با هر collation
+            models.Index(fields=['phone_number'], name='user_phone_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['username'], name='user_username_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['email'], name='user_email_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
     
     def clean(self):
         super().clean()
@@ -36,18 +50,59 @@ class CustomUser(AbstractUser):
             self.account_locked_until > timezone.now()
         )
     
-    def reset_login_attempts(self):
-        self.failed_login_attempts = 0
-        self.account_locked_until = None
-        self.save()
-    
+    @property
+    def failed_attempts_key(self):
+        return f"login_failures:user:{self.pk}"
+
+    def reset_login_attempts(self, commit=True):
+        """
+        پاک کردن شمارنده تلاش‌های ناموفق.
+        فقط وقتی در دیتابیس چیزی برای پاک کردن هست نوشتن انجام می‌شود.
+        با commit=False فیلدهای تغییر کرده برگردانده می‌شود تا فراخواننده
+        آن را در همان update خودش بنویسد.
+        """
+        cache.delete(self.failed_attempts_key)
+        changes = {}
+        if self.failed_login_attempts or self.account_locked_until:
+            changes = {'failed_login_attempts': 0, 'account_locked_until': None}
+            self.failed_login_attempts = 0
+            self.account_locked_until = None
+            if commit:
+                CustomUser.objects.filter(pk=self.pk).update(**changes)
+                invalidate_auth_user(self.pk)
+        return changes
+
     def increment_failed_attempt(self):
-        self.failed_login_attempts += 1
-        if self.failed_login_attempts >= settings.MAX_LOGIN_ATTEMPTS:
-            self.account_locked_until = timezone.now() + timezone.timedelta(
-                minutes=settings.ACCOUNT_LOCKOUT_MINUTES
-            )
-        self.save()
+        """
+        شمارش اتمیک تلاش ناموفق در کش.
+        دیتابیس فقط در لحظه قفل شدن حساب و با یک update نوشته می‌شود.
+        """
+        key = self.failed_attempts_key
+        cache.add(key, 0, settings.LOGIN_ATTEMPT_TIMEOUT)
+        try:
+            attempts = cache.incr(key)
+        except ValueError:
+            # کلید بین add و incr منقضی شده است
+            cache.set(key, 1, settings.LOGIN_ATTEMPT_TIMEOUT)
+            attempts = 1
+
+        if attempts < settings.MAX_LOGIN_ATTEMPTS:
+            return False
+
+        # فقط درخواستی که شمارنده را پاک می‌کند قفل را ثبت می‌کند
+        if not cache.delete(key):
+            return True
+        self.account_locked_until = timezone.now() + timezone.timedelta(
+            minutes=settings.ACCOUNT_LOCKOUT_MINUTES
+        )
+        CustomUser.objects.filter(pk=self.pk).update(
+            failed_login_attempts=F('failed_login_attempts') + attempts,
+            account_locked_until=self.account_locked_until
+        )
+        self.failed_login_attempts += attempts
+        invalidate_auth_user(self.pk)
+        LOCKOUTS.inc()
+        return True
     
     def __str__(self):
         return self.username
\ No newline at end of file
@@ -0,0 +1,33 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from core.helper import get_client_ip
+from users.auth_cache import invalidate_auth_user
+from users.models import CustomUser
+
+
+@receiver(user_logged_in, dispatch_uid='users.finalize_login')
+def finalize_login(sender, request, user, **kwargs):
+    """
+    نهایی کردن ورود با یک UPDATE:
+    last_login، آی‌پی و زمان ورود و ریست قفل حساب با هم نوشته می‌شوند.
+    جایگزین update_last_login جنگو است که جداگانه save می‌کرد.
+    """
+    now = timezone.now()
+    fields = {'last_login': now, 'last_login_at': now}
+    if request is not None:
+        fields['last_login_ip'] = get_client_ip(request)
+    fields.update(user.reset_login_attempts(commit=False))
+
+    for name, value in fields.items():
+        setattr(user, name, value)
+    type(user)._default_manager.filter(pk=user.pk).update(**fields)
+    invalidate_auth_user(user.pk)
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='users.invalidate_auth_user_on_save')
+@receiver(post_delete, sender=CustomUser, dispatch_uid='users.invalidate_auth_user_on_delete')
+def invalidate_cached_user(sender, instance, **kwargs):
+    """کاربر ذخیره یا حذف شده از کش جریان ورود پاک می‌شود"""
+    invalidate_auth_user(instance.pk)
@@ -0,0 +1,74 @@
+import re
+from datetime import timedelta
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from users.admin import CustomUserAdmin
+from users.models import CustomUser
+
+
+@override_settings(
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class CustomUserAdminTest(TestCase):
+    url = '/admin/users/customuser/'
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='testpass123', email='admin@example.com', phone_number='09120000000'
+        )
+        self.client.force_login(self.admin)
+        joined = timezone.now() - timedelta(days=1)
+        for i in range(7):
+            CustomUser.objects.create_user(
+                username=f'member{i}', password='testpass123',
+                email=f'member{i}@example.com', phone_number=f'0913000000{i}',
+                # دو کاربر با date_joined یکسان برای تست شکستن تساوی با pk
+                date_joined=joined + timedelta(minutes=i // 2)
+            )
+
+    def usernames(self, response):
+        return [user.username for user in response.context['cl'].result_list]
+
+    def search(self, term):
+        return set(self.usernames(self.client.get(self.url, {'q': term})))
+
+    def test_search_modes(self):
+        """تست جستجوی تلفن کامل و پیشوندی، نام کاربری و ایمیل"""
+        self.assertEqual(self.search('+98 913 000 0003'), {'member3'})
+        self.assertEqual(self.search('913 000 000'), set(f'member{i}' for i in range(7)))
+        self.assertEqual(self.search('member5'), {'member5'})
+        self.assertEqual(self.search('admin@'), {'admin'})
+        self.assertEqual(self.search('nobody'), set())
+
+    def test_keyset_pages_cover_every_user_once(self):
+        """تست پیمایش کامل صفحات keyset بدون تکرار یا جا افتادن"""
+        seen = []
+        url = self.url
+        with mock.patch.object(CustomUserAdmin, 'list_per_page', 3):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                seen += self.usernames(response)
+                next_url = response.context['cl'].next_page_url
+                url = self.url + next_url if next_url else None
+
+        expected = list(CustomUser.objects.order_by('-date_joined', '-pk').values_list('username', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_keyset_query_has_no_offset(self):
+        """تست عدم استفاده از OFFSET در صفحات بعدی"""
+        with mock.patch.object(CustomUserAdmin, 'list_per_page', 3):
+            next_url = self.client.get(self.url).context['cl'].next_page_url
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url + next_url)
+        self.assertFalse(any(re.search(r'\bOFFSET\b', q['sql']) for q in context.captured_queries))
+
+    def test_invalid_cursor_redirects(self):
+        """تست cursor نامعتبر"""
+        response = self.client.get(self.url, {'after': 'garbage'})
+        self.assertEqual(response.status_code, 302)
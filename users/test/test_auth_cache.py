@@ -0,0 +1,89 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from core import flow, metrics
+from core.routers import ReplicaRouter
+from core.flow import make_ticket
+from users.auth_cache import AUTH_FLOW_FIELDS, get_auth_user
+from users.models import CustomUser
+
+
+def user_reads(context):
+    return [q['sql'] for q in context.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "users_customuser"' in q['sql']]
+
+
+@override_settings(
+    VERIFICATION_CODE_MODE='database',
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+)
+class AuthUserCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='cacheduser',
+            password='testpass123',
+            phone_number='09123456788'
+        )
+        self.factory = RequestFactory()
+
+    def lookups(self, result):
+        return metrics.collect().get(metrics.AUTH_USER_CACHE._key({'result': result}), 0)
+
+    def test_second_request_hits_cache(self):
+        """تست خواندن کاربر از کش در درخواست دوم بدون کوئری"""
+        misses, hits = self.lookups('miss'), self.lookups('hit')
+        get_auth_user(self.factory.get('/'), self.user.pk)
+
+        request = self.factory.get('/')
+        with CaptureQueriesContext(connection) as context:
+            user = get_auth_user(request, self.user.pk)
+            self.assertIs(get_auth_user(request, self.user.pk), user)
+        self.assertEqual(context.captured_queries, [])
+        self.assertEqual(user.username, 'cacheduser')
+        self.assertTrue(user.check_password('testpass123'))
+        self.assertEqual(user.get_deferred_fields(), {
+            field.attname for field in CustomUser._meta.concrete_fields
+        } - set(AUTH_FLOW_FIELDS))
+        self.assertEqual((self.lookups('miss') - misses, self.lookups('hit') - hits), (1, 1))
+
+    def test_reuses_user_loaded_by_middleware(self):
+        """تست استفاده از کاربری که AuthenticationMiddleware بارگذاری کرده"""
+        request = self.factory.get('/')
+        request._cached_user = self.user
+        with CaptureQueriesContext(connection) as context:
+            self.assertIs(get_auth_user(request, self.user.pk), self.user)
+        self.assertEqual(context.captured_queries, [])
+
+    def test_invalidated_on_save_and_delete(self):
+        """تست پاک شدن کش با save، قفل حساب و delete"""
+        get_auth_user(self.factory.get('/'), self.user.pk)
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertEqual(get_auth_user(self.factory.get('/'), self.user.pk).username, 'renamed')
+
+        for _ in range(5):
+            self.user.increment_failed_attempt()
+        self.assertTrue(get_auth_user(self.factory.get('/'), self.user.pk).is_account_locked())
+
+        pk = self.user.pk
+        self.user.delete()
+        with self.assertRaises(CustomUser.DoesNotExist):
+            get_auth_user(self.factory.get('/'), pk)
+
+    def test_cache_is_filled_from_primary(self):
+        """تست پر شدن کش از دیتابیس اصلی حتی وقتی router رپلیکا را انتخاب کند"""
+        with mock.patch.object(ReplicaRouter, 'db_for_read', return_value='replica'):
+            user = get_auth_user(self.factory.get('/'), self.user.pk)
+        self.assertEqual(user._state.db, 'default')
+
+    def test_verify_resend_polls_do_not_read_user(self):
+        """تست عدم خواندن کاربر از دیتابیس در درخواست‌های تکراری صفحه تأیید"""
+        self.client.cookies['auth_flow'] = make_ticket(flow.LOGIN, self.user.pk, 'nonce')
+        self.client.get('/codes/verify/')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/codes/verify/')
+        self.assertEqual(user_reads(context), [])
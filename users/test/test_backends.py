@@ -0,0 +1,55 @@
+from unittest import mock
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from users.forms import CustomAuthenticationForm
+from users.models import CustomUser
+
+
+@override_settings(MAX_LOGIN_ATTEMPTS=3, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LockoutModelBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='backenduser',
+            password='testpass123',
+            phone_number='09123456787'
+        )
+        self.request = RequestFactory().post('/users/login/')
+
+    def form(self, password):
+        return CustomAuthenticationForm(self.request, data={'username': 'backenduser', 'password': password})
+
+    def test_valid_login_uses_one_query(self):
+        """تست خواندن کاربر، بررسی قفل و رمز با یک کوئری"""
+        form = self.form('testpass123')
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(form.is_valid())
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(form.get_user(), self.user)
+
+    def test_locked_account_skips_hashing(self):
+        """تست عدم هش کردن رمز برای حساب قفل شده"""
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            account_locked_until=timezone.now() + timezone.timedelta(minutes=5)
+        )
+        form = self.form('testpass123')
+        with mock.patch.object(MD5PasswordHasher, 'encode') as encode, \
+                CaptureQueriesContext(connection) as context:
+            self.assertFalse(form.is_valid())
+        encode.assert_not_called()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(form.non_field_errors().as_data()[0].code, 'account_locked')
+
+    def test_locking_attempt_reports_lock(self):
+        """تست نمایش پیام قفل در تلاشی که حساب را قفل می‌کند"""
+        codes = []
+        for _ in range(3):
+            self.request = RequestFactory().post('/users/login/')
+            form = self.form('wrong')
+            self.assertFalse(form.is_valid())
+            codes.append(form.non_field_errors().as_data()[0].code)
+        self.assertEqual(codes, ['invalid_login', 'invalid_login', 'account_locked'])
@@ -0,0 +1,83 @@
+import csv
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from codes.models import Code
+from users.models import CustomUser
+
+
+@override_settings(
+    CODE_PROVISIONING='off',
+    DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ExportTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='testpass123', email='admin@example.com', phone_number='09120000000'
+        )
+        self.users = [
+            CustomUser.objects.create_user(username=f'export{i}', password='x', phone_number=f'0913000000{i}')
+            for i in range(5)
+        ]
+        for user in self.users:
+            Code.objects.create(user=user)
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('export_data', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_command_csv_with_selected_fields_and_filter(self):
+        """تست خروجی CSV با ستون‌های انتخابی و فیلتر"""
+        out, err = self.export('users', '--fields', 'username,phone_number', '--filter', 'username__startswith=export')
+        rows = list(csv.reader(StringIO(out)))
+        self.assertEqual(rows[0], ['username', 'phone_number'])
+        self.assertEqual(rows[1:], [[u.username, u.phone_number] for u in self.users])
+        self.assertIn('Exported 5 users', err)
+
+    def test_command_jsonl_follows_relations(self):
+        """تست خروجی JSONL کدها با ستون رابطه‌ای"""
+        out, _ = self.export('codes', '--format', 'jsonl', '--chunk-size', '2')
+        records = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['user__phone_number'], '09130000000')
+
+    def test_password_and_unknown_fields_rejected(self):
+        """تست رد ستون رمز عبور و ستون ناشناخته"""
+        for fields in ('username,password', 'nope', 'user__password'):
+            with self.assertRaises(CommandError):
+                self.export('users' if 'user__' not in fields else 'codes', '--fields', fields)
+
+    def test_password_reached_through_relations_or_filters_rejected(self):
+        """تست رد رسیدن به رمز عبور از مسیر رابطه‌ای یا فیلتر"""
+        for args in (
+            ('users', '--fields', 'verification_codes__user__password'),
+            ('users', '--filter', 'password__startswith=md5$'),
+            ('codes', '--filter', 'user__password__startswith=md5$'),
+        ):
+            with self.assertRaises(CommandError):
+                self.export(*args)
+        out, _ = self.export('users', '--filter', 'pk__gt=0', '--filter', 'username__startswith=u')
+        self.assertTrue(out)
+
+    def test_admin_action_streams(self):
+        """تست اکشن پنل مدیریت با پاسخ جریانی"""
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/users/customuser/', {
+            'action': 'export_csv',
+            '_selected_action': [u.pk for u in self.users[:2]],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn('password', lines[0])
+
+        response = self.client.post('/admin/codes/code/', {
+            'action': 'export_jsonl',
+            '_selected_action': list(Code.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
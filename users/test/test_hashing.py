@@ -0,0 +1,76 @@
+from threading import Event
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from users.forms import CustomAuthenticationForm
+from users.hashing import HashingBusy, PasswordHashingService, get_hashing_service
+from users.models import CustomUser
+
+MD5 = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def _wait(event):
+    event.wait(5)
+
+
+class PasswordHashingServiceTest(SimpleTestCase):
+    def test_rejects_beyond_queue_depth(self):
+        """تست رد درخواست‌ها بیش از ظرفیت pool و صف"""
+        service = PasswordHashingService(workers=1, max_queue=1)
+        # اجرای thread به جای process برای کنترل زمان اتمام کارها
+        from concurrent.futures import ThreadPoolExecutor
+        service._get_executor = lambda: service.__dict__.setdefault('_threads', ThreadPoolExecutor(1))
+        release = Event()
+        futures = [service.submit(_wait, release) for _ in range(2)]
+        with self.assertRaises(HashingBusy):
+            service.submit(_wait, release)
+        release.set()
+        for future in futures:
+            future.result()
+        self.assertEqual(service._pending, 0)
+        service._threads.shutdown()
+
+
+@override_settings(
+    PASSWORD_HASHERS=MD5,
+    PASSWORD_HASHING={'WORKERS': 1, 'MAX_QUEUE': 4, 'START_METHOD': 'fork'},
+)
+class ProcessPoolLoginTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='pooluser',
+            password='testpass123',
+            phone_number='09123456786'
+        )
+
+    def tearDown(self):
+        get_hashing_service().shutdown()
+
+    def login(self, password):
+        form = CustomAuthenticationForm(RequestFactory().post('/'), data={'username': 'pooluser', 'password': password})
+        return form
+
+    def test_login_through_pool(self):
+        """تست بررسی رمز در process pool"""
+        self.assertTrue(self.login('testpass123').is_valid())
+        self.assertFalse(self.login('wrong').is_valid())
+
+    def test_rehash_on_login(self):
+        """تست بروزرسانی هش قدیمی (salt کوتاه) پس از ورود موفق"""
+        old = make_password('testpass123', salt='ab')
+        CustomUser.objects.filter(pk=self.user.pk).update(password=old)
+        self.assertTrue(self.login('testpass123').is_valid())
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, old)
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_busy_is_not_a_failed_attempt(self):
+        """تست نمایش پیام شلوغی و عدم شمارش تلاش ناموفق"""
+        service = get_hashing_service()
+        service._pending = service.workers + service.max_queue
+        form = self.login('testpass123')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors().as_data()[0].code, 'hashing_busy')
+        self.assertIsNone(cache.get(self.user.failed_attempts_key))
+        service._pending = 0
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from codes.models import Code
+from users.importer import import_users
+from users.models import CustomUser
+
+
+@override_settings(
+    CODE_PROVISIONING='off',
+    VERIFICATION_CODE_MODE='database',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ImportUsersTest(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(username='existing', password='x', phone_number='09120000001')
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_dedupes_and_validates(self):
+        """تست یکسان‌سازی شماره، حذف تکراری‌ها و رد ردیف‌های نامعتبر"""
+        rows = [
+            {'phone_number': '+98 912 000 0002', 'password': 'plain-pass'},
+            {'phone_number': '09120000002'},                       # تکراری داخل فایل
+            {'phone_number': '9120000001'},                        # کاربر موجود
+            {'phone_number': '12345'},                             # نامعتبر
+            {'phone_number': '09120000003', 'username': 'existing'},  # نام کاربری موجود
+            {'phone_number': '09120000004', 'username': 'ali', 'password': make_password('secret')},
+        ]
+        result = import_users(rows, batch_size=4)
+        self.assertEqual(
+            (result['rows'], result['created'], result['duplicates'], result['invalid']),
+            (6, 2, 3, 1)
+        )
+
+        self.assertTrue(CustomUser.objects.get(phone_number='09120000002').check_password('plain-pass'))
+        self.assertTrue(CustomUser.objects.get(username='ali').check_password('secret'))
+
+    def test_queries_per_batch_are_constant(self):
+        """تست ثابت بودن تعداد کوئری‌ها مستقل از اندازه دسته"""
+        def queries(count, start):
+            rows = [{'phone_number': f'0913{start + i:07d}'} for i in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                import_users(rows, batch_size=count, provision_codes=True)
+            return len(context.captured_queries)
+
+        self.assertEqual(queries(2, 0), queries(50, 100))
+        self.assertEqual(Code.objects.filter(user__phone_number__startswith='0913').count(), 52)
+
+    def test_rows_lost_to_concurrent_signup(self):
+        """تست شمارش و صدور کد فقط برای کاربرانی که واقعاً درج شده‌اند"""
+        bulk_create = CustomUser.objects.bulk_create
+
+        def racing_bulk_create(users, **kwargs):
+            # ثبت‌نام همزمان پس از بررسی کاربران موجود
+            CustomUser.objects.create_user(username='racer', password='x', phone_number='09120000005')
+            return bulk_create(users, **kwargs)
+
+        rows = [{'phone_number': '09120000005'}, {'phone_number': '09120000006'}]
+        with mock.patch.object(CustomUser.objects, 'bulk_create', side_effect=racing_bulk_create):
+            result = import_users(rows, provision_codes=True)
+        self.assertEqual((result['created'], result['duplicates'], result['codes']), (1, 1, 1))
+        self.assertFalse(Code.objects.filter(user__username='racer').exists())
+
+    def test_command_reads_csv_and_jsonl(self):
+        """تست دستور import_users با فایل CSV و JSONL"""
+        csv_path = self.write_file('.csv', "phone_number,username,email\n09121111111,csvuser,a@Example.COM\n")
+        jsonl_path = self.write_file('.jsonl', json.dumps({'phone_number': '09122222222'}) + "\n\n")
+
+        out = StringIO()
+        call_command('import_users', csv_path, stdout=out)
+        call_command('import_users', jsonl_path, '--provision-codes', stdout=out)
+
+        self.assertIn('Imported 1 of 1 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(CustomUser.objects.get(username='csvuser').email, 'a@example.com')
+        self.assertTrue(Code.objects.filter(user__username='09122222222').exists())
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from users.forms import CustomAuthenticationForm
+from users.models import CustomUser
+
+
+def _writes(context):
+    return [q['sql'] for q in context.captured_queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+
+
+@override_settings(MAX_LOGIN_ATTEMPTS=3, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LockoutTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='lockuser',
+            password='testpass123',
+            phone_number='09123456789'
+        )
+
+    def login(self, password):
+        form = CustomAuthenticationForm(data={'username': 'lockuser', 'password': password})
+        return form.is_valid()
+
+    def test_failed_attempts_write_only_on_lock(self):
+        """تست اینکه فقط تلاش قفل‌کننده در دیتابیس نوشته می‌شود"""
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                self.assertFalse(self.login('wrong'))
+            self.assertEqual(_writes(context), [])
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(self.login('wrong'))
+        self.assertEqual(len(_writes(context)), 1)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_account_locked())
+        self.assertEqual(self.user.failed_login_attempts, 3)
+
+        # حساب قفل است حتی با رمز درست
+        self.assertFalse(self.login('testpass123'))
+
+    def test_reset_skips_write_when_clean(self):
+        """تست عدم نوشتن هنگام ریست کاربر بدون قفل"""
+        self.login('wrong')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.user.reset_login_attempts(), {})
+        self.assertEqual(_writes(context), [])
+        self.assertIsNone(cache.get(self.user.failed_attempts_key))
+
+    def test_reset_clears_lock(self):
+        """تست باز شدن قفل با ریست"""
+        for _ in range(3):
+            self.login('wrong')
+        self.user.refresh_from_db()
+        self.user.reset_login_attempts()
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_account_locked())
+        self.assertEqual(self.user.failed_login_attempts, 0)
+        self.assertTrue(self.login('testpass123'))
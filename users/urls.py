@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -5,7 +6,7 @@ app_name = 'users'
 
 urlpatterns = [
     
-    path('login/', views.auth_view, name='login'),
+    path('login/', views.async_auth_view if settings.ASYNC_AUTH_VIEWS else views.auth_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register_view, name='register'),
     path('profile/', views.profile_view, name='profile'),
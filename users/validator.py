@@ -25,3 +25,23 @@ def validate_iranian_phone_number(value):
         raise ValidationError(_("شماره تلفن باید 11 رقم باشد."))
     
     return cleaned
+
+
+
+def normalize_phone_prefix(value):
+    """
+    تبدیل عبارت جستجو به پیشوند شماره تلفن با فرمت 09...
+    اگر عبارت شبیه شماره تلفن نباشد None برمی‌گرداند
+    """
+    value = str(value).strip()
+    if not value or not all(c.isdigit() or c in '+- ' for c in value):
+        return None
+
+    cleaned = ''.join(filter(str.isdigit, value))
+    if cleaned.startswith('0098'):
+        cleaned = '0' + cleaned[4:]
+    elif cleaned.startswith('98'):
+        cleaned = '0' + cleaned[2:]
+    elif cleaned.startswith('9'):
+        cleaned = '0' + cleaned
+    return cleaned or None
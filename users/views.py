@@ -1,19 +1,34 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import logout
 from django.contrib import messages
+from django.core.exceptions import NON_FIELD_ERRORS
 
-from django.utils import timezone
-from django.conf import settings
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_http_methods
 
 from codes.models import Code
-from core.helper import clean_auth_session, handle_failed_attempt, send_verification_code
-from core.settings import CODE_RESEND_TIMEOUT, MAX_LOGIN_ATTEMPTS
+from codes.tokens import make_nonce
+from core import flow
+from core.flow import clear_ticket, issue_ticket, read_ticket
+from core.helper import (
+    adispatch_verification_code,
+    dispatch_verification_code,
+    handle_failed_attempt,
+    is_login_rate_limited,
+)
+from core.ratelimit import get_limiter
+from core.routers import read_from_replicas
+
+from .hashing import HashingBusy, make_password
+from .forms import CustomAuthenticationForm, CustomRegisterForm, ProfileEditForm, CustomPasswordChangeForm
+
 
-from .forms import CustomRegisterForm, ProfileEditForm, CustomPasswordChangeForm
+logger = logging.getLogger(__name__)
 
 
 
@@ -25,30 +40,32 @@ def auth_view(request):
     if request.user.is_authenticated: 
         return redirect('home')
 
-    form = AuthenticationForm()
+    form = CustomAuthenticationForm()
     
-    if request.session.get('auth_attempts', 0) >= MAX_LOGIN_ATTEMPTS:
+    if is_login_rate_limited(request):
         messages.error(request, "Too many attempts. Please try again later.")
         return render(request, 'users/auth.html', {'form': form})
 
     if request.method == "POST":
-        form = AuthenticationForm(request, data=request.POST)
+        form = CustomAuthenticationForm(request, data=request.POST)
         
         if form.is_valid():
             user = form.get_user()
             try:
-                Code.objects.filter(user=user, is_used=False).delete()
-                code = Code.objects.create(user=user)
-                send_verification_code(user, code.number)
+                nonce = make_nonce()
+                number = Code.objects.issue_code(user, nonce)
+                dispatch_verification_code(user, number)
+                get_limiter('code_resend').hit(f"{flow.LOGIN}:{user.pk}")
                 
-                request.session['pk'] = user.pk
-                request.session['last_code_sent'] = timezone.now().isoformat()
-                return redirect('codes:verify')
+                # flow state travels in a signed cookie, not the session
+                return issue_ticket(redirect('codes:verify'), flow.LOGIN, user.pk, nonce)
             
             except Exception as e:
+                logger.exception(f"Error generating verification code: {str(e)}")
                 messages.error(request, "Error generating verification code")
-                if settings.DEBUG:
-                    print(f"Error: {str(e)}")
+        elif form.has_error(NON_FIELD_ERRORS, 'hashing_busy'):
+            # overload, not a failed login: don't count it against the IP
+            messages.error(request, "Server is busy. Please try again.")
         else:
             if handle_failed_attempt(request):
                 return redirect('users:login')
@@ -56,11 +73,49 @@ def auth_view(request):
 
     return render(request, 'users/auth.html', {'form': form})
 
+async def async_auth_view(request):
+    """ASGI counterpart of auth_view using the async ORM and SMS client"""
+    if request.method not in ("GET", "POST"):
+        return HttpResponseNotAllowed(["GET", "POST"])
+
+    if await sync_to_async(lambda: request.user.is_authenticated)():
+        return redirect('home')
+
+    form = CustomAuthenticationForm()
+
+    if await sync_to_async(is_login_rate_limited)(request):
+        messages.error(request, "Too many attempts. Please try again later.")
+        return await sync_to_async(render)(request, 'users/auth.html', {'form': form})
+
+    if request.method == "POST":
+        form = CustomAuthenticationForm(request, data=request.POST)
+
+        if await sync_to_async(form.is_valid)():
+            user = form.get_user()
+            try:
+                nonce = make_nonce()
+                number = await Code.objects.aissue_code(user, nonce)
+                await adispatch_verification_code(user, number)
+                await sync_to_async(get_limiter('code_resend').hit)(f"{flow.LOGIN}:{user.pk}")
+
+                return issue_ticket(redirect('codes:verify'), flow.LOGIN, user.pk, nonce)
+
+            except Exception as e:
+                logger.exception(f"Error generating verification code: {str(e)}")
+                messages.error(request, "Error generating verification code")
+        elif form.has_error(NON_FIELD_ERRORS, 'hashing_busy'):
+            messages.error(request, "Server is busy. Please try again.")
+        else:
+            if await sync_to_async(handle_failed_attempt)(request):
+                return redirect('users:login')
+            messages.error(request, "Invalid credentials")
+
+    return await sync_to_async(render)(request, 'users/auth.html', {'form': form})
+
 def logout_view(request):
     logout(request)
-    clean_auth_session(request)
     messages.success(request, "Successfully logged out")
-    return redirect('home')
+    return clear_ticket(redirect('home'))
 
 def register_view(request):
     if request.user.is_authenticated:
@@ -73,6 +128,7 @@ def register_view(request):
         return redirect('users:login')
     return render(request, 'users/register.html', {'form': form})
 
+@read_from_replicas
 @login_required
 def profile_view(request):
     return render(request, 'users/profile.html', {'user': request.user})
@@ -90,23 +146,30 @@ def profile_edit_view(request):
 def password_change_view(request):
     form = CustomPasswordChangeForm(user=request.user, data=request.POST or None)
 
-    if request.method == "GET":
-        last_sent = request.session.get('password_change_code_sent')
-        if last_sent:
-            last_sent_time = timezone.datetime.fromisoformat(last_sent)
-            if (timezone.now() - last_sent_time).seconds < CODE_RESEND_TIMEOUT:
-                messages.warning(request, "Code already sent. Please wait before requesting a new one.")
-                return redirect('codes:verify_password_change')
+    # back to the pending verification only if there is one to return to
+    if (
+        request.method == "GET"
+        and get_limiter('code_resend').exceeded(f"{flow.PASSWORD_CHANGE}:{request.user.pk}")
+        and read_ticket(request, flow.PASSWORD_CHANGE) is not None
+    ):
+        messages.warning(request, "Code already sent. Please wait before requesting a new one.")
+        return redirect('codes:verify_password_change')
 
     if request.method == "POST" and form.is_valid():
-        request.session['new_password'] = form.cleaned_data['new_password1']
-        Code.objects.filter(user=request.user, is_used=False).delete()
-        code = Code.objects.create(user=request.user)
-        send_verification_code(request.user, code.number)
+        try:
+            # hashed now so verify never hashes; the hash waits in the cache, not the cookie
+            password = make_password(form.cleaned_data['new_password1'])
+        except HashingBusy:
+            messages.error(request, "Server is busy. Please try again.")
+            return render(request, 'users/password_change.html', {'form': form})
+        nonce = make_nonce()
+        number = Code.objects.issue_code(request.user, nonce)
+        dispatch_verification_code(request.user, number)
+        get_limiter('code_resend').hit(f"{flow.PASSWORD_CHANGE}:{request.user.pk}")
 
-        request.session['password_change_user_pk'] = request.user.pk
-        request.session['password_change_code_sent'] = timezone.now().isoformat()
         messages.info(request, "Verification code sent")
-        return redirect('codes:verify_password_change')
+        return issue_ticket(
+            redirect('codes:verify_password_change'), flow.PASSWORD_CHANGE, request.user.pk, nonce, password
+        )
 
     return render(request, 'users/password_change.html', {'form': form})
\ No newline at end of file